@@ -0,0 +1,125 @@
+import discord
+from discord.ext import commands
+import logging
+import asyncio
+import time
+from collections import Counter
+from datetime import timedelta
+from core.automod import AutomodEngine, TermMatcher
+
+SWEEP_INTERVAL = 60
+
+class AutomodCog(commands.Cog, name="automod"):
+    """Deletes messages with banned terms and times out members who flood or repeat themselves.
+
+    ``on_message`` only runs the engine's checks; deletes, timeouts and log
+    messages are queued to a few worker tasks so a burst of violations never
+    slows down message handling.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        settings = bot.config.automod
+        self.settings = settings
+        self.engine = AutomodEngine(
+            TermMatcher(settings.banned_terms, whole_words=settings.whole_words),
+            flood_messages=settings.flood_messages,
+            flood_window=settings.flood_window,
+            duplicate_messages=settings.duplicate_messages,
+            duplicate_window=settings.duplicate_window,
+            penalty_window=settings.timeout_seconds or 60.0
+        )
+        self.actions = asyncio.Queue(maxsize=settings.queue_size)
+        self.stats = Counter()  # checked, term, flood, duplicate, exempt, dropped
+        self.tasks = []
+        logging.debug("AutomodCog initialized")
+
+    async def cog_load(self):
+        if not self.settings.enabled:
+            logging.info("Automod is disabled")
+            return
+        self.tasks = [asyncio.create_task(self.run_actions()) for _ in range(max(1, self.settings.workers))]
+        self.tasks.append(asyncio.create_task(self.sweep_states()))
+        logging.info(f"Automod enabled with {len(self.engine.matcher.terms)} banned terms")
+
+    async def cog_unload(self):
+        for task in self.tasks:
+            task.cancel()
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if not self.tasks or message.guild is None or message.author.bot or message.webhook_id:
+            return
+        self.stats['checked'] += 1
+        verdict = self.engine.check(message.guild.id, message.author.id, message.content, time.monotonic())
+        if verdict is None:
+            return
+        # Permissions are only resolved for the rare message that breaks a rule
+        if isinstance(message.author, discord.Member) and message.author.guild_permissions.manage_messages:
+            self.stats['exempt'] += 1
+            return
+        self.stats[verdict.kind] += 1
+        try:
+            self.actions.put_nowait((message, verdict))
+        except asyncio.QueueFull:
+            self.stats['dropped'] += 1
+
+    async def run_actions(self):
+        while True:
+            message, verdict = await self.actions.get()
+            try:
+                await self.apply(message, verdict)
+            except Exception:
+                logging.exception(f"Automod action failed for message {message.id}")
+
+    async def apply(self, message: discord.Message, verdict):
+        if verdict.kind == 'term':
+            reason = "Banned term"
+        elif verdict.kind == 'flood':
+            reason = f"More than {verdict.detail} messages in {self.settings.flood_window:g}s"
+        else:
+            reason = f"Same message {verdict.detail} times"
+        try:
+            await message.delete()
+        except discord.NotFound:
+            pass
+        except discord.HTTPException as e:
+            logging.warning(f"Automod failed to delete a message in {message.guild.name}: {e}")
+
+        timed_out = False
+        if verdict.escalate and self.settings.timeout_seconds and isinstance(message.author, discord.Member):
+            try:
+                await message.author.timeout(timedelta(seconds=self.settings.timeout_seconds), reason=f"Automod: {reason}")
+                timed_out = True
+            except discord.HTTPException as e:
+                logging.warning(f"Automod failed to time out {message.author} in {message.guild.name}: {e}")
+            moderation = self.bot.get_cog("moderation")
+            if timed_out and moderation and moderation.cases:
+                moderation.cases.record(message.guild.id, 'mute', message.author.id, self.bot.user.id,
+                                        f"Automod: {reason}", self.settings.timeout_seconds)
+
+        logging.info(f"Automod: {reason} from {message.author} in {message.guild.name}" + (" (timed out)" if timed_out else ""))
+        # Every message of a flood is deleted, but only the first of each burst is posted to the log channel
+        report = verdict.kind == 'term' or verdict.escalate
+        log_channel = discord.utils.get(message.guild.text_channels, name=self.settings.log_channel) if self.settings.log_channel and report else None
+        if log_channel is not None:
+            embed = discord.Embed(
+                title="🛡️ Automod",
+                description=f"{message.author.mention} in {message.channel.mention}: {reason}" + (" — timed out" if timed_out else ""),
+                color=discord.Color.orange()
+            )
+            if message.content:
+                embed.add_field(name="Message", value=message.content[:1024], inline=False)
+            try:
+                await log_channel.send(embed=embed)
+            except discord.HTTPException as e:
+                logging.warning(f"Automod failed to post to the log channel in {message.guild.name}: {e}")
+
+    async def sweep_states(self):
+        while True:
+            await asyncio.sleep(SWEEP_INTERVAL)
+            dropped = self.engine.sweep(time.monotonic())
+            logging.debug(f"Automod dropped {dropped} idle member states, {len(self.engine)} left")
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(AutomodCog(bot))
@@ -3,47 +3,128 @@ from discord import app_commands
 from discord.ext import commands
 import random
 import logging
+import asyncio
+from pathlib import Path
+from typing import Literal
+from core.cluster import ClusterError
+from core.content_bank import ContentBank, RecentDraws, build_bank, read_sources
+from core.leaderboard import GLOBAL, Leaderboard, ScoreStore
+from core.trivia import TriviaSessions
+
+BANKS = ('facts', 'jokes', 'trivia')
 
 class FunCog(commands.GroupCog, name="fun"):
+    IPC_HANDLERS = ('trivia_global_answers', 'trivia_global_page')
+
     def __init__(self, bot):
         super().__init__()
         self.bot = bot
+        # One open question per channel (per user in DMs)
+        self.trivia_sessions = TriviaSessions(
+            max_sessions=bot.config.fun.trivia_max_sessions,
+            ttl=bot.config.fun.trivia_ttl
+        )
+        self.content_dir = Path(bot.config.fun.content_dir)
+        self.banks = {}  # name -> RecentDraws over the mapped bank
+        self.leaderboard = None
         logging.debug("FunCog initialized")
 
+    async def cog_load(self):
+        cluster = self.bot.cluster
+        # Shared by all clusters: each one keeps its own guilds' boards and the primary one keeps the global board
+        self.leaderboard = Leaderboard(
+            ScoreStore(self.bot.data_path('trivia_scores.db', shared=True)),
+            flush_interval=self.bot.config.fun.leaderboard_flush_interval,
+            owns_guild=cluster.owns_guild,
+            forward_global=None if cluster.is_primary else self.forward_global_answers
+        )
+        await self.leaderboard.start()
+        for name in self.IPC_HANDLERS:
+            cluster.register(name, getattr(self, f'ipc_{name}'))
+        for name in BANKS:
+            try:
+                bank = await asyncio.to_thread(self.open_bank, name)
+            except (OSError, ValueError) as e:
+                logging.error(f"Content bank {name} unavailable: {e}")
+                continue
+            self.banks[name] = RecentDraws(bank, window=self.bot.config.fun.no_repeat_window)
+            logging.info(f"Content bank {name} mapped with {len(bank)} entries in {len(bank.categories)} categories")
+
+    async def cog_unload(self):
+        for name in self.IPC_HANDLERS:
+            self.bot.cluster.unregister(name)
+        if self.leaderboard:
+            await self.leaderboard.stop()
+        for draws in self.banks.values():
+            draws.bank.close()
+
+    def open_bank(self, name: str) -> ContentBank:
+        """Maps ``<content_dir>/<name>.bank``, compiling it first if its sources are newer."""
+        bank_path = self.content_dir / f'{name}.bank'
+        source_dir = self.content_dir / name
+        sources = [path.stat().st_mtime for path in source_dir.glob('*') if path.suffix in ('.txt', '.jsonl')] if source_dir.is_dir() else []
+        if sources and (not bank_path.exists() or max(sources) > bank_path.stat().st_mtime):
+            # Large banks should be built offline with tools/build_content_bank.py
+            count = build_bank(read_sources(source_dir), bank_path)
+            logging.info(f"Compiled content bank {bank_path} from {source_dir} ({count} entries)")
+        return ContentBank(bank_path)
+
+    async def draw(self, interaction: discord.Interaction, name: str, category: str = None):
+        """Draws an entry without repeating the channel's recent ones; replies and returns None when it can't."""
+        draws = self.banks.get(name)
+        if draws is None or len(draws.bank) == 0:
+            await interaction.response.send_message(f"No {name} are available right now.", ephemeral=True)
+            return None
+        if category is not None and category not in draws.bank.categories:
+            await interaction.response.send_message(f"Unknown category `{category}`. Available: {', '.join(draws.bank.categories)}"[:2000], ephemeral=True)
+            return None
+        _, entry = draws.draw(self.channel_key(interaction), category)
+        return entry
+
+    def category_choices(self, name: str, current: str):
+        draws = self.banks.get(name)
+        if draws is None:
+            return []
+        current = current.lower()
+        return [app_commands.Choice(name=category, value=category) for category in draws.bank.categories if current in category.lower()][:25]
+
+    @staticmethod
+    def channel_key(interaction: discord.Interaction):
+        if interaction.guild_id is None:
+            return ('user', interaction.user.id)
+        return (interaction.guild_id, interaction.channel_id)
+
     @app_commands.command(name="roll", description="Roll a dice")
-    @app_commands.checks.cooldown(1, 5.0, key=lambda i: i.user.id)
     async def roll(self, interaction: discord.Interaction, sides: int = 6):
         result = random.randint(1, sides)
         await interaction.response.send_message(f'You rolled a {result}', ephemeral=True)
 
     @app_commands.command(name="fact", description="Get a random fact")
-    @app_commands.checks.cooldown(1, 5.0, key=lambda i: i.user.id)
-    async def fact(self, interaction: discord.Interaction):
-        facts = [
-            "Honey never spoils.",
-            "A flock of crows is known as a murder.",
-            "Bananas are berries but strawberries aren't."
-        ]
-        await interaction.response.send_message(random.choice(facts), ephemeral=True)
+    async def fact(self, interaction: discord.Interaction, category: str = None):
+        fact = await self.draw(interaction, 'facts', category)
+        if fact is not None:
+            await interaction.response.send_message(fact, ephemeral=True)
+
+    @fact.autocomplete('category')
+    async def fact_category(self, interaction: discord.Interaction, current: str):
+        return self.category_choices('facts', current)
 
     @app_commands.command(name="joke", description="Get a random joke")
-    @app_commands.checks.cooldown(1, 5.0, key=lambda i: i.user.id)
-    async def joke(self, interaction: discord.Interaction):
-        jokes = [
-            "Why don't scientists trust atoms? Because they make up everything!",
-            "How does a penguin build its house? Igloos it together!",
-            "Why was the math book sad? Because it had too many problems."
-        ]
-        await interaction.response.send_message(random.choice(jokes), ephemeral=True)
+    async def joke(self, interaction: discord.Interaction, category: str = None):
+        joke = await self.draw(interaction, 'jokes', category)
+        if joke is not None:
+            await interaction.response.send_message(joke, ephemeral=True)
+
+    @joke.autocomplete('category')
+    async def joke_category(self, interaction: discord.Interaction, current: str):
+        return self.category_choices('jokes', current)
 
     @app_commands.command(name="8ball", description="Ask the magic 8-ball a question")
-    @app_commands.checks.cooldown(1, 5.0, key=lambda i: i.user.id)
     async def eight_ball(self, interaction: discord.Interaction, question: str):
         responses = ["Yes", "No", "Maybe", "Definitely", "Absolutely not"]
         await interaction.response.send_message(f'🎱 {random.choice(responses)}', ephemeral=True)
 
     @app_commands.command(name="rps", description="Play rock-paper-scissors with the bot")
-    @app_commands.checks.cooldown(1, 5.0, key=lambda i: i.user.id)
     async def rps(self, interaction: discord.Interaction, choice: str):
         choices = ["rock", "paper", "scissors"]
         bot_choice = random.choice(choices)
@@ -57,28 +138,89 @@ class FunCog(commands.GroupCog, name="fun"):
         await interaction.response.send_message(f'I chose {bot_choice}. {result}', ephemeral=True)
 
     @app_commands.command(name="trivia", description="Answer a trivia question")
-    @app_commands.checks.cooldown(1, 5.0, key=lambda i: i.user.id)
-    async def trivia(self, interaction: discord.Interaction):
-        # Example questions; in a real scenario, fetch from a trivia API
-        questions = [
-            {"question": "What is the capital of France?", "answer": "Paris"},
-            {"question": "Who wrote 'To Kill a Mockingbird'?", "answer": "Harper Lee"},
-            {"question": "What is the largest planet in our Solar System?", "answer": "Jupiter"}
-        ]
-        question = random.choice(questions)
-        await interaction.response.send_message(question["question"], ephemeral=True)
-        self.bot.trivia_answer = question["answer"]
+    async def trivia(self, interaction: discord.Interaction, category: str = None):
+        question = await self.draw(interaction, 'trivia', category)
+        if question is None:
+            return
+        self.trivia_sessions.start(self.channel_key(interaction), question["question"], question["answer"], question.get("aliases", ()))
+        # Everyone in the channel can answer, so the question is public
+        await interaction.response.send_message(f"{question['question']}\nAnswer with `/fun answer`.")
+
+    @trivia.autocomplete('category')
+    async def trivia_category(self, interaction: discord.Interaction, current: str):
+        return self.category_choices('trivia', current)
 
     @app_commands.command(name="answer", description="Answer the trivia question")
-    @app_commands.checks.cooldown(1, 5.0, key=lambda i: i.user.id)
     async def answer(self, interaction: discord.Interaction, answer: str):
-        correct_answer = getattr(self.bot, 'trivia_answer', None)
-        if correct_answer is None:
-            await interaction.response.send_message("No trivia question has been asked!", ephemeral=True)
-        elif answer.lower() == correct_answer.lower():
-            await interaction.response.send_message("Correct!", ephemeral=True)
+        key = self.channel_key(interaction)
+        session = self.trivia_sessions.get(key)
+        if session is None:
+            await interaction.response.send_message("No trivia question is open in this channel! Start one with `/fun trivia`.", ephemeral=True)
+        elif session.is_correct(answer):
+            self.trivia_sessions.pop(key)
+            score, streak, _ = self.leaderboard.record(interaction.guild_id, interaction.user.id, True)
+            await interaction.response.send_message(
+                f"Correct! {interaction.user.mention} answered **{session.answer}**. ({score} point{'s' if score != 1 else ''}, streak {streak})",
+                allowed_mentions=discord.AllowedMentions.none()
+            )
+        else:
+            self.leaderboard.record(interaction.guild_id, interaction.user.id, False)
+            # Revealing the answer would hand it to the rest of the channel
+            await interaction.response.send_message("Incorrect! Try again.", ephemeral=True)
+
+    async def forward_global_answers(self, answers):
+        await self.bot.cluster.call(0, 'trivia_global_answers', answers=answers)
+
+    async def ipc_trivia_global_answers(self, answers):
+        self.leaderboard.record_global(answers)
+
+    async def ipc_trivia_global_page(self, offset: int, count: int, user_id: int):
+        return self.board_page(GLOBAL, offset, count, user_id)
+
+    def board_page(self, board_id: int, offset: int, count: int, user_id: int):
+        """Returns ``(total, entries, rank, score)`` of a board held by this cluster; rank and score are None for unranked users."""
+        total, entries = self.leaderboard.page(board_id, offset, count)
+        rank = self.leaderboard.rank(board_id, user_id)
+        score = self.leaderboard.get(board_id, user_id)[0] if rank is not None else None
+        return total, entries, rank, score
+
+    @app_commands.command(name="leaderboard", description="Show the trivia leaderboard")
+    @app_commands.describe(scope="This server's board or the global one", page="Page number")
+    async def leaderboard_command(self, interaction: discord.Interaction, scope: Literal['server', 'global'] = 'server', page: app_commands.Range[int, 1] = 1):
+        board_id = interaction.guild_id if scope == 'server' and interaction.guild_id else GLOBAL
+        per_page = 10
+        offset = (page - 1) * per_page
+        if board_id == GLOBAL and not self.leaderboard.keeps_global:
+            # The global board lives on the primary cluster; send this cluster's answers first so they count
+            await interaction.response.defer(ephemeral=True)
+            try:
+                await self.leaderboard.flush()
+                total, entries, rank, score = await self.bot.cluster.call(0, 'trivia_global_page', offset=offset, count=per_page, user_id=interaction.user.id)
+            except ClusterError as e:
+                logging.warning(f"Global trivia leaderboard unavailable: {e}")
+                await interaction.followup.send("The global leaderboard is unavailable right now. Try again later.", ephemeral=True)
+                return
+        else:
+            total, entries, rank, score = self.board_page(board_id, offset, per_page, interaction.user.id)
+        title = "Global Trivia Leaderboard" if board_id == GLOBAL else f"Trivia Leaderboard for {interaction.guild.name}"
+        embed = discord.Embed(title=title, color=discord.Color.gold())
+        if not entries:
+            embed.description = "No scores yet. Start a game with `/fun trivia`!" if page == 1 else "This page is empty."
+        else:
+            first = (page - 1) * per_page + 1
+            embed.description = "\n".join(
+                f"**#{position}** <@{user_id}> - {score} points (streak {streak}, best {best_streak})"
+                for position, (user_id, score, streak, best_streak) in enumerate(entries, first)
+            )
+        pages = max(1, (total + per_page - 1) // per_page)
+        footer = f"Page {page}/{pages} · {total} players"
+        if rank is not None:
+            footer += f" · Your rank: #{rank + 1} with {score} points"
+        embed.set_footer(text=footer)
+        if interaction.response.is_done():
+            await interaction.followup.send(embed=embed, ephemeral=True)
         else:
-            await interaction.response.send_message(f"Incorrect! The correct answer was {correct_answer}.", ephemeral=True)
+            await interaction.response.send_message(embed=embed, ephemeral=True)
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(FunCog(bot))
@@ -3,13 +3,145 @@ from discord import app_commands, Interaction
 from discord.ext import commands
 import logging
 import asyncio
+import io
+import re
+from datetime import timedelta
+from core.cases import CaseLog, CaseStore
+from core.fanout import run_bounded
+from core.mutes import MuteExpiryQueue, MuteStore
+
+MUTE_ROLE_NAME = "Muted"
+MAX_TIMEOUT_SECONDS = 28 * 86400  # Discord caps member timeouts at 28 days
+USER_ID_PATTERN = re.compile(r'\d{15,20}')  # Bare IDs and mentions alike
+BULK_PROGRESS_INTERVAL = 5
+BULK_SKIP_REASONS = {'hierarchy': "role hierarchy", 'self': "cannot moderate yourself"}
+HISTORY_PAGE_SIZE = 10
+
+class CaseHistoryView(discord.ui.View):
+    """Pages through a case history; each page is fetched by keyset from the previous page's last case."""
+
+    def __init__(self, cog, interaction: Interaction, title: str, target_id: int = None, moderator_id: int = None):
+        super().__init__(timeout=300)
+        self.cog = cog
+        self.owner_id = interaction.user.id
+        self.guild_id = interaction.guild.id
+        self.title = title
+        self.target_id = target_id
+        self.moderator_id = moderator_id
+        self.cursors = []  # cursor each visited page was loaded with; the last one is the current page
+        self.cases = []
+        self.has_more = False
+
+    async def load(self, cursor):
+        cases = await self.cog.cases.history(self.guild_id, self.target_id, self.moderator_id, cursor, HISTORY_PAGE_SIZE + 1)
+        self.cases = cases[:HISTORY_PAGE_SIZE]
+        self.has_more = len(cases) > HISTORY_PAGE_SIZE
+        self.cursors.append(cursor)
+        self.newer.disabled = len(self.cursors) <= 1
+        self.older.disabled = not self.has_more
+
+    def embed(self):
+        return self.cog.history_embed(self.cases, self.title, len(self.cursors))
+
+    async def interaction_check(self, interaction: Interaction):
+        return interaction.user.id == self.owner_id
+
+    @discord.ui.button(label="Newer", style=discord.ButtonStyle.secondary)
+    async def newer(self, interaction: Interaction, button: discord.ui.Button):
+        self.cursors.pop()
+        await self.load(self.cursors.pop())
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    @discord.ui.button(label="Older", style=discord.ButtonStyle.secondary)
+    async def older(self, interaction: Interaction, button: discord.ui.Button):
+        last = self.cases[-1]
+        await self.load((last.created_at, last.id))
+        await interaction.response.edit_message(embed=self.embed(), view=self)
 
 class ModerationCog(commands.GroupCog, name="moderation"):
     def __init__(self, bot):
         super().__init__()
         self.bot = bot
+        self.mutes = None
+        self.cases = None
+        self.reconcile_task = None
+        self.mute_backend = bot.config.moderation.mute_backend
+        self.overwrite_concurrency = bot.config.moderation.overwrite_concurrency
+        self.bulk_concurrency = bot.config.moderation.bulk_concurrency
+        self.bulk_max_targets = bot.config.moderation.bulk_max_targets
+        self.mute_role_ids = {}  # guild_id -> Muted role id
         logging.debug("ModerationCog initialized")
 
+    async def cog_load(self):
+        # Shared by all clusters; each one expires only the mutes of its own guilds
+        self.mutes = MuteExpiryQueue(MuteStore(self.bot.data_path('mutes.db', shared=True)), self.expire_mutes,
+                                     owns_guild=self.bot.cluster.owns_guild)
+        await self.mutes.start()
+        # Shared by all clusters so a guild's history survives a change of shard layout
+        self.cases = CaseLog(CaseStore(self.bot.data_path('cases.db', shared=True)), self.bot.config.moderation.case_flush_interval)
+        await self.cases.start()
+        self.reconcile_task = asyncio.create_task(self.reconcile_mutes())
+
+    async def cog_unload(self):
+        if self.reconcile_task:
+            self.reconcile_task.cancel()
+        if self.mutes:
+            await self.mutes.stop()
+        if self.cases:
+            await self.cases.stop()
+
+    async def expire_mutes(self, guild_id: int, members):
+        """Removes the mute role from every member of a guild whose mute came due.
+
+        Returns the ids of members whose mute could not be lifted yet; the expiry queue retries those.
+        """
+        await self.bot.wait_until_ready()
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            logging.warning(f"Guild {guild_id} is unavailable, retrying {len(members)} expired mutes later")
+            return [member_id for member_id, _ in members]
+
+        async def unmute(member_id, role_id):
+            member = guild.get_member(member_id)
+            role = guild.get_role(role_id)
+            if member is None or role is None or role not in member.roles:
+                return True
+            try:
+                await member.remove_roles(role, reason="Mute duration expired")
+                logging.info(f"Unmuted {member} in {guild.name} after their mute expired")
+            except (discord.Forbidden, discord.NotFound) as e:
+                # Retrying cannot help; the mute is dropped
+                logging.error(f"Cannot unmute {member} in {guild.name}: {e}")
+            except Exception as e:
+                logging.error(f"Failed to unmute {member} in {guild.name}, will retry: {e}")
+                return False
+            return True
+
+        results = await asyncio.gather(*(unmute(member_id, role_id) for member_id, role_id in members))
+        return [member_id for (member_id, _), lifted in zip(members, results) if not lifted]
+
+    async def reconcile_mutes(self):
+        """Drops stored mutes for members who no longer hold the mute role and reports untracked holders."""
+        await self.bot.wait_until_ready()
+        stale = []
+        for (guild_id, member_id), (role_id, _) in self.mutes.active().items():
+            guild = self.bot.get_guild(guild_id)
+            if guild is None:
+                continue
+            member = guild.get_member(member_id)
+            if member is None or member.get_role(role_id) is None:
+                stale.append((guild_id, member_id))
+        await self.mutes.discard(stale)
+
+        for guild in self.bot.guilds:
+            mute_role = self.get_mute_role(guild)
+            if mute_role is None:
+                continue
+            untracked = [member for member in mute_role.members if (guild.id, member.id) not in self.mutes]
+            if untracked:
+                logging.warning(f"{len(untracked)} members in {guild.name} hold the Muted role without a scheduled expiry")
+        logging.info(f"Reconciled mutes: dropped {len(stale)} stale, {len(self.mutes)} active")
+
     async def cog_check(self, interaction: Interaction):
         return interaction.guild is not None
 
@@ -32,28 +164,32 @@ class ModerationCog(commands.GroupCog, name="moderation"):
 
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
-    async def is_authorized(self, interaction: Interaction, target_member: discord.Member):
+    def authorization_error(self, interaction: Interaction, target_member: discord.Member):
+        """Why the invoking moderator may not act on ``target_member`` ('hierarchy' or 'self'), or None."""
         if interaction.user.top_role <= target_member.top_role:
-            embed = discord.Embed(
-                title="❌ Unauthorized",
-                description=f"You cannot moderate {target_member.mention} due to role hierarchy.",
-                color=discord.Color.red()
-            )
-            await interaction.followup.send(embed=embed, ephemeral=True)
-            return False
+            return 'hierarchy'
         if target_member == interaction.user:
-            embed = discord.Embed(
-                title="❌ Unauthorized",
-                description="You cannot moderate yourself.",
-                color=discord.Color.red()
-            )
-            await interaction.followup.send(embed=embed, ephemeral=True)
-            return False
-        return True
+            return 'self'
+        return None
+
+    async def is_authorized(self, interaction: Interaction, target_member: discord.Member):
+        error = self.authorization_error(interaction, target_member)
+        if error is None:
+            return True
+        if error == 'hierarchy':
+            description = f"You cannot moderate {target_member.mention} due to role hierarchy."
+        else:
+            description = "You cannot moderate yourself."
+        embed = discord.Embed(
+            title="❌ Unauthorized",
+            description=description,
+            color=discord.Color.red()
+        )
+        await interaction.followup.send(embed=embed, ephemeral=True)
+        return False
 
     @app_commands.command(name="kick", description="Kick a member from the server")
     @app_commands.checks.has_permissions(kick_members=True)
-    @app_commands.checks.cooldown(1, 5.0, key=lambda i: i.user.id)
     async def kick(self, interaction: Interaction, member: discord.Member, reason: str = "No reason provided"):
         await interaction.response.defer(ephemeral=True)
 
@@ -78,6 +214,7 @@ class ModerationCog(commands.GroupCog, name="moderation"):
 
         try:
             await member.kick(reason=reason)
+            self.cases.record(interaction.guild.id, 'kick', member.id, interaction.user.id, reason)
             kick_embed = discord.Embed(
                 title="🚫 Member Kicked",
                 description=f'{member.mention} has been kicked for: **{reason}**',
@@ -96,7 +233,6 @@ class ModerationCog(commands.GroupCog, name="moderation"):
 
     @app_commands.command(name="ban", description="Ban a member from the server")
     @app_commands.checks.has_permissions(ban_members=True)
-    @app_commands.checks.cooldown(1, 5.0, key=lambda i: i.user.id)
     async def ban(self, interaction: Interaction, member: discord.Member, reason: str = "No reason provided"):
         await interaction.response.defer(ephemeral=True)
 
@@ -121,6 +257,7 @@ class ModerationCog(commands.GroupCog, name="moderation"):
 
         try:
             await member.ban(reason=reason)
+            self.cases.record(interaction.guild.id, 'ban', member.id, interaction.user.id, reason)
             ban_embed = discord.Embed(
                 title="🚫 Member Banned",
                 description=f'{member.mention} has been banned for: **{reason}**',
@@ -139,7 +276,6 @@ class ModerationCog(commands.GroupCog, name="moderation"):
 
     @app_commands.command(name="unban", description="Unban a member from the server")
     @app_commands.checks.has_permissions(ban_members=True)
-    @app_commands.checks.cooldown(1, 5.0, key=lambda i: i.user.id)
     async def unban(self, interaction: Interaction, user_id: str, *, note: str = "No note provided"):
         await interaction.response.defer(ephemeral=True)
         
@@ -149,6 +285,7 @@ class ModerationCog(commands.GroupCog, name="moderation"):
             user = await self.bot.fetch_user(user_id_int)
             logging.debug(f"Fetched user: {user}")
             await interaction.guild.unban(user, reason=note)
+            self.cases.record(interaction.guild.id, 'unban', user.id, interaction.user.id, note)
             unban_embed = discord.Embed(
                 title="✅ Member Unbanned",
                 description=f'{user.mention} has been unbanned.',
@@ -185,23 +322,173 @@ class ModerationCog(commands.GroupCog, name="moderation"):
             logging.error(f"Failed to unban user {user_id}: {e}")
             await interaction.followup.send(f'❌ Failed to unban user: An unexpected error occurred.', ephemeral=True)
 
+    async def bulk_targets(self, interaction: Interaction, user_ids: str, file: discord.Attachment, joined_within: int = None):
+        """Collects target IDs from pasted IDs/mentions, an attached text file and recent joins, without duplicates."""
+        texts = [user_ids or ""]
+        if file is not None:
+            texts.append((await file.read()).decode('utf-8', errors='ignore'))
+        targets = dict.fromkeys(int(match) for text in texts for match in USER_ID_PATTERN.findall(text))
+        if joined_within:
+            since = discord.utils.utcnow() - timedelta(minutes=joined_within)
+            targets.update(dict.fromkeys(member.id for member in interaction.guild.members
+                                         if member.joined_at and member.joined_at >= since and not member.bot))
+        return list(targets)
+
+    async def run_bulk(self, interaction: Interaction, verb: str, targets, action):
+        """Runs ``action(user_id)`` for every target through bounded workers and reports the outcomes in one follow-up.
+
+        ``action`` returns None on success or a reason to skip the ID; an exception counts as a failure.
+        """
+        if not targets:
+            await interaction.followup.send("❌ No user IDs found. Paste IDs or mentions, attach a text file, or use `joined_within`.", ephemeral=True)
+            return
+        if len(targets) > self.bulk_max_targets:
+            await interaction.followup.send(f"❌ {len(targets)} targets is more than the limit of {self.bulk_max_targets} per command.", ephemeral=True)
+            return
+
+        outcomes = {}
+
+        async def report_progress():
+            while True:
+                await asyncio.sleep(BULK_PROGRESS_INTERVAL)
+                try:
+                    await interaction.edit_original_response(content=f"⏳ Bulk {verb}: {len(outcomes)}/{len(targets)} processed...")
+                except discord.HTTPException as e:
+                    logging.debug(f"Failed to update bulk {verb} progress: {e}")
+
+        progress_task = asyncio.create_task(report_progress())
+        try:
+            await run_bounded(targets, action, concurrency=self.bulk_concurrency,
+                              on_result=lambda user_id, result: outcomes.__setitem__(user_id, result))
+        finally:
+            progress_task.cancel()
+
+        done = [user_id for user_id, result in outcomes.items() if result is None]
+        skipped = {user_id: result for user_id, result in outcomes.items() if isinstance(result, str)}
+        failed = {user_id: result for user_id, result in outcomes.items() if isinstance(result, Exception)}
+        logging.info(f"Bulk {verb} in {interaction.guild.name} by {interaction.user}: "
+                     f"{len(done)} {verb}, {len(skipped)} skipped, {len(failed)} failed")
+
+        problems = [f"{user_id}: skipped ({reason})" for user_id, reason in skipped.items()]
+        problems += [f"{user_id}: failed ({error.text if isinstance(error, discord.HTTPException) else error})" for user_id, error in failed.items()]
+        lines = [f"{user_id}: {verb}" for user_id in done] + problems
+        embed = discord.Embed(
+            title=f"Bulk {verb.capitalize()} Finished",
+            color=discord.Color.green() if not failed else discord.Color.orange()
+        )
+        embed.add_field(name=verb.capitalize(), value=str(len(done)))
+        embed.add_field(name="Skipped", value=str(len(skipped)))
+        embed.add_field(name="Failed", value=str(len(failed)))
+        if problems:
+            embed.description = "\n".join(problems[:15])
+        embed.set_footer(text="Every ID's outcome is in the attached file.")
+        results_file = discord.File(io.BytesIO("\n".join(lines).encode()), filename=f"bulk_{verb}.txt")
+        await interaction.edit_original_response(content=f"✅ Bulk {verb}: {len(outcomes)}/{len(targets)} processed.")
+        await interaction.followup.send(embed=embed, file=results_file, ephemeral=True)
+
+    def bulk_member_check(self, interaction: Interaction, user_id: int):
+        """Skip reason for a bulk target that is a member of the guild, or None."""
+        member = interaction.guild.get_member(user_id)
+        if member is None:
+            return None
+        if member == interaction.guild.me:
+            return "cannot moderate the bot"
+        error = self.authorization_error(interaction, member)
+        return BULK_SKIP_REASONS[error] if error else None
+
+    @app_commands.command(name="bulk_ban", description="Ban many users at once (no DMs are sent)")
+    @app_commands.describe(
+        user_ids="User IDs or mentions separated by spaces, commas or newlines",
+        file="Text file with user IDs",
+        joined_within="Also ban everyone who joined in the last N minutes"
+    )
+    @app_commands.checks.has_permissions(ban_members=True)
+    async def bulk_ban(self, interaction: Interaction, user_ids: str = None, file: discord.Attachment = None,
+                       joined_within: app_commands.Range[int, 1, 1440] = None, reason: str = "No reason provided"):
+        await interaction.response.defer(ephemeral=True)
+        targets = await self.bulk_targets(interaction, user_ids, file, joined_within)
+
+        async def ban(user_id):
+            skip = self.bulk_member_check(interaction, user_id)
+            if skip:
+                return skip
+            # Banning by ID also covers accounts that already left
+            await interaction.guild.ban(discord.Object(id=user_id), reason=reason, delete_message_seconds=0)
+            self.cases.record(interaction.guild.id, 'ban', user_id, interaction.user.id, reason)
+
+        await self.run_bulk(interaction, "banned", targets, ban)
+
+    @app_commands.command(name="bulk_kick", description="Kick many members at once (no DMs are sent)")
+    @app_commands.describe(
+        user_ids="User IDs or mentions separated by spaces, commas or newlines",
+        file="Text file with user IDs",
+        joined_within="Also kick everyone who joined in the last N minutes"
+    )
+    @app_commands.checks.has_permissions(kick_members=True)
+    async def bulk_kick(self, interaction: Interaction, user_ids: str = None, file: discord.Attachment = None,
+                        joined_within: app_commands.Range[int, 1, 1440] = None, reason: str = "No reason provided"):
+        await interaction.response.defer(ephemeral=True)
+        targets = await self.bulk_targets(interaction, user_ids, file, joined_within)
+
+        async def kick(user_id):
+            if interaction.guild.get_member(user_id) is None:
+                return "not a member"
+            skip = self.bulk_member_check(interaction, user_id)
+            if skip:
+                return skip
+            await interaction.guild.kick(discord.Object(id=user_id), reason=reason)
+            self.cases.record(interaction.guild.id, 'kick', user_id, interaction.user.id, reason)
+
+        await self.run_bulk(interaction, "kicked", targets, kick)
+
+    @app_commands.command(name="bulk_unban", description="Unban many users at once (no DMs are sent)")
+    @app_commands.describe(user_ids="User IDs separated by spaces, commas or newlines", file="Text file with user IDs")
+    @app_commands.checks.has_permissions(ban_members=True)
+    async def bulk_unban(self, interaction: Interaction, user_ids: str = None, file: discord.Attachment = None,
+                         note: str = "No note provided"):
+        await interaction.response.defer(ephemeral=True)
+        targets = await self.bulk_targets(interaction, user_ids, file)
+
+        async def unban(user_id):
+            try:
+                await interaction.guild.unban(discord.Object(id=user_id), reason=note)
+            except discord.NotFound:
+                return "not banned"
+            self.cases.record(interaction.guild.id, 'unban', user_id, interaction.user.id, note)
+
+        await self.run_bulk(interaction, "unbanned", targets, unban)
+
     @app_commands.command(name="mute", description="Mute a member in the server")
     @app_commands.describe(duration="Duration of the mute (e.g., '1h' for 1 hour, '10m' for 10 minutes, etc.)")
     @app_commands.checks.has_permissions(manage_roles=True)
-    @app_commands.checks.cooldown(1, 5.0, key=lambda i: i.user.id)
     async def mute(self, interaction: Interaction, member: discord.Member, duration: str, reason: str = "No reason provided"):
         await interaction.response.defer(ephemeral=True)
 
         if not await self.is_authorized(interaction, member):
             return
 
-        mute_role = await self.create_mute_role(interaction.guild)
-        if not mute_role:
-            await interaction.followup.send("❌ Failed to create/find Muted role.", ephemeral=True)
+        try:
+            seconds = self.convert_duration_to_seconds(duration)
+        except ValueError:
+            seconds = 0
+        if seconds <= 0:
+            await interaction.followup.send("❌ Invalid duration. Use e.g. `10m`, `1h` or `1d12h`.", ephemeral=True)
             return
 
         try:
-            await member.add_roles(mute_role, reason=reason)
+            if self.mute_backend == 'timeout':
+                if seconds > MAX_TIMEOUT_SECONDS:
+                    await interaction.followup.send("❌ Timeouts cannot be longer than 28 days.", ephemeral=True)
+                    return
+                await member.timeout(timedelta(seconds=seconds), reason=reason)
+            else:
+                mute_role = await self.create_mute_role(interaction.guild)
+                if not mute_role:
+                    await interaction.followup.send("❌ Failed to create/find Muted role.", ephemeral=True)
+                    return
+                await member.add_roles(mute_role, reason=reason)
+                await self.mutes.schedule(interaction.guild.id, member.id, mute_role.id, seconds)
+            self.cases.record(interaction.guild.id, 'mute', member.id, interaction.user.id, reason, seconds)
             mute_embed = discord.Embed(
                 title="🔇 Member Muted",
                 description=f'{member.mention} has been muted for **{duration}** for: **{reason}**',
@@ -211,20 +498,6 @@ class ModerationCog(commands.GroupCog, name="moderation"):
                 mute_embed.set_thumbnail(url=member.avatar.url)
             mute_embed.set_footer(text="Mute executed successfully.")
             await interaction.followup.send(embed=mute_embed, ephemeral=True)
-
-            seconds = self.convert_duration_to_seconds(duration)
-            await asyncio.sleep(seconds)
-            await member.remove_roles(mute_role, reason="Mute duration expired")
-
-            unmute_embed = discord.Embed(
-                title="🔊 Member Unmuted",
-                description=f'{member.mention} has been unmuted after serving their mute duration.',
-                color=discord.Color.green()
-            )
-            if member.avatar:
-                unmute_embed.set_thumbnail(url=member.avatar.url)
-            unmute_embed.set_footer(text="Unmute executed successfully.")
-            await interaction.followup.send(embed=unmute_embed, ephemeral=True)
         except discord.Forbidden as e:
             logging.error(f"Failed to mute {member.mention}: {e}")
             await interaction.followup.send(f'❌ Failed to mute {member.mention}: Insufficient permissions.', ephemeral=True)
@@ -232,24 +505,91 @@ class ModerationCog(commands.GroupCog, name="moderation"):
             logging.error(f"Failed to mute {member.mention}: {e}")
             await interaction.followup.send(f'❌ Failed to mute {member.mention}: An unexpected error occurred.', ephemeral=True)
 
+    def history_embed(self, cases, title: str, page: int):
+        embed = discord.Embed(title=title, color=discord.Color.blue())
+        if not cases:
+            embed.description = "No cases found."
+            return embed
+        lines = []
+        for case in cases:
+            line = f"`#{case.id}` <t:{int(case.created_at)}:d> **{case.action}** <@{case.target_id}> by <@{case.moderator_id}>"
+            if case.duration:
+                line += f" for {timedelta(seconds=case.duration)}"
+            if case.reason:
+                line += f" — {case.reason[:100]}"
+            lines.append(line)
+        embed.description = "\n".join(lines)
+        embed.set_footer(text=f"Page {page}")
+        return embed
+
+    @app_commands.command(name="history", description="Show moderation cases for a user or by a moderator")
+    @app_commands.describe(user="Cases against this user", moderator="Cases handled by this moderator")
+    @app_commands.checks.has_permissions(moderate_members=True)
+    async def history(self, interaction: Interaction, user: discord.User = None, moderator: discord.User = None):
+        await interaction.response.defer(ephemeral=True)
+        if user and moderator:
+            title = f"Cases against {user} by {moderator}"
+        elif user:
+            title = f"Cases against {user}"
+        elif moderator:
+            title = f"Cases by {moderator}"
+        else:
+            title = f"Recent cases in {interaction.guild.name}"
+        view = CaseHistoryView(self, interaction, title, user.id if user else None, moderator.id if moderator else None)
+        await view.load(None)
+        await interaction.followup.send(embed=view.embed(), view=view, ephemeral=True)
+
+    def get_mute_role(self, guild: discord.Guild):
+        role_id = self.mute_role_ids.get(guild.id)
+        mute_role = guild.get_role(role_id) if role_id else None
+        if mute_role is None:
+            mute_role = discord.utils.get(guild.roles, name=MUTE_ROLE_NAME)
+            if mute_role:
+                self.mute_role_ids[guild.id] = mute_role.id
+        return mute_role
+
     async def create_mute_role(self, guild: discord.Guild):
-        role_name = "Muted"
-        mute_role = discord.utils.get(guild.roles, name=role_name)
+        mute_role = self.get_mute_role(guild)
         if mute_role:
             return mute_role
 
         try:
             mute_role = await guild.create_role(
-                name=role_name,
+                name=MUTE_ROLE_NAME,
                 permissions=discord.Permissions(send_messages=False, speak=False),
                 reason="Auto-created Muted role for muting members"
             )
-            for channel in guild.channels:
-                await channel.set_permissions(mute_role, send_messages=False, speak=False)
-            return mute_role
         except discord.Forbidden as e:
             logging.error(f"Failed to create Muted role: {e}")
             return None
+        self.mute_role_ids[guild.id] = mute_role.id
+        await self.apply_mute_overwrites(mute_role, guild.channels)
+        return mute_role
+
+    async def apply_mute_overwrites(self, mute_role: discord.Role, channels):
+        async def overwrite(channel):
+            await channel.set_permissions(mute_role, send_messages=False, speak=False, reason="Muted role overwrite")
+
+        results = await run_bounded(channels, overwrite, concurrency=self.overwrite_concurrency)
+        failed = [channel for channel, result in results if isinstance(result, Exception)]
+        if failed:
+            logging.warning(f"Failed to set Muted overwrites on {len(failed)}/{len(results)} channels in {mute_role.guild.name}")
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        if self.mute_backend != 'role':
+            return
+        mute_role = self.get_mute_role(channel.guild)
+        if mute_role:
+            try:
+                await channel.set_permissions(mute_role, send_messages=False, speak=False, reason="Muted role overwrite")
+            except discord.HTTPException as e:
+                logging.warning(f"Failed to set Muted overwrite on new channel {channel.name}: {e}")
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        if self.mute_role_ids.get(role.guild.id) == role.id:
+            del self.mute_role_ids[role.guild.id]
 
     def convert_duration_to_seconds(self, duration: str) -> int:
         seconds = 0
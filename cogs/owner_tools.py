@@ -4,8 +4,16 @@ from discord.ext import commands
 import logging
 import traceback
 import os
+import io
+import json
+import asyncio
+import time
+from collections import Counter
 from datetime import datetime, timedelta
 import psutil
+from core.broadcasts import BroadcastStore, ChannelNameIndex
+from core.fanout import run_bounded
+from core.prune import PruneFilter, PruneJob, parse_duration
 
 # Setup logging
 logging.basicConfig(level=logging.DEBUG)
@@ -14,8 +22,49 @@ class OwnerCog(commands.GroupCog, name="ownertools"):
     def __init__(self, bot):
         super().__init__()
         self.bot = bot
+        self.broadcasts = None
+        self.broadcast_task = None
+        self.broadcast_job_task = None
+        self.broadcast_job = None  # progress of this cluster's part of the current broadcast
+        self.channel_index = ChannelNameIndex()
+        self.broadcast_concurrency = bot.config.owner_tools.broadcast_concurrency
+        self.prune_tasks = {}  # channel_id -> task running a PruneJob
         logging.debug("OwnerToolsCog initialized")
 
+    async def cog_load(self):
+        # Shared by all clusters; each one records deliveries only for its own guilds
+        self.broadcasts = BroadcastStore(self.bot.data_path('broadcasts.db', shared=True))
+        # Handlers other clusters call to aggregate owner commands
+        for name in self.IPC_HANDLERS:
+            self.bot.cluster.register(name, getattr(self, f'ipc_{name}'))
+
+    async def cog_unload(self):
+        for name in self.IPC_HANDLERS:
+            self.bot.cluster.unregister(name)
+        if self.broadcast_task:
+            self.broadcast_task.cancel()
+        if self.broadcast_job_task:
+            self.broadcast_job_task.cancel()
+        for task in self.prune_tasks.values():
+            task.cancel()
+        if self.broadcasts:
+            await asyncio.to_thread(self.broadcasts.close)
+
+    IPC_HANDLERS = ('list_guilds', 'guild_info', 'broadcast_start', 'broadcast_status', 'scan_issues')
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel):
+        self.channel_index.invalidate(channel.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        self.channel_index.invalidate(channel.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before, after):
+        if before.name != after.name or before.position != after.position:
+            self.channel_index.invalidate(after.guild.id)
+
     def owner_only():
         async def predicate(interaction: discord.Interaction) -> bool:
             is_owner = await interaction.client.is_owner(interaction.user)
@@ -62,14 +111,21 @@ class OwnerCog(commands.GroupCog, name="ownertools"):
             embed = discord.Embed(title="Extensions Status", description="No cog files found in the directory.", color=discord.Color.blue())
         else:
             embed = discord.Embed(title="Extensions Status", color=discord.Color.blue())
+            deferred = set(self.bot.lazy_extensions.pending.values())
             for cog in cogs:
                 status = "Loaded" if cog in loaded_extensions else "Not Loaded"
+                if cog in loaded_extensions and self.bot.extension_watcher.is_stale(cog):
+                    status = "Loaded (stale: file changed since load)"
+                if cog in deferred:
+                    deferred_note = "\n**Lazy:** imported on first use of its commands"
+                else:
+                    deferred_note = ""
                 cog_path = os.path.join(cogs_directory, cog.split('.')[1] + '.py')
                 last_modified = datetime.fromtimestamp(os.path.getmtime(cog_path)).strftime('%Y-%m-%d %H:%M:%S')
                 file_size = os.path.getsize(cog_path) / 1024  # File size in KB
-                value = f"**Status:** {status}\n**Last Modified:** {last_modified}\n**File Size:** {file_size:.2f} KB"
+                value = f"**Status:** {status}\n**Last Modified:** {last_modified}\n**File Size:** {file_size:.2f} KB{deferred_note}"
 
-                if attempt_load and status == "Not Loaded":
+                if attempt_load and cog not in loaded_extensions:
                     try:
                         await self.bot.load_extension(cog)
                         value += "\n**Load Attempt:** Success"
@@ -103,6 +159,7 @@ class OwnerCog(commands.GroupCog, name="ownertools"):
         await interaction.response.defer(ephemeral=True)
         try:
             await self.bot.unload_extension(extension_name)
+            self.bot.extension_watcher.forget(extension_name)
             await self.send_ephemeral_embed(interaction, "Extension Unloaded", f"Extension `{extension_name}` has been unloaded successfully.")
             logging.info(f"Extension {extension_name} unloaded successfully")
         except Exception as e:
@@ -121,6 +178,20 @@ class OwnerCog(commands.GroupCog, name="ownertools"):
             logging.error(f"Failed to reload extension {extension_name}: {e}\n{traceback.format_exc()}")
             await self.send_ephemeral_embed(interaction, "Reload Failed", f"Failed to reload extension `{extension_name}`: {e}", discord.Color.red())
 
+    @owner_only()
+    @app_commands.command(name="reload_changed", description="Reload only the extensions whose files changed")
+    async def reload_changed(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+        reloaded, failed = await self.bot.extension_watcher.reload_changed()
+        if not reloaded and not failed:
+            await self.send_ephemeral_embed(interaction, "Reload Changed", "No extension changed since it was loaded.")
+            return
+        lines = [f"Reloaded `{ext}`" for ext in reloaded]
+        lines += [f"Failed `{ext}`: {error} (previous version kept)" for ext, error in failed.items()]
+        color = discord.Color.red() if failed else discord.Color.green()
+        await self.send_ephemeral_embed(interaction, "Reload Changed", "\n".join(lines), color=color)
+        logging.info(f"Reloaded changed extensions: {reloaded}, failed: {list(failed)}")
+
     @owner_only()
     @app_commands.command(name="status", description="Change the bot's status")
     async def status(self, interaction: discord.Interaction, status: str):
@@ -132,59 +203,222 @@ class OwnerCog(commands.GroupCog, name="ownertools"):
             logging.error(f"Failed to change status: {e}\n{traceback.format_exc()}")
             await self.send_ephemeral_embed(interaction, "Status Change Failed", f"Failed to change status: {e}", discord.Color.red())
 
+    def cluster_label(self, cluster_id):
+        return f"[cluster {cluster_id}] " if self.bot.cluster.cluster_count > 1 else ""
+
+    async def broadcast_running(self):
+        statuses = await self.bot.cluster.gather('broadcast_status')
+        return any(isinstance(job, dict) and not job['done'] for job in statuses.values())
+
     @owner_only()
     @app_commands.command(name="broadcast", description="Broadcast a message to specified channels across all servers")
     async def broadcast(self, interaction: discord.Interaction, message: str, channel_name: str):
         await interaction.response.defer(ephemeral=True)
-        embed = discord.Embed(title="Broadcast Message", description=message, color=discord.Color.blue())
-        failed_guilds = []
+        if await self.broadcast_running():
+            await self.send_ephemeral_embed(interaction, "Broadcast Running", "Another broadcast is still running. Wait for it to finish first.", discord.Color.orange())
+            return
+        broadcast_id = await asyncio.to_thread(self.broadcasts.create, message, channel_name)
+        self.broadcast_task = asyncio.create_task(self.run_broadcast(interaction, broadcast_id, message, channel_name))
 
-        for guild in self.bot.guilds:
-            target_channel = discord.utils.get(guild.text_channels, name=channel_name)
-            if target_channel:
+    @owner_only()
+    @app_commands.command(name="broadcast_resume", description="Resume an interrupted broadcast")
+    async def broadcast_resume(self, interaction: discord.Interaction, broadcast_id: int = None):
+        await interaction.response.defer(ephemeral=True)
+        if await self.broadcast_running():
+            await self.send_ephemeral_embed(interaction, "Broadcast Running", "Another broadcast is still running. Wait for it to finish first.", discord.Color.orange())
+            return
+        if broadcast_id is None:
+            row = await asyncio.to_thread(self.broadcasts.latest_unfinished)
+        else:
+            row = await asyncio.to_thread(self.broadcasts.get, broadcast_id)
+        if row is None:
+            await self.send_ephemeral_embed(interaction, "Nothing To Resume", "No matching broadcast was found.", discord.Color.red())
+            return
+        broadcast_id, message, channel_name, _, _ = row
+        self.broadcast_task = asyncio.create_task(self.run_broadcast(interaction, broadcast_id, message, channel_name))
+
+    async def run_broadcast(self, interaction: discord.Interaction, broadcast_id: int, message: str, channel_name: str):
+        """Starts the broadcast on every cluster and reports their combined progress."""
+        started = time.monotonic()
+        launched = await self.bot.cluster.gather('broadcast_start', broadcast_id=broadcast_id, message=message, channel_name=channel_name)
+        unreachable = {cluster_id: str(result) for cluster_id, result in launched.items() if isinstance(result, Exception)}
+        jobs = {}
+
+        def progress_text(final=False):
+            counts = Counter()
+            for job in jobs.values():
+                counts.update(job['counts'])
+            total = sum(job['total'] for job in jobs.values())
+            already_sent = sum(job['already_sent'] for job in jobs.values())
+            elapsed = time.monotonic() - started
+            done = sum(counts.values())
+            rate = done / elapsed if elapsed > 0 else 0.0
+            state = "finished" if final else "running"
+            text = (f"Broadcast #{broadcast_id} {state}: {done}/{total} guilds processed "
+                    f"({already_sent} already sent earlier)\n"
+                    f"**Sent:** {counts['sent']} | **Channel missing:** {counts['missing']} | **Failed:** {counts['failed']}\n"
+                    f"**Throughput:** {rate:.1f} guilds/s over {elapsed:.0f}s")
+            if unreachable:
+                text += "\n**Clusters not reached:** " + ', '.join(f"{cluster_id} ({error})" for cluster_id, error in unreachable.items())
+            return text
+
+        async def poll():
+            # A cluster that restarted mid-broadcast no longer knows the job; count it as interrupted
+            statuses = await self.bot.cluster.gather('broadcast_status')
+            for cluster_id in launched:
+                if cluster_id in unreachable:
+                    continue
+                job = statuses.get(cluster_id)
+                if isinstance(job, dict) and job['id'] == broadcast_id:
+                    jobs[cluster_id] = job
+                elif not (cluster_id in jobs and jobs[cluster_id]['done']):
+                    unreachable[cluster_id] = "interrupted"
+            return all(job['done'] for cluster_id, job in jobs.items() if cluster_id not in unreachable)
+
+        progress = await interaction.followup.send(progress_text(), ephemeral=True, wait=True)
+        ticks = 0
+        while not await poll():
+            await asyncio.sleep(1)
+            ticks += 1
+            if ticks % 5 == 0:
                 try:
-                    await target_channel.send(embed=embed)
-                    logging.info(f"Sent broadcast message to {guild.name} in {target_channel.name}")
-                except Exception as e:
-                    logging.error(f"Failed to send message to {guild.name} in {target_channel.name}: {e}\n{traceback.format_exc()}")
-                    failed_guilds.append(guild.name)
-            else:
-                logging.warning(f"Channel {channel_name} not found in {guild.name}")
-                failed_guilds.append(guild.name)
-
-        if failed_guilds:
-            failed_guilds_str = ', '.join(failed_guilds)
-            await self.send_ephemeral_embed(interaction, "Broadcast Partially Failed", f"Failed to send message to the following guilds: {failed_guilds_str}", discord.Color.orange())
+                    await progress.edit(content=progress_text())
+                except discord.HTTPException:
+                    pass
+
+        if not unreachable:
+            # Left unfinished otherwise, so broadcast_resume can pick up the missing clusters
+            await asyncio.to_thread(self.broadcasts.finish, broadcast_id)
+        failed_guilds = [name for job in jobs.values() for name in job['failed_guilds']]
+        failed_count = sum(job['counts']['missing'] + job['counts']['failed'] for job in jobs.values())
+        logging.info(f"Broadcast {broadcast_id} finished on {len(jobs)} cluster(s)")
+        if failed_count or unreachable:
+            shown = ', '.join(failed_guilds[:50]) + (f" and {failed_count - 50} more" if failed_count > 50 else "")
+            embed = discord.Embed(title="Broadcast Partially Failed", description=f"{progress_text(final=True)}\n\nFailed to send message to the following guilds: {shown}"[:4096], color=discord.Color.orange())
         else:
-            await self.send_ephemeral_embed(interaction, "Broadcast Sent", "Broadcast message sent to all servers")
-            logging.info("Broadcast message sent to all servers")
+            embed = discord.Embed(title="Broadcast Sent", description=progress_text(final=True), color=discord.Color.blue())
+        try:
+            await interaction.followup.send(embed=embed, ephemeral=True)
+        except discord.HTTPException:
+            # The interaction token expires after 15 minutes; fall back to the owner's DMs
+            await interaction.user.send(embed=embed)
+
+    async def run_broadcast_job(self, job, message: str, channel_name: str):
+        """Delivers a broadcast to this cluster's guilds, recording each guild's outcome so the job can be resumed."""
+        broadcast_id = job['id']
+        embed = discord.Embed(title="Broadcast Message", description=message, color=discord.Color.blue())
+        already_sent = await asyncio.to_thread(self.broadcasts.sent_guilds, broadcast_id)
+        guilds = [guild for guild in self.bot.guilds if guild.id not in already_sent]
+        job['total'] = len(guilds)
+        job['already_sent'] = len(already_sent)
+        pending_rows = []
+
+        def note_failure(guild):
+            # Only the first few names travel with every status reply
+            if len(job['failed_guilds']) < 50:
+                job['failed_guilds'].append(guild.name)
+
+        async def deliver(guild):
+            target_channel = self.channel_index.get(guild, channel_name)
+            if target_channel is None:
+                return 'missing'
+            await target_channel.send(embed=embed)
+            return 'sent'
+
+        def on_result(guild, result):
+            if isinstance(result, Exception):
+                logging.error(f"Failed to send broadcast to {guild.name}: {result}")
+                job['counts']['failed'] += 1
+                note_failure(guild)
+                pending_rows.append((broadcast_id, guild.id, 'failed', str(result)))
+            else:
+                job['counts'][result] += 1
+                if result == 'missing':
+                    note_failure(guild)
+                pending_rows.append((broadcast_id, guild.id, result, None))
+
+        async def flush():
+            if pending_rows:
+                rows = pending_rows[:]
+                del pending_rows[:len(rows)]
+                await asyncio.to_thread(self.broadcasts.record, rows)
+
+        async def flush_periodically():
+            while True:
+                await asyncio.sleep(1)
+                await flush()
+
+        flusher = asyncio.create_task(flush_periodically())
+        try:
+            await run_bounded(guilds, deliver, concurrency=self.broadcast_concurrency, on_result=on_result)
+        finally:
+            flusher.cancel()
+            await flush()
+            job['done'] = True
+        logging.info(f"Broadcast {broadcast_id} finished on this cluster: {job['counts']}")
+
+    async def ipc_broadcast_start(self, broadcast_id: int, message: str, channel_name: str):
+        self.broadcast_job = {
+            'id': broadcast_id, 'total': 0, 'already_sent': 0,
+            'counts': {'sent': 0, 'missing': 0, 'failed': 0}, 'failed_guilds': [], 'done': False,
+        }
+        self.broadcast_job_task = asyncio.create_task(self.run_broadcast_job(self.broadcast_job, message, channel_name))
+        return True
+
+    async def ipc_broadcast_status(self):
+        return self.broadcast_job
+
+    async def ipc_list_guilds(self):
+        return [[guild.id, guild.name, guild.member_count] for guild in self.bot.guilds]
+
+    async def ipc_guild_info(self, guild_id: int):
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            return None
+        return {'name': guild.name, 'id': guild.id, 'member_count': guild.member_count,
+                'owner': str(guild.owner), 'created_at': str(guild.created_at), 'shard_id': guild.shard_id}
 
     @owner_only()
     @app_commands.command(name="list_guilds", description="List all guilds the bot is in")
     async def list_guilds(self, interaction: discord.Interaction):
-        guilds = '\n'.join([f"{guild.name} (ID: {guild.id}, Members: {guild.member_count})" for guild in self.bot.guilds])
-        await self.send_ephemeral_embed(interaction, "Guilds List", f"**Guilds:**\n{guilds}")
+        await interaction.response.defer(ephemeral=True)
+        lines = []
+        for cluster_id, guilds in (await self.bot.cluster.gather('list_guilds')).items():
+            if isinstance(guilds, Exception):
+                lines.append(f"{self.cluster_label(cluster_id)}unavailable: {guilds}")
+                continue
+            lines.extend(f"{self.cluster_label(cluster_id)}{name} (ID: {guild_id}, Members: {member_count})" for guild_id, name, member_count in guilds)
+        guilds = '\n'.join(lines)
+        await self.send_ephemeral_embed(interaction, "Guilds List", f"**Guilds:**\n{guilds}"[:4096])
         logging.info("Listed all guilds")
 
     @owner_only()
     @app_commands.command(name="guild_info", description="Get information about a specific guild")
     async def guild_info(self, interaction: discord.Interaction, guild_id: str):
+        await interaction.response.defer(ephemeral=True)
         try:
             guild_id = int(guild_id)
-            guild = self.bot.get_guild(guild_id)
-            if guild:
-                info = (f"**Guild Name:** {guild.name}\n"
-                        f"**ID:** {guild.id}\n"
-                        f"**Members:** {guild.member_count}\n"
-                        f"**Owner:** {guild.owner}\n"
-                        f"**Created At:** {guild.created_at}")
-                await self.send_ephemeral_embed(interaction, "Guild Information", info)
-                logging.info(f"Retrieved info for guild {guild.name}")
-            else:
-                await self.send_ephemeral_embed(interaction, "Guild Not Found", f"Guild with ID `{guild_id}` not found", discord.Color.red())
-                logging.warning(f"Guild with ID {guild_id} not found")
         except ValueError:
             await self.send_ephemeral_embed(interaction, "Invalid ID", "The provided guild ID is not a valid integer.", discord.Color.red())
+            return
+        # Only the cluster running the guild's shard knows it
+        results = await self.bot.cluster.gather('guild_info', guild_id=guild_id)
+        found = [(cluster_id, guild) for cluster_id, guild in results.items() if isinstance(guild, dict)]
+        if found:
+            cluster_id, guild = found[0]
+            info = (f"**Guild Name:** {guild['name']}\n"
+                    f"**ID:** {guild['id']}\n"
+                    f"**Members:** {guild['member_count']}\n"
+                    f"**Owner:** {guild['owner']}\n"
+                    f"**Created At:** {guild['created_at']}\n"
+                    f"**Shard:** {guild['shard_id']} (cluster {cluster_id})")
+            await self.send_ephemeral_embed(interaction, "Guild Information", info)
+            logging.info(f"Retrieved info for guild {guild['name']}")
+        else:
+            unavailable = [cluster_id for cluster_id, guild in results.items() if isinstance(guild, Exception)]
+            note = f" (clusters {', '.join(map(str, unavailable))} did not answer)" if unavailable else ""
+            await self.send_ephemeral_embed(interaction, "Guild Not Found", f"Guild with ID `{guild_id}` not found{note}", discord.Color.red())
+            logging.warning(f"Guild with ID {guild_id} not found")
 
     @owner_only()
     @app_commands.command(name="send_dm", description="Send a direct message to a user")
@@ -213,32 +447,193 @@ class OwnerCog(commands.GroupCog, name="ownertools"):
 
     @owner_only()
     @app_commands.command(name="prune_messages", description="Prune messages from a text channel")
-    async def prune_messages(self, interaction: discord.Interaction, channel_id: str, limit: int):
+    @app_commands.describe(
+        limit="How many of the newest messages to check (needed unless newer_than or a filter is given)",
+        author="Only messages by this user",
+        pattern="Only messages whose text matches this regular expression (case-insensitive)",
+        has_attachments="Only messages with (True) or without (False) attachments",
+        has_embeds="Only messages with (True) or without (False) embeds",
+        newer_than="Only messages newer than this, e.g. 2h or 7d",
+        older_than="Only messages older than this, e.g. 30m"
+    )
+    async def prune_messages(self, interaction: discord.Interaction, channel_id: str, limit: app_commands.Range[int, 1] = None,
+                             author: discord.User = None, pattern: str = None, has_attachments: bool = None, has_embeds: bool = None,
+                             newer_than: str = None, older_than: str = None):
         await interaction.response.defer(ephemeral=True)
         try:
             channel_id = int(channel_id)
-            channel = self.bot.get_channel(channel_id)
-            if channel and isinstance(channel, discord.TextChannel):
-                deleted = await channel.purge(limit=limit)
-                embed = discord.Embed(
-                    title="Messages Pruned",
-                    description=f"Deleted {len(deleted)} messages from {channel.mention}",
-                    color=discord.Color.green()
-                )
-                await self.send_ephemeral_embed(interaction, embed=embed)
-                logging.info(f"Pruned {len(deleted)} messages from {channel.name}")
-            else:
-                await self.send_ephemeral_embed(interaction, title="Channel Not Found", description=f"Text channel with ID `{channel_id}` not found", color=discord.Color.red())
-                logging.warning(f"Text channel with ID {channel_id} not found")
         except ValueError:
             await self.send_ephemeral_embed(interaction, title="Invalid ID", description="The provided channel ID is not a valid integer.", color=discord.Color.red())
+            return
+        if limit is None and newer_than is None and author is None and pattern is None and has_attachments is None and has_embeds is None:
+            # Nothing would bound the prune, so it would wipe the whole channel history
+            await self.send_ephemeral_embed(interaction, title="Prune Too Broad",
+                                            description="Give a `limit`, a `newer_than` window or at least one filter.", color=discord.Color.red())
+            return
+        channel = self.bot.get_channel(channel_id)
+        if not isinstance(channel, discord.TextChannel):
+            await self.send_ephemeral_embed(interaction, title="Channel Not Found", description=f"Text channel with ID `{channel_id}` not found", color=discord.Color.red())
+            logging.warning(f"Text channel with ID {channel_id} not found")
+            return
+        if channel_id in self.prune_tasks:
+            await self.send_ephemeral_embed(interaction, title="Prune Running", description=f"A prune of {channel.mention} is already running.", color=discord.Color.orange())
+            return
+        try:
+            now = discord.utils.utcnow()
+            after = now - parse_duration(newer_than) if newer_than else None
+            before = now - parse_duration(older_than) if older_than else None
+            message_filter = PruneFilter(author.id if author else None, pattern, has_attachments, has_embeds)
+        except ValueError as e:
+            # re.error is a ValueError too
+            await self.send_ephemeral_embed(interaction, title="Invalid Filter", description=str(e), color=discord.Color.red())
+            return
+
+        job = PruneJob(channel, message_filter, limit, after, before, self.bot.config.owner_tools.prune_delete_interval)
+        self.prune_tasks[channel_id] = asyncio.create_task(self.run_prune(interaction, job))
+
+    async def run_prune(self, interaction: discord.Interaction, job: PruneJob):
+        """Runs a prune in the background, editing a progress message until it finishes."""
+        channel = job.channel
+        started = time.monotonic()
+
+        def progress_text(state="running"):
+            return (f"Prune of {channel.mention} {state}: {job.scanned} messages checked, {job.matched} matched\n"
+                    f"**Deleted:** {job.deleted} | **Failed:** {job.failed} | **Elapsed:** {time.monotonic() - started:.0f}s")
+
+        task = asyncio.create_task(job.run())
+        try:
+            progress = await interaction.followup.send(progress_text(), ephemeral=True, wait=True)
+            while not task.done():
+                await asyncio.wait({task}, timeout=5)
+                if not task.done():
+                    try:
+                        await progress.edit(content=progress_text())
+                    except discord.HTTPException:
+                        pass
+            task.result()
+            logging.info(f"Pruned {job.deleted} messages from {channel.name} ({job.scanned} checked, {job.failed} failed)")
+            embed = discord.Embed(
+                title="Messages Pruned",
+                description=progress_text("finished"),
+                color=discord.Color.green() if not job.failed else discord.Color.orange()
+            )
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
         except Exception as e:
+            task.cancel()
             logging.error(f"Failed to prune messages: {e}\n{traceback.format_exc()}")
-            await self.send_ephemeral_embed(interaction, title="Prune Failed", description=f"Failed to prune messages: {e}", color=discord.Color.red())
-        
-    @app_commands.command(name="scan_issues", description="Scan issues with the bot's script or dependencies")
-    async def scan_issues(self, interaction: discord.Interaction):
-        await interaction.response.defer(ephemeral=True)
+            embed = discord.Embed(title="Prune Failed", description=f"{progress_text('stopped')}\n\nError: {e}", color=discord.Color.red())
+        finally:
+            self.prune_tasks.pop(channel.id, None)
+        try:
+            await interaction.followup.send(embed=embed, ephemeral=True)
+        except discord.HTTPException:
+            # The interaction token expires after 15 minutes; fall back to the owner's DMs
+            await interaction.user.send(embed=embed)
+
+    @owner_only()
+    @app_commands.command(name="metrics", description="Show sampled system metrics and command latencies")
+    async def metrics(self, interaction: discord.Interaction, minutes: app_commands.Range[int, 1, 1440] = 15):
+        embed = discord.Embed(title=f"System Metrics (last {minutes} min)", color=discord.Color.blue())
+        sampler = self.bot.system_metrics
+        if sampler is None:
+            embed.description = "System metrics are not being sampled."
+        else:
+            for name, stats in sampler.summary(minutes).items():
+                unit = sampler.METRICS[name]
+                if stats is None:
+                    value = "No samples"
+                else:
+                    low, avg, p95 = stats
+                    value = f"min {low:.1f}{unit} / avg {avg:.1f}{unit} / p95 {p95:.1f}{unit}"
+                embed.add_field(name=name, value=value, inline=False)
+
+        # Command latencies are cumulative since startup; bucket bounds make p50/p99 upper estimates
+        def fmt(seconds):
+            return "-" if seconds is None else f"≤{seconds * 1000:.0f}ms"
+
+        command_stats = sorted(self.bot.tree.command_metrics.commands.items(), key=lambda item: item[1].count, reverse=True)
+        lines = [f"`{name}` n={stats.count} err={stats.errors} cd={stats.cooldowns} "
+                 f"first p50 {fmt(stats.first_response.quantile(0.5))} p99 {fmt(stats.first_response.quantile(0.99))}"
+                 for name, stats in command_stats[:10]]
+        embed.add_field(name="Commands (since startup)", value="\n".join(lines)[:1024] or "No commands run yet.", inline=False)
+
+        limiter = self.bot.rate_limits
+        rejections = ", ".join(f"{rule.name}: {limiter.rejections[rule.name]}" for rule in limiter.rules) or "no rules"
+        embed.add_field(name="Rate limits", value=f"{len(limiter)} active buckets; rejected {rejections}", inline=False)
+
+        automod = self.bot.get_cog("automod")
+        if automod is not None and automod.tasks:
+            stats = automod.stats
+            embed.add_field(
+                name="Automod",
+                value=(f"{stats['checked']} checked, {stats['term']} banned terms, {stats['flood']} floods, {stats['duplicate']} duplicates, "
+                       f"{stats['exempt']} exempt, {stats['dropped']} dropped; {automod.actions.qsize()} queued, {len(automod.engine)} members tracked"),
+                inline=False
+            )
+
+        utils_cog = self.bot.get_cog("utils")
+        if utils_cog is not None:
+            cache = utils_cog.render_cache
+            lookups = cache.hits + cache.misses
+            hit_rate = cache.hits / lookups * 100 if lookups else 0.0
+            embed.add_field(
+                name="Info embed cache",
+                value=(f"{len(cache)}/{cache.max_entries} entries, {cache.hits} hits / {cache.misses} misses ({hit_rate:.1f}%), "
+                       f"{cache.invalidations} invalidated, {cache.evictions} evicted"),
+                inline=False
+            )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @owner_only()
+    @app_commands.command(name="loop_health", description="Show event-loop lag and the code that blocked the loop")
+    async def loop_health(self, interaction: discord.Interaction, minutes: app_commands.Range[int, 1, 1440] = 15):
+        monitor = self.bot.loop_monitor
+        if monitor is None:
+            await interaction.response.send_message("The loop monitor is not running.", ephemeral=True)
+            return
+        embed = discord.Embed(title=f"Event Loop Health (last {minutes} min)", color=discord.Color.blue())
+        lag = monitor.lag_percentiles(minutes)
+        if lag is None:
+            embed.description = "No lag samples yet."
+        else:
+            p50, p95, p99, worst = lag
+            embed.description = f"**Lag:** p50 {p50:.1f}ms / p95 {p95:.1f}ms / p99 {p99:.1f}ms / max {worst:.1f}ms"
+            if p99 >= monitor.threshold * 1000:
+                embed.color = discord.Color.orange()
+        for stalls, total, worst, stack in monitor.top_offenders():
+            embed.add_field(
+                name=f"{stalls} stalls, {total:.0f}ms total, worst {worst:.0f}ms",
+                value=f"```\n{stack[-950:]}\n```",
+                inline=False
+            )
+        if not embed.fields:
+            embed.add_field(name="Offenders", value=f"Nothing has blocked the loop for more than {monitor.threshold * 1000:.0f}ms.", inline=False)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @owner_only()
+    @app_commands.command(name="startup_report", description="Show the startup timeline as a JSON report")
+    async def startup_report(self, interaction: discord.Interaction):
+        report = self.bot.startup.report()
+        marks = report['marks_ms']
+        slowest = sorted(report['phases'], key=lambda phase: phase['duration_ms'], reverse=True)[:10]
+        description = "\n".join(f"**{name}:** {offset:.0f}ms" for name, offset in marks.items())
+        embed = discord.Embed(title="Startup Timeline", description=description or "No marks recorded.", color=discord.Color.blue())
+        embed.add_field(
+            name="Slowest phases",
+            value="\n".join(f"`{phase['name']}` {phase['duration_ms']:.0f}ms" for phase in slowest)[:1024] or "None",
+            inline=False
+        )
+        report_file = discord.File(io.BytesIO(json.dumps(report, indent=2).encode()), filename="startup_timeline.json")
+        await interaction.response.send_message(embed=embed, file=report_file, ephemeral=True)
+
+    async def ipc_scan_issues(self):
+        issues, status_messages = await self.collect_issues()
+        return {'issues': issues, 'status': status_messages}
+
+    async def collect_issues(self):
+        """Runs the scan_issues checks for this process; returns ``(issues, status_messages)``."""
         issues = []
         status_messages = []
 
@@ -267,68 +662,77 @@ class OwnerCog(commands.GroupCog, name="ownertools"):
             issues.append(f"Basic health check failed: {summarize_error(error_message)}")
             issues.append(f"Full error: {error_message}")
 
-        # Check recent errors in log file
-        log_file_path = 'logs/bot.log'  # Change this to the actual path of your log file
-        try:
-            if os.path.exists(log_file_path):
-                with open(log_file_path, 'r') as log_file:
-                    log_lines = log_file.readlines()
-                    one_hour_ago = datetime.now() - timedelta(hours=1)
-                    recent_errors = []
-                    for line in log_lines:
-                        if "ERROR" in line:
-                            try:
-                                log_time_str = line.split(' ')[0] + ' ' + line.split(' ')[1]
-                                log_time = datetime.strptime(log_time_str, "%Y-%m-%d %H:%M:%S,%f")
-                                if log_time > one_hour_ago:
-                                    recent_errors.append(line[:100])
-                            except ValueError as e:
-                                issues.append(f"Error parsing log time: {log_time_str} - {str(e)}")
-                    if recent_errors:
-                        issues.append(f"**Recent Errors in Last Hour:**\n```\n{''.join(recent_errors)}\n```")
-                    else:
-                        status_messages.append("No recent errors in the last hour.")
-            else:
-                issues.append("Log file not found.")
-        except Exception as e:
-            error_message = str(e)
-            issues.append(f"Error checking log file: {summarize_error(error_message)}")
-            issues.append(f"Full error: {error_message}")
+        # Check recent errors from the in-memory error index
+        recent_errors = self.bot.recent_errors.recent(3600)
+        if recent_errors:
+            lines = []
+            for count, last_seen, level, logger_name, message in recent_errors:
+                repeat = f" (x{count})" if count > 1 else ""
+                lines.append(f"{datetime.fromtimestamp(last_seen):%H:%M:%S} {logger_name}: {message[:100]}{repeat}\n")
+            listing = ''.join(lines)[:950]
+            issues.append(f"**Recent Errors in Last Hour:**\n```\n{listing}\n```")
+        else:
+            status_messages.append("No recent errors in the last hour.")
+        noisiest = self.bot.recent_errors.counts.most_common(5)
+        if noisiest:
+            counts = ', '.join(f"{name} {level}: {count}" for (name, level), count in noisiest)
+            status_messages.append(f"Warnings/errors since startup: {counts}"[:1000])
+        dropped_logs = self.bot.log_queue.dropped
+        if dropped_logs:
+            issues.append(f"{dropped_logs} log records were dropped because the logging queue was full.")
 
         # Advanced checks
 
-        # Check CPU usage
-        cpu_usage = psutil.cpu_percent(interval=1)
-        if cpu_usage > 80:
-            issues.append(f"High CPU usage detected: {cpu_usage}%")
+        # Resource checks read the latest background samples instead of calling psutil on the loop
+        metrics = self.bot.system_metrics
+        cpu_usage = metrics.last('cpu_percent') if metrics else None
+        if cpu_usage is None:
+            status_messages.append("System metrics have not been sampled yet.")
         else:
-            status_messages.append(f"CPU usage is within acceptable limits: {cpu_usage}%")
+            # Check CPU usage
+            if cpu_usage > 80:
+                issues.append(f"High CPU usage detected: {cpu_usage}%")
+            else:
+                status_messages.append(f"CPU usage is within acceptable limits: {cpu_usage}%")
 
-        # Check memory usage
-        memory_info = psutil.virtual_memory()
-        if memory_info.percent > 80:
-            issues.append(f"High memory usage detected: {memory_info.percent}%")
-        else:
-            status_messages.append(f"Memory usage is within acceptable limits: {memory_info.percent}%")
+            # Check memory usage
+            memory_percent = metrics.last('memory_percent')
+            if memory_percent > 80:
+                issues.append(f"High memory usage detected: {memory_percent}%")
+            else:
+                status_messages.append(f"Memory usage is within acceptable limits: {memory_percent}%")
 
-        # Check disk space
-        disk_info = psutil.disk_usage('/')
-        if disk_info.percent > 80:
-            issues.append(f"Low disk space detected: {disk_info.percent}% used")
-        else:
-            status_messages.append(f"Disk space is within acceptable limits: {disk_info.percent}% used")
+            # Check disk space
+            disk_percent = metrics.last('disk_percent')
+            if disk_percent > 80:
+                issues.append(f"Low disk space detected: {disk_percent}% used")
+            else:
+                status_messages.append(f"Disk space is within acceptable limits: {disk_percent}% used")
 
-        # Check active connections
-        connections = psutil.net_connections()
-        if not connections:
-            issues.append("No active network connections found.")
-        else:
-            status_messages.append(f"Active network connections found: {len(connections)}")
+            # Check active connections
+            connections = int(metrics.last('connections'))
+            if not connections:
+                issues.append("No active network connections found.")
+            else:
+                status_messages.append(f"Active network connections found: {connections}")
 
         # Check uptime
         uptime_seconds = (datetime.now() - datetime.fromtimestamp(psutil.boot_time())).total_seconds()
         uptime_str = str(timedelta(seconds=uptime_seconds))
         status_messages.append(f"System uptime: {uptime_str}")
+        return issues, status_messages
+
+    @app_commands.command(name="scan_issues", description="Scan issues with the bot's script or dependencies")
+    async def scan_issues(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+        issues = []
+        status_by_cluster = {}
+        for cluster_id, result in (await self.bot.cluster.gather('scan_issues')).items():
+            if isinstance(result, Exception):
+                issues.append(f"{self.cluster_label(cluster_id)}Cluster did not answer: {result}")
+                continue
+            issues.extend(f"{self.cluster_label(cluster_id)}{issue}" for issue in result['issues'])
+            status_by_cluster[cluster_id] = result['status']
 
         # Determine embed color based on issues
         embed_color = discord.Color.green() if not issues else discord.Color.red()
@@ -338,11 +742,16 @@ class OwnerCog(commands.GroupCog, name="ownertools"):
         if not issues:  # No issues found
             embed.add_field(name="Status", value="Everything is good.", inline=False)
         else:
-            for issue in issues:
-                embed.add_field(name="Issue", value=issue, inline=False)
+            for issue in issues[:20]:
+                embed.add_field(name="Issue", value=issue[:1024], inline=False)
 
-        for status in status_messages:
-            embed.add_field(name="Status", value=status, inline=False)
+        if self.bot.cluster.cluster_count > 1:
+            # One field per cluster keeps the embed under Discord's 25 field limit
+            for cluster_id, status_messages in status_by_cluster.items():
+                embed.add_field(name=f"Status (cluster {cluster_id})", value="\n".join(status_messages)[:1024], inline=False)
+        else:
+            for status in status_by_cluster.get(self.bot.cluster.cluster_id, []):
+                embed.add_field(name="Status", value=status, inline=False)
 
         await interaction.followup.send(embed=embed, ephemeral=True)
         logging.info("Listed bot issues")
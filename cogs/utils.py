@@ -2,15 +2,202 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import logging
-import asyncio
 import re
+import time
+from core.guild_stats import GuildStatsIndex
+from core.polls import Poll, PollManager, PollStore
+from core.reminders import ReminderScheduler, ReminderStore
+from core.render_cache import RenderCache
+
+class PollButton(discord.ui.DynamicItem[discord.ui.Button], template=r'poll:(?P<poll_id>[0-9]+):(?P<option>[0-9]+)'):
+    """Vote button; the poll and option live in the custom id, so buttons keep working after a restart."""
+
+    def __init__(self, poll_id: int, option: int, label: str = None):
+        super().__init__(discord.ui.Button(
+            label=label or str(option + 1),
+            style=discord.ButtonStyle.secondary,
+            custom_id=f'poll:{poll_id}:{option}'
+        ))
+        self.poll_id = poll_id
+        self.option = option
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(int(match['poll_id']), int(match['option']))
+
+    async def callback(self, interaction: discord.Interaction):
+        cog = interaction.client.get_cog("utils")
+        result = cog.polls.vote(self.poll_id, interaction.user.id, self.option) if cog and cog.polls else None
+        if result is None:
+            await interaction.response.send_message("This poll is closed.", ephemeral=True)
+            return
+        poll, choice = result
+        if poll.message_id is None and interaction.message:
+            poll.message_id = interaction.message.id
+        if choice is None:
+            await interaction.response.send_message("Your vote was removed.", ephemeral=True)
+        else:
+            await interaction.response.send_message(f"You voted for **{poll.options[choice]}**.", ephemeral=True)
 
 class UtilsCog(commands.GroupCog, name="utils"):
     def __init__(self, bot):
         super().__init__()
         self.bot = bot
+        self.reminders = None
+        self.polls = None
+        self.guild_stats = GuildStatsIndex()
+        self.render_cache = RenderCache(
+            max_entries=bot.config.utils.render_cache_size,
+            ttl=bot.config.utils.render_cache_ttl
+        )
         logging.debug("UtilsCog initialized")
 
+    async def cog_load(self):
+        # Shared by all clusters; each one schedules only the reminders of its own guilds
+        self.reminders = ReminderScheduler(ReminderStore(self.bot.data_path('reminders.db', shared=True)), self.deliver_reminder,
+                                           owns_guild=self.bot.cluster.owns_guild)
+        await self.reminders.start()
+        self.polls = PollManager(
+            PollStore(self.bot.data_path('polls.db', shared=True)),
+            self.render_poll,
+            self.finish_poll,
+            edit_interval=self.bot.config.utils.poll_edit_interval,
+            snapshot_interval=self.bot.config.utils.poll_snapshot_interval,
+            owns_guild=self.bot.cluster.owns_guild
+        )
+        await self.polls.start()
+        self.bot.add_dynamic_items(PollButton)
+
+    async def cog_unload(self):
+        self.bot.remove_dynamic_items(PollButton)
+        if self.reminders:
+            await self.reminders.stop()
+        if self.polls:
+            await self.polls.stop()
+
+    def poll_embed(self, poll: Poll, closed: bool = False):
+        total = poll.total
+        embed = discord.Embed(
+            title="Poll (closed)" if closed else "Poll",
+            description=poll.question if closed else f"{poll.question}\nCloses <t:{int(poll.closes_at)}:R>",
+            color=discord.Color.greyple() if closed else discord.Color.blurple()
+        )
+        for idx, (option, count) in enumerate(zip(poll.options, poll.counts), start=1):
+            share = count / total if total else 0.0
+            filled = round(share * 10)
+            embed.add_field(name=f"{idx}. {option}", value=f"{'█' * filled}{'░' * (10 - filled)} {count} ({share:.0%})", inline=False)
+        embed.set_footer(text=f"{total} vote{'s' if total != 1 else ''}")
+        return embed
+
+    def poll_message(self, poll: Poll):
+        return self.bot.get_partial_messageable(poll.channel_id, guild_id=poll.guild_id).get_partial_message(poll.message_id)
+
+    async def render_poll(self, poll: Poll):
+        if poll.message_id is not None:
+            await self.poll_message(poll).edit(embed=self.poll_embed(poll))
+
+    async def finish_poll(self, poll: Poll):
+        if poll.message_id is None:
+            return
+        message = self.poll_message(poll)
+        await message.edit(embed=self.poll_embed(poll, closed=True), view=None)
+        top = max(poll.counts) if poll.total else 0
+        if top:
+            winners = [option for option, count in zip(poll.options, poll.counts) if count == top]
+            result = f"**{' / '.join(winners)}** with {top} of {poll.total} votes"
+        else:
+            result = "no votes"
+        await message.reply(f"Poll closed: {poll.question} — {result}.", mention_author=False)
+
+    async def deliver_reminder(self, reminder):
+        """Sends a due reminder to its original channel, falling back to the user's DMs."""
+        await self.bot.wait_until_ready()
+        allowed_mentions = discord.AllowedMentions(everyone=False, roles=False, users=[discord.Object(reminder.user_id)])
+        channel = self.bot.get_channel(reminder.channel_id) if reminder.channel_id else None
+        if channel is not None:
+            try:
+                await channel.send(f"<@{reminder.user_id}> Reminder: {reminder.message}", allowed_mentions=allowed_mentions)
+                return
+            except discord.HTTPException as e:
+                logging.warning(f"Failed to send reminder {reminder.id} to channel {reminder.channel_id}: {e}")
+
+        user = self.bot.get_user(reminder.user_id) or await self.bot.fetch_user(reminder.user_id)
+        await user.send(f"Reminder: {reminder.message}")
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        self.guild_stats.member_join(member)
+        self.invalidate_member_counts(member)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        self.guild_stats.member_remove(member)
+        self.invalidate_member_counts(member)
+
+    def invalidate_member_counts(self, member: discord.Member):
+        # Server and role embeds show member counts; only those embeds, not every member's, go stale
+        self.render_cache.invalidate(('member_count', member.guild.id))
+        for role_id in member._roles:
+            self.render_cache.invalidate(('role', role_id))
+
+    @commands.Cog.listener()
+    async def on_presence_update(self, before: discord.Member, after: discord.Member):
+        self.guild_stats.presence_update(before, after)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        self.guild_stats.member_update(before, after)
+        self.render_cache.invalidate(('member', after.guild.id, after.id))
+        for role_id in set(before._roles).symmetric_difference(after._roles):
+            self.render_cache.invalidate(('role', role_id))
+
+    @commands.Cog.listener()
+    async def on_user_update(self, before: discord.User, after: discord.User):
+        self.render_cache.invalidate(('user', after.id))
+
+    @commands.Cog.listener()
+    async def on_guild_update(self, before: discord.Guild, after: discord.Guild):
+        self.render_cache.invalidate(('guild', after.id))
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role):
+        self.render_cache.invalidate(('guild', role.guild.id))
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        # Role names and colours show up in server, user and role embeds alike
+        self.render_cache.invalidate(('guild', after.guild.id))
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        self.guild_stats.role_delete(role)
+        self.render_cache.invalidate(('guild', role.guild.id))
+
+    def cached_embed(self, key, tags, build):
+        """Returns a fresh Embed from the render cache, building and storing it on a miss."""
+        payload = self.render_cache.get(key)
+        if payload is None:
+            payload = build().to_dict()
+            self.render_cache.put(key, payload, tags)
+        return discord.Embed.from_dict(payload)
+
+    @staticmethod
+    def requester_footer(embed: discord.Embed, user):
+        avatar_url = user.avatar.url if user.avatar else user.default_avatar.url
+        embed.set_footer(text=f"Requested by {user}", icon_url=str(avatar_url))
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel):
+        self.guild_stats.channel_change(channel, 1)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        self.guild_stats.channel_change(channel, -1)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.guild_stats.drop(guild.id)
+
     def parse_time(self, time_str: str) -> int:
         match = re.match(r"(\d+)([smhd])", time_str)
         if not match:
@@ -28,7 +215,6 @@ class UtilsCog(commands.GroupCog, name="utils"):
         return None
 
     @app_commands.command(name="remindme", description="Set a reminder")
-    @app_commands.checks.cooldown(1, 5.0, key=lambda i: i.user.id)
     async def remindme(self, interaction: discord.Interaction, time: str, *, message: str):
         """Sets a reminder for the user."""
         if any(re.findall(r"@everyone|@here|<@&\d+>|<@!\d+>", message)):
@@ -42,45 +228,45 @@ class UtilsCog(commands.GroupCog, name="utils"):
             return
 
         try:
+            await self.reminders.add(seconds, interaction.user.id, interaction.channel_id, message, interaction.guild_id)
             await interaction.response.send_message(f"Reminder set for {time}.", ephemeral=True)
-            await asyncio.sleep(seconds)
-            await interaction.followup.send(f"Reminder: {message}")
         except Exception as e:
             logging.exception("Failed to set reminder")
-            await interaction.followup.send(f"An error occurred while setting the reminder: {e}", ephemeral=True)
+            if not interaction.response.is_done():
+                await interaction.response.send_message(f"An error occurred while setting the reminder: {e}", ephemeral=True)
 
     @app_commands.command(name="poll", description="Create a poll")
-    @app_commands.checks.cooldown(1, 5.0, key=lambda i: i.user.id)
-    async def poll(self, interaction: discord.Interaction, question: str, option1: str, option2: str, option3: str = None, option4: str = None, option5: str = None, option6: str = None, option7: str = None, option8: str = None, option9: str = None, option10: str = None):
-        """Creates a poll with up to 10 options."""
+    @app_commands.describe(duration="Minutes until the poll closes")
+    async def poll(self, interaction: discord.Interaction, question: str, option1: str, option2: str, option3: str = None, option4: str = None, option5: str = None, option6: str = None, option7: str = None, option8: str = None, option9: str = None, option10: str = None, duration: app_commands.Range[int, 1, 43200] = None):
+        """Creates a poll with up to 10 options, voted on with buttons."""
         options = [option for option in [option1, option2, option3, option4, option5, option6, option7, option8, option9, option10] if option is not None]
         if len(options) < 2:
             await interaction.response.send_message("Poll must have at least 2 options.", ephemeral=True)
             return
 
-        embed = discord.Embed(title="Poll", description=question, color=discord.Color.blurple())
-        for idx, option in enumerate(options, start=1):
-            embed.add_field(name=f"Option {idx}", value=option, inline=False)
-        
+        minutes = duration or self.bot.config.utils.poll_default_duration
+        poll = Poll(interaction.id, interaction.guild_id, interaction.channel_id, interaction.user.id, question, options, time.time() + minutes * 60)
+        view = discord.ui.View(timeout=None)
+        for idx, option in enumerate(options):
+            view.add_item(PollButton(poll.id, idx, f"{idx + 1}. {option}"[:80]))
+        # Open for votes before the message is visible; the first vote fills in the message id if needed
+        self.polls.add(poll)
         try:
-            await interaction.response.send_message(embed=embed)
-            message = await interaction.original_response()
-            if message:
-                reactions = ['1️⃣', '2️⃣', '3️⃣', '4️⃣', '5️⃣', '6️⃣', '7️⃣', '8️⃣', '9️⃣', '🔟']
-                for reaction in reactions[:len(options)]:
-                    await message.add_reaction(reaction)
-                await interaction.followup.send("Poll created successfully!", ephemeral=True)
-            else:
-                await interaction.followup.send("Failed to create poll. Please try again.", ephemeral=True)
+            await interaction.response.send_message(embed=self.poll_embed(poll), view=view)
+            poll.message_id = (await interaction.original_response()).id
+            await self.polls.save(poll)
         except Exception as e:
             logging.exception("Failed to create poll")
-            await interaction.followup.send(f"An error occurred while creating the poll: {e}", ephemeral=True)
+            self.polls.discard(poll.id)
+            if interaction.response.is_done():
+                await interaction.followup.send(f"An error occurred while creating the poll: {e}", ephemeral=True)
+            else:
+                await interaction.response.send_message(f"An error occurred while creating the poll: {e}", ephemeral=True)
 
     @app_commands.command(name="userinfo", description="Get information about a user")
-    @app_commands.checks.cooldown(1, 5.0, key=lambda i: i.user.id)
     async def userinfo(self, interaction: discord.Interaction, member: discord.Member):
         """Gets information about a specific user."""
-        try:
+        def build():
             embed = discord.Embed(title=f"{member.name}'s Info", color=discord.Color.blue())
             avatar_url = member.avatar.url if member.avatar else member.default_avatar.url
             embed.set_thumbnail(url=avatar_url)
@@ -88,18 +274,22 @@ class UtilsCog(commands.GroupCog, name="utils"):
             embed.add_field(name="Joined", value=member.joined_at.strftime("%Y-%m-%d %H:%M:%S"), inline=False)
             embed.add_field(name="Account Created", value=member.created_at.strftime("%Y-%m-%d %H:%M:%S"), inline=False)
             embed.add_field(name="Roles", value=", ".join([role.name for role in member.roles if role.name != "@everyone"]), inline=False)
-            embed.set_footer(text=f"Requested by {interaction.user}", icon_url=interaction.user.avatar.url if interaction.user.avatar else interaction.user.default_avatar.url)
+            return embed
+
+        try:
+            tags = (('guild', member.guild.id), ('member', member.guild.id, member.id), ('user', member.id))
+            embed = self.cached_embed(('userinfo', member.guild.id, member.id), tags, build)
+            self.requester_footer(embed, interaction.user)
             await interaction.response.send_message(embed=embed, ephemeral=True)
         except Exception as e:
             logging.exception("Failed to get user info")
             await interaction.response.send_message(f"An error occurred while retrieving user info: {e}", ephemeral=True)
 
     @app_commands.command(name="serverinfo", description="Get information about the server")
-    @app_commands.checks.cooldown(1, 5.0, key=lambda i: i.user.id)
     async def serverinfo(self, interaction: discord.Interaction):
         """Gets information about the server."""
         guild = interaction.guild
-        try:
+        def build():
             embed = discord.Embed(title=f"{guild.name}'s Info", color=discord.Color.green())
             icon_url = str(guild.icon.url) if guild.icon else ""
             embed.set_thumbnail(url=icon_url)
@@ -108,45 +298,50 @@ class UtilsCog(commands.GroupCog, name="utils"):
             embed.add_field(name="Member Count", value=guild.member_count, inline=False)
             embed.add_field(name="Roles", value=", ".join([role.name for role in guild.roles if role.name != "@everyone"]), inline=False)
             embed.add_field(name="Created On", value=guild.created_at.strftime("%Y-%m-%d %H:%M:%S"), inline=False)
-            user_avatar_url = str(interaction.user.avatar.url) if interaction.user.avatar else str(interaction.user.default_avatar.url)
-            embed.set_footer(text=f"Requested by {interaction.user}", icon_url=user_avatar_url)
+            return embed
+
+        try:
+            embed = self.cached_embed(('serverinfo', guild.id), (('guild', guild.id), ('member_count', guild.id)), build)
+            self.requester_footer(embed, interaction.user)
             await interaction.response.send_message(embed=embed)
         except Exception as e:
             logging.exception("Failed to get server info")
             await interaction.response.send_message(f"An error occurred while retrieving server info: {e}", ephemeral=True)
 
     @app_commands.command(name="avatar", description="Get the avatar of a user")
-    @app_commands.checks.cooldown(1, 5.0, key=lambda i: i.user.id)
     async def avatar(self, interaction: discord.Interaction, member: discord.Member):
         """Gets the avatar of a specific user."""
-        try:
+        def build():
             avatar_url = member.avatar.url if member.avatar else member.default_avatar.url
             embed = discord.Embed(title=f"{member.name}'s Avatar", color=discord.Color.purple())
             embed.set_image(url=avatar_url)
+            return embed
+
+        try:
+            tags = (('member', member.guild.id, member.id), ('user', member.id))
+            embed = self.cached_embed(('avatar', member.guild.id, member.id), tags, build)
             await interaction.response.send_message(embed=embed, ephemeral=True)
         except Exception as e:
             logging.exception("Failed to get avatar")
             await interaction.response.send_message(f"An error occurred while retrieving the avatar: {e}", ephemeral=True)
 
     @app_commands.command(name="ping", description="Check the bot's latency")
-    @app_commands.checks.cooldown(1, 5.0, key=lambda i: i.user.id)
     async def ping(self, interaction: discord.Interaction):
         """Checks the bot's latency."""
         latency = self.bot.latency * 1000  # Convert to milliseconds
         await interaction.response.send_message(f"Pong! Latency is {latency:.2f}ms", ephemeral=True)
 
     @app_commands.command(name="serverstats", description="Get server statistics")
-    @app_commands.checks.cooldown(1, 5.0, key=lambda i: i.user.id)
     async def serverstats(self, interaction: discord.Interaction):
         """Gets server statistics."""
         guild = interaction.guild
         try:
+            stats = self.guild_stats.get(guild)
             embed = discord.Embed(title=f"{guild.name}'s Statistics", color=discord.Color.orange())
             embed.add_field(name="Total Members", value=guild.member_count, inline=False)
-            online_members = sum(1 for member in guild.members if member.status != discord.Status.offline)
-            embed.add_field(name="Online Members", value=online_members, inline=False)
-            embed.add_field(name="Text Channels", value=len(guild.text_channels), inline=False)
-            embed.add_field(name="Voice Channels", value=len(guild.voice_channels), inline=False)
+            embed.add_field(name="Online Members", value=stats.online, inline=False)
+            embed.add_field(name="Text Channels", value=stats.text_channels, inline=False)
+            embed.add_field(name="Voice Channels", value=stats.voice_channels, inline=False)
             embed.add_field(name="Roles", value=len(guild.roles), inline=False)
             embed.set_footer(text=f"Requested by {interaction.user}", icon_url=interaction.user.avatar.url if interaction.user.avatar else interaction.user.default_avatar.url)
             await interaction.response.send_message(embed=embed)
@@ -155,18 +350,21 @@ class UtilsCog(commands.GroupCog, name="utils"):
             await interaction.response.send_message(f"An error occurred while retrieving server stats: {e}", ephemeral=True)
 
     @app_commands.command(name="roleinfo", description="Get information about a role")
-    @app_commands.checks.cooldown(1, 5.0, key=lambda i: i.user.id)
     async def roleinfo(self, interaction: discord.Interaction, role: discord.Role):
         """Gets information about a specific role."""
-        try:
+        def build():
             embed = discord.Embed(title=f"{role.name} Role Info", color=role.color)
             embed.add_field(name="ID", value=role.id, inline=False)
             embed.add_field(name="Color", value=str(role.color), inline=False)
             embed.add_field(name="Position", value=role.position, inline=False)
             embed.add_field(name="Mentionable", value=role.mentionable, inline=False)
-            embed.add_field(name="Members", value=len(role.members), inline=False)
-            user_avatar_url = str(interaction.user.avatar.url) if interaction.user.avatar else str(interaction.user.default_avatar.url)
-            embed.set_footer(text=f"Requested by {interaction.user}", icon_url=user_avatar_url)
+            embed.add_field(name="Members", value=self.guild_stats.role_members(role), inline=False)
+            return embed
+
+        try:
+            tags = (('guild', role.guild.id), ('role', role.id))
+            embed = self.cached_embed(('roleinfo', role.guild.id, role.id), tags, build)
+            self.requester_footer(embed, interaction.user)
             await interaction.response.send_message(embed=embed)
         except Exception as e:
             logging.exception("Failed to get role info")
@@ -183,7 +381,7 @@ class UtilsCog(commands.GroupCog, name="utils"):
         if isinstance(error, app_commands.CommandOnCooldown):
             await interaction.response.send_message(f"⏳ This command is on cooldown. Try again in {error.retry_after:.2f} seconds.", ephemeral=True)
         else:
-            logging.exception("An error occurred")
+            logging.error(f"Error in command {interaction.command.name}: {error}", exc_info=error)
             await interaction.response.send_message(f"An unexpected error occurred: {error}", ephemeral=True)
 
 async def setup(bot: commands.Bot):
@@ -0,0 +1 @@
+"""Shared building blocks used by the cogs (schedulers, stores, ...)."""
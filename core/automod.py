@@ -0,0 +1,144 @@
+import re
+from collections import namedtuple
+
+Verdict = namedtuple("Verdict", "kind detail escalate")  # kind: 'term', 'flood' or 'duplicate'
+
+
+def _trie_pattern(terms) -> str:
+    """Builds a regex of the terms shaped like a trie: ``cat|car|dog`` becomes ``ca(?:r|t)|dog``.
+
+    The regex engine then follows one branch per character instead of trying
+    every term at every position, so all terms are matched in a single pass.
+    """
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        group = branches[0] if len(branches) == 1 and '' not in node else f"(?:{'|'.join(branches)})"
+        return f"{group}?" if '' in node else group
+
+    return build(trie)
+
+
+class TermMatcher:
+    """Finds the first banned term in a text, case-insensitively, with one precompiled regex."""
+
+    def __init__(self, terms, whole_words: bool = True):
+        terms = sorted({term.casefold().strip() for term in terms if term.strip()})
+        self.terms = terms
+        self._pattern = None
+        if terms:
+            pattern = _trie_pattern(terms)
+            # Lookarounds rather than \b, so terms starting or ending in punctuation (":)", "nsfw!") still match
+            self._pattern = re.compile(rf"(?<!\w)(?:{pattern})(?!\w)" if whole_words else pattern)
+
+    def find(self, text: str):
+        if self._pattern is None:
+            return None
+        match = self._pattern.search(text.casefold())
+        return match.group() if match else None
+
+
+class _UserState:
+    __slots__ = ('window_start', 'previous', 'current', 'last_hash', 'repeats', 'last_seen', 'penalized_until')
+
+    def __init__(self, now: float):
+        self.window_start = now
+        self.previous = 0
+        self.current = 0
+        self.last_hash = None
+        self.repeats = 0
+        self.last_seen = now
+        self.penalized_until = 0.0
+
+
+class AutomodEngine:
+    """Banned terms plus per-member flood and duplicate tracking for the ``on_message`` hot path.
+
+    Flood detection uses a sliding-window counter: two fixed-window counts,
+    with the previous window weighted by how much of it still overlaps the
+    sliding one. A member's whole state is a handful of slots, with no per-message
+    timestamps kept. States are keyed by one packed int and kept in update order, so idle ones
+    are swept from the front.
+    """
+
+    def __init__(self, matcher: TermMatcher, flood_messages: int = 6, flood_window: float = 5.0,
+                 duplicate_messages: int = 4, duplicate_window: float = 30.0, penalty_window: float = 60.0, idle_ttl: float = 300.0):
+        self.matcher = matcher
+        self.flood_messages = flood_messages
+        self.flood_window = flood_window
+        self.duplicate_messages = duplicate_messages
+        self.duplicate_window = duplicate_window
+        self.penalty_window = penalty_window  # a member is escalated (timed out) at most once per this many seconds
+        self.idle_ttl = max(idle_ttl, flood_window * 2, duplicate_window)
+        self._states = {}  # (guild_id << 64) | user_id -> _UserState, least recently active first
+
+    def __len__(self):
+        return len(self._states)
+
+    def check(self, guild_id: int, user_id: int, content: str, now: float):
+        """Returns a Verdict for a message that breaks a rule, otherwise None."""
+        key = (guild_id << 64) | user_id
+        state = self._states.pop(key, None)
+        if state is None:
+            state = _UserState(now)
+        self._states[key] = state
+
+        window = self.flood_window
+        elapsed = now - state.window_start
+        if elapsed >= window:
+            windows = int(elapsed // window)
+            state.previous = state.current if windows == 1 else 0
+            state.current = 0
+            state.window_start += windows * window
+            elapsed -= windows * window
+        state.current += 1
+        flood = state.previous * (1.0 - elapsed / window) + state.current > self.flood_messages
+
+        repeats = 0
+        if content:
+            content_hash = hash(content)
+            if content_hash == state.last_hash and now - state.last_seen <= self.duplicate_window:
+                state.repeats += 1
+            else:
+                state.last_hash = content_hash
+                state.repeats = 1
+            repeats = state.repeats
+        state.last_seen = now
+
+        term = self.matcher.find(content) if content else None
+        if term is not None:
+            return Verdict('term', term, False)
+        if flood:
+            # The window keeps counting, so every message over the limit is flagged;
+            # _escalate keeps that to one timeout per penalty window
+            return Verdict('flood', self.flood_messages, self._escalate(state, now))
+        if repeats >= self.duplicate_messages:
+            return Verdict('duplicate', repeats, self._escalate(state, now))
+        return None
+
+    def _escalate(self, state: _UserState, now: float) -> bool:
+        if state.penalized_until > now:
+            return False
+        state.penalized_until = now + self.penalty_window
+        return True
+
+    def sweep(self, now: float) -> int:
+        """Drops members idle for ``idle_ttl`` seconds; returns how many."""
+        dropped = 0
+        states = self._states
+        while states:
+            key = next(iter(states))
+            state = states[key]
+            if now - state.last_seen < self.idle_ttl or state.penalized_until > now:
+                break
+            del states[key]
+            dropped += 1
+        return dropped
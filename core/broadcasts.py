@@ -0,0 +1,99 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import discord
+
+
+class BroadcastStore:
+    """SQLite record of broadcast jobs and the delivery state of each guild."""
+
+    def __init__(self, path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS broadcasts ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "message TEXT NOT NULL, "
+            "channel_name TEXT NOT NULL, "
+            "created_at REAL NOT NULL, "
+            "finished_at REAL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS deliveries ("
+            "broadcast_id INTEGER NOT NULL, "
+            "guild_id INTEGER NOT NULL, "
+            "status TEXT NOT NULL, "
+            "error TEXT, "
+            "PRIMARY KEY (broadcast_id, guild_id))"
+        )
+
+    def create(self, message: str, channel_name: str) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO broadcasts (message, channel_name, created_at) VALUES (?, ?, ?)",
+                (message, channel_name, time.time()),
+            )
+            return cursor.lastrowid
+
+    def get(self, broadcast_id: int):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, message, channel_name, created_at, finished_at FROM broadcasts WHERE id = ?",
+                (broadcast_id,),
+            ).fetchone()
+
+    def latest_unfinished(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, message, channel_name, created_at, finished_at FROM broadcasts "
+                "WHERE finished_at IS NULL ORDER BY id DESC LIMIT 1"
+            ).fetchone()
+
+    def record(self, rows):
+        """Stores ``(broadcast_id, guild_id, status, error)`` rows in one transaction."""
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT OR REPLACE INTO deliveries VALUES (?, ?, ?, ?)", rows)
+
+    def sent_guilds(self, broadcast_id: int):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT guild_id FROM deliveries WHERE broadcast_id = ? AND status = 'sent'",
+                (broadcast_id,),
+            ).fetchall()
+        return {guild_id for guild_id, in rows}
+
+    def finish(self, broadcast_id: int):
+        with self._lock:
+            self._conn.execute("UPDATE broadcasts SET finished_at = ? WHERE id = ?", (time.time(), broadcast_id))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ChannelNameIndex:
+    """Per-guild ``name -> text channel id`` map, built on first use and dropped when channels change."""
+
+    def __init__(self):
+        self._index = {}
+
+    def get(self, guild: discord.Guild, name: str):
+        names = self._index.get(guild.id)
+        if names is None:
+            names = {}
+            # Same precedence as discord.utils.get(guild.text_channels, name=...)
+            for channel in guild.text_channels:
+                names.setdefault(channel.name, channel.id)
+            self._index[guild.id] = names
+        channel_id = names.get(name)
+        return guild.get_channel(channel_id) if channel_id else None
+
+    def invalidate(self, guild_id: int):
+        self._index.pop(guild_id, None)
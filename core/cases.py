@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+
+Case = namedtuple("Case", "id guild_id action target_id moderator_id reason duration created_at")
+
+
+class CaseStore:
+    """SQLite storage for moderation cases.
+
+    Every lookup filters on the guild plus optionally the target or the moderator,
+    newest first; each has an index ending in ``created_at`` (and the implicit
+    rowid), so a page is an index range scan. Pages continue from the last
+    ``(created_at, id)`` seen instead of an OFFSET, which keeps deep pages as
+    cheap as the first one.
+    """
+
+    def __init__(self, path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cases ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "guild_id INTEGER NOT NULL, "
+            "action TEXT NOT NULL, "
+            "target_id INTEGER NOT NULL, "
+            "moderator_id INTEGER NOT NULL, "
+            "reason TEXT, "
+            "duration INTEGER, "
+            "created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cases_target ON cases (guild_id, target_id, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cases_moderator ON cases (guild_id, moderator_id, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cases_time ON cases (guild_id, created_at)")
+
+    def add_many(self, rows):
+        """Inserts ``(guild_id, action, target_id, moderator_id, reason, duration, created_at)`` rows in one transaction."""
+        # Leaving the connection context commits, or rolls back when a statement or the commit fails,
+        # so a "database is locked" error never leaves the connection inside a transaction
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT INTO cases (guild_id, action, target_id, moderator_id, reason, duration, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def history(self, guild_id: int, target_id: int = None, moderator_id: int = None, before=None, limit: int = 10):
+        """Returns up to ``limit`` cases, newest first, older than the ``(created_at, id)`` cursor ``before``."""
+        clauses = ["guild_id = ?"]
+        params = [guild_id]
+        if target_id is not None:
+            clauses.append("target_id = ?")
+            params.append(target_id)
+        if moderator_id is not None:
+            clauses.append("moderator_id = ?")
+            params.append(moderator_id)
+        if before is not None:
+            clauses.append("(created_at, id) < (?, ?)")
+            params.extend(before)
+        query = (
+            "SELECT id, guild_id, action, target_id, moderator_id, reason, duration, created_at FROM cases "
+            f"WHERE {' AND '.join(clauses)} ORDER BY created_at DESC, id DESC LIMIT ?"
+        )
+        with self._lock:
+            rows = self._conn.execute(query, (*params, limit)).fetchall()
+        return [Case(*row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CaseLog:
+    """Records moderation cases without touching the database on the command path.
+
+    :meth:`record` only queues the case; a background task writes everything
+    queued in one transaction every ``flush_interval`` seconds. Queries flush
+    first, so a case is visible in the history as soon as it is recorded.
+    """
+
+    def __init__(self, store: CaseStore, flush_interval: float = 2.0):
+        self.store = store
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._task = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+        await self.flush()
+        await asyncio.to_thread(self.store.close)
+
+    def record(self, guild_id: int, action: str, target_id: int, moderator_id: int, reason: str = None, duration: int = None):
+        self._pending.append((guild_id, action, target_id, moderator_id, reason, duration, time.time()))
+
+    async def history(self, guild_id: int, target_id: int = None, moderator_id: int = None, before=None, limit: int = 10):
+        await self.flush()
+        return await asyncio.to_thread(self.store.history, guild_id, target_id, moderator_id, before, limit)
+
+    async def flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        try:
+            await asyncio.to_thread(self.store.add_many, pending)
+        except sqlite3.Error as e:
+            logging.error(f"Failed to write {len(pending)} moderation cases, retrying: {e}")
+            self._pending[:0] = pending
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
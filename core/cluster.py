@@ -0,0 +1,233 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+from pathlib import Path
+
+# Messages are newline-delimited JSON; guild listings from large clusters can be big
+READ_LIMIT = 16 * 1024 * 1024
+
+
+def shard_chunks(shard_count: int, clusters: int):
+    """Splits shard ids into ``clusters`` contiguous ranges of (nearly) equal size."""
+    clusters = max(1, min(clusters, shard_count))
+    size, extra = divmod(shard_count, clusters)
+    chunks, start = [], 0
+    for index in range(clusters):
+        end = start + size + (1 if index < extra else 0)
+        chunks.append(list(range(start, end)))
+        start = end
+    return chunks
+
+
+def encode(message) -> bytes:
+    return json.dumps(message, separators=(',', ':'), default=str).encode() + b'\n'
+
+
+class ClusterError(Exception):
+    pass
+
+
+class ClusterHub:
+    """Relays calls between cluster processes; runs inside the launcher.
+
+    Every message with a ``to`` field is forwarded to that cluster. Membership
+    changes are announced to all clusters so they know whom to gather from.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.clusters = {}  # cluster id -> StreamWriter
+        self.server = None
+
+    async def start(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.unlink(missing_ok=True)
+        self.server = await asyncio.start_unix_server(self._handle, path=str(self.path), limit=READ_LIMIT)
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        for writer in list(self.clusters.values()):
+            writer.close()
+        self.path.unlink(missing_ok=True)
+
+    async def _handle(self, reader, writer):
+        cluster_id = None
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                if message['op'] == 'hello':
+                    cluster_id = message['cluster']
+                    self.clusters[cluster_id] = writer
+                    logging.info(f"Cluster {cluster_id} connected to the IPC hub")
+                    self._announce()
+                    continue
+                target = self.clusters.get(message.get('to'))
+                if target is not None:
+                    target.write(encode(message))
+                elif message['op'] == 'call':
+                    writer.write(encode({'op': 'reply', 'id': message['id'], 'error': f"Cluster {message.get('to')} is not connected"}))
+        except (ConnectionError, json.JSONDecodeError) as e:
+            logging.warning(f"IPC connection of cluster {cluster_id} failed: {e}")
+        finally:
+            if cluster_id is not None and self.clusters.get(cluster_id) is writer:
+                del self.clusters[cluster_id]
+                logging.warning(f"Cluster {cluster_id} disconnected from the IPC hub")
+                self._announce()
+            writer.close()
+
+    def _announce(self):
+        message = encode({'op': 'members', 'clusters': sorted(self.clusters)})
+        for writer in self.clusters.values():
+            writer.write(message)
+
+
+class ClusterClient:
+    """A bot process's view of the cluster.
+
+    Handlers registered with :meth:`register` can be called from any cluster;
+    :meth:`gather` runs one on every connected cluster, including this one.
+    Without a socket (a single process) it only ever runs locally.
+    """
+
+    def __init__(self, cluster_id: int = 0, cluster_count: int = 1, shard_ids=None, shard_count=None, socket_path=None, timeout: float = 10.0):
+        self.cluster_id = cluster_id
+        self.cluster_count = cluster_count
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.members = [cluster_id]
+        self.handlers = {}
+        self._pending = {}
+        self._ids = itertools.count(1)
+        self._writer = None
+        self._task = None
+
+    @classmethod
+    def from_env(cls, timeout: float = 10.0, shard_count=None):
+        """Reads the cluster layout the launcher passes to each process; standalone otherwise."""
+        if 'CLUSTER_ID' not in os.environ:
+            return cls(shard_count=shard_count, timeout=timeout)
+        return cls(
+            cluster_id=int(os.environ['CLUSTER_ID']),
+            cluster_count=int(os.environ['CLUSTER_COUNT']),
+            shard_ids=[int(shard) for shard in os.environ['SHARD_IDS'].split(',')],
+            shard_count=int(os.environ['SHARD_COUNT']),
+            socket_path=os.environ.get('CLUSTER_SOCKET'),
+            timeout=timeout,
+        )
+
+    @property
+    def is_primary(self) -> bool:
+        return self.cluster_id == 0
+
+    @property
+    def clustered(self) -> bool:
+        return self.socket_path is not None
+
+    def owns_guild(self, guild_id) -> bool:
+        """Whether this cluster's shards receive ``guild_id``; DM state (no guild) belongs to the primary cluster."""
+        if guild_id is None:
+            return self.is_primary
+        if self.shard_ids is None or not self.shard_count:
+            return True
+        return (guild_id >> 22) % self.shard_count in self.shard_ids
+
+    def register(self, name: str, handler):
+        self.handlers[name] = handler
+
+    def unregister(self, name: str):
+        self.handlers.pop(name, None)
+
+    async def start(self):
+        if self.clustered:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+        if self._writer:
+            self._writer.close()
+
+    async def _run(self):
+        while True:
+            try:
+                reader, self._writer = await asyncio.open_unix_connection(self.socket_path, limit=READ_LIMIT)
+                self._writer.write(encode({'op': 'hello', 'cluster': self.cluster_id}))
+                while line := await reader.readline():
+                    self._dispatch(json.loads(line))
+                logging.warning("IPC hub closed the connection")
+            except (OSError, ConnectionError) as e:
+                logging.warning(f"IPC hub unreachable at {self.socket_path}: {e}")
+            self._writer = None
+            self.members = [self.cluster_id]
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ClusterError("Lost connection to the IPC hub"))
+            self._pending.clear()
+            await asyncio.sleep(2)
+
+    def _dispatch(self, message):
+        op = message['op']
+        if op == 'members':
+            self.members = message['clusters']
+        elif op == 'call':
+            asyncio.create_task(self._serve(message))
+        elif op == 'reply':
+            future = self._pending.pop(message['id'], None)
+            if future and not future.done():
+                if 'error' in message:
+                    future.set_exception(ClusterError(message['error']))
+                else:
+                    future.set_result(message.get('result'))
+
+    async def _serve(self, message):
+        reply = {'op': 'reply', 'to': message['from'], 'id': message['id']}
+        try:
+            reply['result'] = await self._invoke(message['name'], message['args'])
+        except Exception as e:
+            logging.exception(f"Cluster call {message['name']} from cluster {message['from']} failed")
+            reply['error'] = f"{type(e).__name__}: {e}"
+        if self._writer:
+            self._writer.write(encode(reply))
+
+    async def _invoke(self, name: str, args):
+        handler = self.handlers.get(name)
+        if handler is None:
+            raise ClusterError(f"No handler for {name!r} on cluster {self.cluster_id}")
+        return await handler(**args)
+
+    async def call(self, cluster_id: int, name: str, **args):
+        """Runs handler ``name`` on one cluster and returns its (JSON-compatible) result."""
+        if cluster_id == self.cluster_id:
+            return await self._invoke(name, args)
+        if self._writer is None:
+            raise ClusterError("Not connected to the IPC hub")
+        call_id = f"{self.cluster_id}:{next(self._ids)}"
+        future = asyncio.get_running_loop().create_future()
+        self._pending[call_id] = future
+        self._writer.write(encode({'op': 'call', 'id': call_id, 'from': self.cluster_id, 'to': cluster_id, 'name': name, 'args': args}))
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            raise ClusterError(f"Cluster {cluster_id} did not answer {name!r} within {self.timeout:.0f}s")
+        finally:
+            self._pending.pop(call_id, None)
+
+    async def gather(self, name: str, **args):
+        """Runs handler ``name`` on every connected cluster.
+
+        Returns ``{cluster_id: result}``; a cluster that failed maps to a :class:`ClusterError`.
+        """
+        members = sorted(set(self.members) | {self.cluster_id})
+        results = await asyncio.gather(*(self.call(cluster_id, name, **args) for cluster_id in members), return_exceptions=True)
+        gathered = {}
+        for cluster_id, result in zip(members, results):
+            if isinstance(result, Exception) and not isinstance(result, ClusterError):
+                result = ClusterError(f"{type(result).__name__}: {result}")
+            gathered[cluster_id] = result
+        return gathered
@@ -0,0 +1,134 @@
+import asyncio
+import functools
+import time
+from array import array
+
+import discord
+from discord import app_commands
+
+# Upper bounds (seconds) of the latency histogram buckets; a final +Inf bucket is implied
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram in the Prometheus (cumulative on export) style."""
+
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = array('Q', bytes(8 * (len(BUCKETS) + 1)))
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        index = 0
+        while index < len(BUCKETS) and seconds > BUCKETS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q: float):
+        """Upper bound of the bucket holding the ``q`` quantile, or ``None`` without samples."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return BUCKETS[index] if index < len(BUCKETS) else float('inf')
+        return float('inf')
+
+
+class CommandStats:
+    __slots__ = ('count', 'errors', 'cooldowns', 'first_response', 'duration')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.cooldowns = 0
+        self.first_response = Histogram()
+        self.duration = Histogram()
+
+
+class CommandMetrics:
+    """Per-command counters and latency histograms, keyed by qualified command name."""
+
+    def __init__(self):
+        self.commands = {}
+
+    def get(self, name: str) -> CommandStats:
+        stats = self.commands.get(name)
+        if stats is None:
+            stats = self.commands[name] = CommandStats()
+        return stats
+
+    def record(self, name: str, duration: float, first_response, error):
+        stats = self.get(name)
+        stats.count += 1
+        stats.duration.observe(duration)
+        if first_response is not None:
+            stats.first_response.observe(first_response)
+        if isinstance(error, app_commands.CommandOnCooldown):
+            stats.cooldowns += 1
+        elif error is not None:
+            stats.errors += 1
+
+
+class InstrumentedCommandTree(app_commands.CommandTree):
+    """CommandTree that records count, errors, cooldown rejections, time to first response and duration per command.
+
+    The first response is not hooked inside discord.py; a watcher checks
+    ``interaction.response.is_done()`` at each histogram bucket bound with at
+    most a dozen wakeups. A response first seen at a check is recorded as that
+    bound, the upper edge of the bucket it happened in, so it lands in the
+    right bucket and the first-response sum is an upper bound. A response seen
+    only when the command returns is recorded at that moment.
+    """
+
+    def __init__(self, client, **kwargs):
+        super().__init__(client, **kwargs)
+        self.command_metrics = CommandMetrics()
+
+    def error(self, coro):
+        @functools.wraps(coro)
+        async def on_error(interaction, error):
+            interaction.extras['command_error'] = error
+            await coro(interaction, error)
+
+        return super().error(on_error)
+
+    async def on_error(self, interaction, error):
+        interaction.extras['command_error'] = error
+        await super().on_error(interaction, error)
+
+    async def _call(self, interaction):
+        if interaction.type is discord.InteractionType.autocomplete:
+            return await super()._call(interaction)
+
+        started = interaction.extras['started_at'] = time.perf_counter()
+        watcher = asyncio.create_task(self._watch_first_response(interaction, started))
+        try:
+            await super()._call(interaction)
+        finally:
+            finished = time.perf_counter()
+            watcher.cancel()
+            if interaction.response.is_done():
+                interaction.extras.setdefault('first_response', finished - started)
+            command = interaction.command
+            name = command.qualified_name if command else 'unknown'
+            first_response = interaction.extras.get('first_response')
+            error = interaction.extras.get('command_error')
+            if error is None and interaction.command_failed:
+                error = True
+            self.command_metrics.record(name, finished - started, first_response, error)
+
+    @staticmethod
+    async def _watch_first_response(interaction, started: float):
+        for bound in BUCKETS:
+            await asyncio.sleep(max(0.0, started + bound - time.perf_counter()))
+            if interaction.response.is_done():
+                # Waking up always runs a little past the bound; the response happened before it
+                interaction.extras.setdefault('first_response', bound)
+                return
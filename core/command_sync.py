@@ -0,0 +1,72 @@
+import hashlib
+import json
+import logging
+from pathlib import Path
+
+
+def _digest(payload) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+
+def _flatten(prefix: str, payload, commands):
+    # Groups (the GroupCogs) are split into their subcommands so a diff can name the subcommand that changed
+    options = payload.get('options', [])
+    subcommands = [option for option in options if option.get('type') in (1, 2)]
+    own = dict(payload, options=[option for option in options if option.get('type') not in (1, 2)])
+    commands[prefix] = _digest(own)
+    for subcommand in subcommands:
+        _flatten(f"{prefix} {subcommand['name']}", subcommand, commands)
+
+
+def fingerprint_tree(tree, guild=None, extra_payloads=()):
+    """Hashes the serialized command tree the way it would be sent by ``tree.sync``.
+
+    ``extra_payloads`` are serialized commands that belong in the tree but are not
+    registered yet (lazily loaded extensions). Returns
+    ``(tree_hash, {command_key: command_hash})``.
+    """
+    commands = {}
+    payloads = [command.to_dict(tree) for command in tree.get_commands(guild=guild)]
+    for payload in payloads + list(extra_payloads):
+        _flatten(f"{payload.get('type', 1)}:{payload['name']}", payload, commands)
+    return _digest(sorted(commands.items())), commands
+
+
+class CommandSyncState:
+    """Remembers the fingerprint of the last synced tree per application and scope in a JSON file."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        try:
+            self._state = json.loads(self.path.read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            self._state = {}
+        except ValueError:
+            logging.warning(f"Ignoring unreadable command sync state in {self.path}")
+            self._state = {}
+
+    @staticmethod
+    def _scope(application_id, guild) -> str:
+        return f"{application_id}:{guild.id if guild else 'global'}"
+
+    def get(self, application_id, guild=None):
+        entry = self._state.get(self._scope(application_id, guild))
+        if entry is None:
+            return None, {}
+        return entry['hash'], entry['commands']
+
+    def set(self, application_id, guild, tree_hash: str, commands):
+        self._state[self._scope(application_id, guild)] = {'hash': tree_hash, 'commands': commands}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(self._state, indent=2), encoding='utf-8')
+        tmp.replace(self.path)
+
+
+def diff_commands(old, new):
+    """Returns ``(added, removed, changed)`` command names between two ``{key: hash}`` maps."""
+    name = lambda key: key.split(':', 1)[1]
+    added = sorted(name(key) for key in new.keys() - old.keys())
+    removed = sorted(name(key) for key in old.keys() - new.keys())
+    changed = sorted(name(key) for key in new.keys() & old.keys() if new[key] != old[key])
+    return added, removed, changed
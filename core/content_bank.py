@@ -0,0 +1,171 @@
+import json
+import mmap
+import os
+import random
+import struct
+import sys
+from array import array
+from collections import OrderedDict, deque
+from pathlib import Path
+
+# File layout (little-endian; the tables are read in place, so readers must be little-endian too):
+#   header    MAGIC, version, entry count, category count, offsets position, categories position
+#   entries   one compact JSON value per entry, back to back
+#   offsets   entry count + 1 uint64 byte offsets; entry i spans offsets[i]:offsets[i + 1]
+#   categories  per category: uint16 name length, name, uint32 entry count, padding to 4 bytes,
+#               then that many uint32 entry indexes
+MAGIC = b'CBNK'
+VERSION = 1
+HEADER = struct.Struct('<4sIIIQQ')
+
+
+def _align(position: int, size: int) -> int:
+    return (position + size - 1) // size * size
+
+
+class ContentBank:
+    """Read-only view of a compiled content bank.
+
+    The file is memory-mapped; the offset and category tables are used in place
+    and an entry is only decoded when it is drawn, so opening a bank of any
+    size costs a few page faults rather than RSS.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as bank_file:
+            self._mmap = mmap.mmap(bank_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, category_count, offsets_at, categories_at = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError(f"{self.path} is not a version {VERSION} content bank")
+        view = memoryview(self._mmap)
+        self._views = [view]
+        self._offsets = view[offsets_at:offsets_at + 8 * (count + 1)].cast('Q')
+        self._views.append(self._offsets)
+        self.categories = {}  # name -> memoryview of uint32 entry indexes
+        position = categories_at
+        for _ in range(category_count):
+            (name_length,) = struct.unpack_from('<H', self._mmap, position)
+            name = bytes(self._mmap[position + 2:position + 2 + name_length]).decode()
+            (size,) = struct.unpack_from('<I', self._mmap, position + 2 + name_length)
+            start = _align(position + 6 + name_length, 4)
+            indexes = view[start:start + 4 * size].cast('I')
+            self._views.append(indexes)
+            self.categories[name] = indexes
+            position = start + 4 * size
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int):
+        return json.loads(self._mmap[self._offsets[index]:self._offsets[index + 1]])
+
+    def count(self, category: str = None) -> int:
+        return len(self) if category is None else len(self.categories[category])
+
+    def random_index(self, category: str = None, rng=random) -> int:
+        if category is None:
+            return rng.randrange(len(self))
+        indexes = self.categories[category]
+        return indexes[rng.randrange(len(indexes))]
+
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        self._mmap.close()
+
+
+class RecentDraws:
+    """Draws from a bank without repeating any of the last ``window`` entries per key (e.g. channel).
+
+    Redrawing on a hit is O(1) expected as long as the window is at most half of
+    the pool, which is enforced per draw. Keys are kept LRU-bounded.
+    """
+
+    def __init__(self, bank: ContentBank, window: int = 50, max_keys: int = 10000, rng=random):
+        self.bank = bank
+        self.window = window
+        self.max_keys = max_keys
+        self.rng = rng
+        self._recent = OrderedDict()  # key -> (deque of recent indexes, set of the same)
+
+    def draw(self, key, category: str = None):
+        """Returns ``(index, entry)``."""
+        window = min(self.window, self.bank.count(category) // 2)
+        recent = self._recent.get(key)
+        if recent is None:
+            recent = self._recent[key] = (deque(), set())
+            if len(self._recent) > self.max_keys:
+                self._recent.popitem(last=False)
+        else:
+            self._recent.move_to_end(key)
+        order, seen = recent
+        index = self.bank.random_index(category, self.rng)
+        for _ in range(32):
+            if index not in seen:
+                break
+            index = self.bank.random_index(category, self.rng)
+        order.append(index)
+        seen.add(index)
+        while len(order) > window:
+            seen.discard(order.popleft())
+        return index, self.bank[index]
+
+
+def read_sources(source_dir):
+    """Yields ``(category, entry)`` from ``<category>.txt`` (one entry per line) and ``<category>.jsonl`` files."""
+    for path in sorted(Path(source_dir).iterdir()):
+        if path.suffix not in ('.txt', '.jsonl'):
+            continue
+        with open(path, encoding='utf-8') as source:
+            for line in source:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                yield path.stem, json.loads(line) if path.suffix == '.jsonl' else line
+
+
+def build_bank(entries, path):
+    """Compiles ``(category, entry)`` pairs into a bank file at ``path``; returns the entry count.
+
+    Written to a temporary file and renamed, so processes that have the old bank
+    mapped keep reading it undisturbed.
+    """
+    path = Path(path)
+    temporary = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    offsets = array('Q')
+    categories = {}
+    with open(temporary, 'wb') as bank_file:
+        bank_file.write(b'\0' * HEADER.size)
+        position = HEADER.size
+        for category, entry in entries:
+            encoded = json.dumps(entry, ensure_ascii=False, separators=(',', ':')).encode()
+            categories.setdefault(category, array('I')).append(len(offsets))
+            offsets.append(position)
+            bank_file.write(encoded)
+            position += len(encoded)
+        offsets.append(position)
+        offsets_at = _align(position, 8)
+        bank_file.write(b'\0' * (offsets_at - position))
+        bank_file.write(_little_endian(offsets))
+        categories_at = offsets_at + 8 * len(offsets)
+        position = categories_at
+        for name, indexes in categories.items():
+            encoded_name = name.encode()
+            bank_file.write(struct.pack('<H', len(encoded_name)) + encoded_name + struct.pack('<I', len(indexes)))
+            start = _align(position + 6 + len(encoded_name), 4)
+            bank_file.write(b'\0' * (start - position - 6 - len(encoded_name)))
+            bank_file.write(_little_endian(indexes))
+            position = start + 4 * len(indexes)
+        bank_file.seek(0)
+        bank_file.write(HEADER.pack(MAGIC, VERSION, len(offsets) - 1, len(categories), offsets_at, categories_at))
+    os.replace(temporary, path)
+    return len(offsets) - 1
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
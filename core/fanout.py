@@ -0,0 +1,55 @@
+import asyncio
+import logging
+
+import discord
+
+
+async def run_bounded(items, worker, concurrency: int = 5, retries: int = 3, on_result=None):
+    """Runs ``worker(item)`` for every item with at most ``concurrency`` calls in flight.
+
+    Items are pulled lazily by a fixed set of worker coroutines, so large inputs do
+    not create one task each. When Discord answers with a 429 that discord.py gave
+    up retrying, every worker pauses for ``retry_after`` before the item is retried.
+    ``on_result(item, result)`` is called as each item finishes; ``result`` is the
+    worker's return value or the exception it raised. Returns the list of
+    ``(item, result)`` pairs in completion order.
+    """
+    iterator = iter(items)
+    results = []
+    resume = asyncio.Event()
+    resume.set()
+
+    async def run_one(item):
+        attempt = 0
+        while True:
+            await resume.wait()
+            try:
+                return await worker(item)
+            except discord.RateLimited as e:
+                error, retry_after = e, e.retry_after
+            except discord.HTTPException as e:
+                if e.status != 429:
+                    raise
+                error, retry_after = e, 2 ** attempt
+            attempt += 1
+            if attempt > retries:
+                raise error
+            logging.warning(f"Rate limited, pausing fan-out for {retry_after:.2f}s")
+            resume.clear()
+            await asyncio.sleep(retry_after)
+            resume.set()
+
+    async def consume():
+        for item in iterator:
+            try:
+                result = await run_one(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                result = e
+            results.append((item, result))
+            if on_result is not None:
+                on_result(item, result)
+
+    await asyncio.gather(*(consume() for _ in range(max(1, concurrency))))
+    return results
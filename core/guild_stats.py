@@ -0,0 +1,100 @@
+from collections import Counter
+
+import discord
+
+
+def _status_key(status) -> str:
+    if status in (discord.Status.online, discord.Status.idle, discord.Status.dnd):
+        return status.value
+    return 'offline'  # offline and invisible look the same to other users
+
+
+class GuildStats:
+    """Counters for one guild, kept current by gateway events."""
+
+    __slots__ = ('statuses', 'roles', 'text_channels', 'voice_channels')
+
+    def __init__(self, guild: discord.Guild):
+        self.statuses = Counter()
+        self.roles = Counter()
+        for member in guild.members:
+            self.statuses[_status_key(member.status)] += 1
+            # Member._roles holds raw role ids; Member.roles would build and sort Role objects per member
+            self.roles.update(member._roles)
+        self.text_channels = len(guild.text_channels)
+        self.voice_channels = len(guild.voice_channels)
+
+    @property
+    def online(self) -> int:
+        return self.statuses['online'] + self.statuses['idle'] + self.statuses['dnd']
+
+
+class GuildStatsIndex:
+    """Per-guild presence, role and channel counts maintained in O(1) per event.
+
+    A guild is counted once, from the member cache, the first time it is asked
+    for (and only once the cache is fully chunked); afterwards the event hooks
+    keep it up to date.
+    """
+
+    def __init__(self):
+        self._guilds = {}
+
+    def get(self, guild: discord.Guild) -> GuildStats:
+        stats = self._guilds.get(guild.id)
+        if stats is None:
+            stats = GuildStats(guild)
+            if guild.chunked:
+                self._guilds[guild.id] = stats
+        return stats
+
+    def drop(self, guild_id: int):
+        self._guilds.pop(guild_id, None)
+
+    def role_members(self, role: discord.Role) -> int:
+        if role.is_default():
+            return role.guild.member_count or 0
+        return self.get(role.guild).roles[role.id]
+
+    def member_join(self, member: discord.Member):
+        stats = self._guilds.get(member.guild.id)
+        if stats is not None:
+            stats.statuses[_status_key(member.status)] += 1
+            stats.roles.update(member._roles)
+
+    def member_remove(self, member: discord.Member):
+        stats = self._guilds.get(member.guild.id)
+        if stats is not None:
+            stats.statuses[_status_key(member.status)] -= 1
+            stats.roles.subtract(member._roles)
+
+    def presence_update(self, before: discord.Member, after: discord.Member):
+        stats = self._guilds.get(after.guild.id)
+        if stats is None:
+            return
+        old, new = _status_key(before.status), _status_key(after.status)
+        if old != new:
+            stats.statuses[old] -= 1
+            stats.statuses[new] += 1
+
+    def member_update(self, before: discord.Member, after: discord.Member):
+        stats = self._guilds.get(after.guild.id)
+        if stats is None or before._roles == after._roles:
+            return
+        old, new = set(before._roles), set(after._roles)
+        stats.roles.subtract(old - new)
+        stats.roles.update(new - old)
+
+    def role_delete(self, role: discord.Role):
+        stats = self._guilds.get(role.guild.id)
+        if stats is not None:
+            stats.roles.pop(role.id, None)
+
+    def channel_change(self, channel, delta: int):
+        stats = self._guilds.get(channel.guild.id)
+        if stats is None:
+            return
+        if isinstance(channel, discord.TextChannel):
+            stats.text_channels += delta
+        elif isinstance(channel, discord.VoiceChannel):
+            stats.voice_channels += delta
@@ -0,0 +1,79 @@
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+
+
+class ExtensionWatcher:
+    """Tracks content hashes of extension files so only changed extensions are reloaded.
+
+    Files are re-hashed only when their mtime or size changes, so checking for
+    changes is a stat() per file.
+    """
+
+    def __init__(self, bot, directory: str = 'cogs'):
+        self.bot = bot
+        self.directory = Path(directory)
+        self.loaded_hashes = {}  # extension -> hash of the source it was loaded from
+        self._stat_cache = {}  # path -> (mtime_ns, size, hash)
+        self._failed_hashes = {}  # extension -> hash of the source that failed to load
+        self._lock = asyncio.Lock()
+
+    def extension_path(self, extension: str) -> Path:
+        return self.directory / (extension.split('.')[-1] + '.py')
+
+    def discover(self):
+        return [f'{self.directory.name}.{path.stem}' for path in sorted(self.directory.glob('*.py')) if path.stem != '__init__']
+
+    def current_hash(self, extension: str):
+        path = self.extension_path(extension)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        cached = self._stat_cache.get(path)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        self._stat_cache[path] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    def record(self, extension: str):
+        """Called after ``extension`` was (re)loaded from its current source."""
+        self.loaded_hashes[extension] = self.current_hash(extension)
+
+    def forget(self, extension: str):
+        self.loaded_hashes.pop(extension, None)
+
+    def is_stale(self, extension: str) -> bool:
+        return extension in self.loaded_hashes and self.loaded_hashes[extension] != self.current_hash(extension)
+
+    def stale(self):
+        return [extension for extension in self.bot.extensions if self.is_stale(extension)]
+
+    async def reload_changed(self, retry_failed: bool = True):
+        """Reloads loaded extensions whose source changed.
+
+        Returns ``(reloaded, failed)``; ``failed`` maps extension to error. A failed
+        reload leaves the previous module in place (discord.py rolls it back).
+        With ``retry_failed=False`` a source that already failed is skipped until it
+        changes again, so the auto-reload loop doesn't log the same error every tick.
+        """
+        reloaded, failed = [], {}
+        async with self._lock:
+            for extension in self.stale():
+                digest = self.current_hash(extension)
+                if digest is None:
+                    continue  # file deleted; keep running the loaded version
+                if not retry_failed and self._failed_hashes.get(extension) == digest:
+                    continue
+                try:
+                    await self.bot.reload_extension(extension)
+                    self._failed_hashes.pop(extension, None)
+                    reloaded.append(extension)
+                    logging.info(f"Reloaded changed extension {extension}")
+                except Exception as e:
+                    failed[extension] = e
+                    self._failed_hashes[extension] = digest
+                    logging.error(f"Reload of {extension} failed, kept the previous version: {e}")
+        return reloaded, failed
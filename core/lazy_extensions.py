@@ -0,0 +1,81 @@
+import asyncio
+import hashlib
+import json
+import logging
+from pathlib import Path
+
+
+def source_hash(extension: str) -> str:
+    path = Path(*extension.split('.')).with_suffix('.py')
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except FileNotFoundError:
+        return ''
+
+
+class LazyExtensions:
+    """Extensions whose import is deferred until one of their commands is invoked.
+
+    After an extension has been loaded once, the payloads of its top-level
+    commands are saved in a manifest together with a hash of its source. On the
+    next start the manifest stands in for the module: the command names are
+    routed to the extension (imported on first use) and the payloads keep the
+    command-tree fingerprint stable so nothing is resynced.
+    """
+
+    def __init__(self, bot, names, manifest_path):
+        self.bot = bot
+        self.names = set(names)
+        self.manifest_path = Path(manifest_path)
+        try:
+            self.manifest = json.loads(self.manifest_path.read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            self.manifest = {}
+        self.pending = {}  # top-level command name -> extension
+        self._lock = asyncio.Lock()
+
+    def defer(self, extension: str) -> bool:
+        """Registers ``extension``'s commands as stubs; returns False if it has to be imported now."""
+        if extension not in self.names:
+            return False
+        entry = self.manifest.get(extension)
+        if entry is None or entry['source'] != source_hash(extension):
+            return False
+        for payload in entry['commands']:
+            self.pending[payload['name']] = extension
+        return True
+
+    def remember(self, extension: str):
+        """Stores the command payloads of a loaded lazy extension for the next start."""
+        if extension not in self.names:
+            return
+        tree = self.bot.tree
+        commands = [command.to_dict(tree) for command in tree.get_commands()
+                    if command.module == extension or (command.module or '').startswith(extension + '.')]
+        self.manifest[extension] = {'source': source_hash(extension), 'commands': commands}
+        tmp = self.manifest_path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(self.manifest), encoding='utf-8')
+        tmp.replace(self.manifest_path)
+
+    def pending_payloads(self):
+        extensions = set(self.pending.values())
+        return [payload for extension in extensions for payload in self.manifest[extension]['commands']]
+
+    async def load(self, extension: str):
+        async with self._lock:
+            if extension in self.bot.extensions:
+                return
+            with self.bot.startup.phase(f"lazy load {extension}"):
+                await self.bot.load_extension(extension)
+            self.pending = {name: ext for name, ext in self.pending.items() if ext != extension}
+            logging.info(f"Lazily loaded extension {extension}")
+
+    async def load_all(self):
+        for extension in set(self.pending.values()):
+            await self.load(extension)
+
+    async def ensure_loaded_for(self, interaction):
+        name = (interaction.data or {}).get('name')
+        extension = self.pending.get(name)
+        if extension is not None:
+            await self.load(extension)
@@ -0,0 +1,333 @@
+import asyncio
+import logging
+import random
+import sqlite3
+import threading
+from itertools import groupby
+from pathlib import Path
+
+GLOBAL = 0  # guild id used for the global board
+
+
+class _Node:
+    __slots__ = ('key', 'score', 'forward', 'width')
+
+    def __init__(self, key, score, level: int):
+        self.key = key
+        self.score = score
+        self.forward = [None] * level
+        self.width = [0] * level  # nodes skipped by forward[i], counting the node it points to
+
+
+class RankedSet:
+    """Members ordered by score (highest first, ties by key) in an indexable skip list.
+
+    Updates, rank lookups and fetching a page at any offset are O(log n); a page
+    walks only the entries it returns.
+    """
+
+    MAX_LEVEL = 32
+    P = 0.25
+
+    def __init__(self):
+        self._head = _Node(None, None, self.MAX_LEVEL)
+        self._level = 1
+        self._scores = {}
+
+    def __len__(self):
+        return len(self._scores)
+
+    def __contains__(self, key):
+        return key in self._scores
+
+    def score(self, key):
+        return self._scores.get(key)
+
+    def _random_level(self) -> int:
+        level = 1
+        while level < self.MAX_LEVEL and random.random() < self.P:
+            level += 1
+        return level
+
+    def set(self, key, score):
+        current = self._scores.get(key)
+        if current == score:
+            return
+        if current is not None:
+            self._delete(key, current)
+        self._insert(key, score)
+
+    def remove(self, key):
+        score = self._scores.get(key)
+        if score is not None:
+            self._delete(key, score)
+
+    def _insert(self, key, score):
+        target = (-score, key)
+        update = [self._head] * self.MAX_LEVEL
+        rank = [0] * self.MAX_LEVEL
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            rank[i] = 0 if i == self._level - 1 else rank[i + 1]
+            while node.forward[i] is not None and (-node.forward[i].score, node.forward[i].key) < target:
+                rank[i] += node.width[i]
+                node = node.forward[i]
+            update[i] = node
+        level = self._random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                self._head.width[i] = len(self._scores)
+            self._level = level
+        new = _Node(key, score, level)
+        for i in range(level):
+            new.forward[i] = update[i].forward[i]
+            update[i].forward[i] = new
+            new.width[i] = update[i].width[i] - (rank[0] - rank[i])
+            update[i].width[i] = rank[0] - rank[i] + 1
+        for i in range(level, self._level):
+            update[i].width[i] += 1
+        self._scores[key] = score
+
+    def _delete(self, key, score):
+        target = (-score, key)
+        update = [self._head] * self.MAX_LEVEL
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] is not None and (-node.forward[i].score, node.forward[i].key) < target:
+                node = node.forward[i]
+            update[i] = node
+        node = node.forward[0]
+        for i in range(self._level):
+            if update[i].forward[i] is node:
+                update[i].width[i] += node.width[i] - 1
+                update[i].forward[i] = node.forward[i]
+            else:
+                update[i].width[i] -= 1
+        while self._level > 1 and self._head.forward[self._level - 1] is None:
+            self._level -= 1
+        del self._scores[key]
+
+    def rank(self, key):
+        """0-based position of ``key`` (0 is the top), or None."""
+        score = self._scores.get(key)
+        if score is None:
+            return None
+        target = (-score, key)
+        rank = 0
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] is not None and (-node.forward[i].score, node.forward[i].key) <= target:
+                rank += node.width[i]
+                node = node.forward[i]
+            if node.key == key:
+                return rank - 1
+        return None
+
+    def page(self, offset: int, count: int):
+        """Returns ``[(key, score), ...]`` for positions ``offset`` to ``offset + count - 1``."""
+        if offset >= len(self._scores) or count <= 0:
+            return []
+        traversed = 0
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] is not None and traversed + node.width[i] <= offset + 1:
+                traversed += node.width[i]
+                node = node.forward[i]
+        entries = []
+        while node is not None and len(entries) < count:
+            entries.append((node.key, node.score))
+            node = node.forward[0]
+        return entries
+
+    @classmethod
+    def from_sorted(cls, items):
+        """Builds the set in O(n) from ``(key, score)`` pairs already in ranking order."""
+        ranked = cls()
+        last = [ranked._head] * cls.MAX_LEVEL
+        last_position = [0] * cls.MAX_LEVEL
+        position = 0
+        for key, score in items:
+            position += 1
+            level = ranked._random_level()
+            node = _Node(key, score, level)
+            for i in range(level):
+                last[i].forward[i] = node
+                last[i].width[i] = position - last_position[i]
+                last[i] = node
+                last_position[i] = position
+            ranked._level = max(ranked._level, level)
+            ranked._scores[key] = score
+        for i in range(cls.MAX_LEVEL):
+            last[i].width[i] = position - last_position[i]
+        return ranked
+
+
+class ScoreStore:
+    """SQLite storage for trivia scores, keyed by (guild, user); guild 0 holds the global totals."""
+
+    def __init__(self, path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scores ("
+            "guild_id INTEGER NOT NULL, "
+            "user_id INTEGER NOT NULL, "
+            "score INTEGER NOT NULL, "
+            "streak INTEGER NOT NULL, "
+            "best_streak INTEGER NOT NULL, "
+            "PRIMARY KEY (guild_id, user_id))"
+        )
+
+    def upsert_many(self, rows):
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO scores (guild_id, user_id, score, streak, best_streak) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def all_ranked(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT guild_id, user_id, score, streak, best_streak FROM scores ORDER BY guild_id, score DESC, user_id"
+            ).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class Leaderboard:
+    """Per-guild and global trivia scores and streaks, kept in memory and persisted write-behind.
+
+    Every change marks its (guild, user) row dirty; a flush task writes all dirty
+    rows in one transaction every ``flush_interval`` seconds, so a burst of
+    answers costs one write per player rather than one per answer.
+
+    Several clusters can share the store: each one loads and writes only the
+    boards of guilds ``owns_guild`` accepts. The global board is kept by one of
+    them; the others pass ``forward_global``, an async callable that receives
+    their batched ``[user_id, correct]`` global answers on every flush.
+    """
+
+    def __init__(self, store: ScoreStore, flush_interval: float = 5.0, owns_guild=None, forward_global=None):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.owns_guild = owns_guild
+        self.forward_global = forward_global
+        self.stats = {}  # (guild_id, user_id) -> [score, streak, best_streak]
+        self.boards = {}  # guild_id -> RankedSet of user_id by score
+        self._dirty = {}
+        self._outbox = []  # global answers waiting for forward_global
+        self._task = None
+
+    async def start(self):
+        self.stats, self.boards = await asyncio.to_thread(self._load)
+        self._task = asyncio.create_task(self._run())
+        if self.keeps_global:
+            logging.info(f"Trivia leaderboard loaded with {len(self.boards.get(GLOBAL, ()))} players")
+        else:
+            logging.info(f"Trivia leaderboard loaded with {len(self.boards)} server boards; global answers go to the primary cluster")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+        await self.flush()
+        await asyncio.to_thread(self.store.close)
+
+    @property
+    def keeps_global(self) -> bool:
+        return self.forward_global is None
+
+    def _keeps_board(self, guild_id: int) -> bool:
+        if guild_id == GLOBAL:
+            return self.keeps_global
+        return self.owns_guild is None or self.owns_guild(guild_id)
+
+    def _load(self):
+        stats, boards = {}, {}
+        for guild_id, rows in groupby(self.store.all_ranked(), key=lambda row: row[0]):
+            if not self._keeps_board(guild_id):
+                continue
+            rows = list(rows)
+            for _, user_id, score, streak, best_streak in rows:
+                stats[(guild_id, user_id)] = [score, streak, best_streak]
+            boards[guild_id] = RankedSet.from_sorted((user_id, score) for _, user_id, score, _, _ in rows)
+        return stats, boards
+
+    def record(self, guild_id, user_id: int, correct: bool):
+        """Counts an answer on the guild's board (if any) and the global one.
+
+        Returns ``[score, streak, best_streak]`` of the guild's board, or of the
+        global one for DMs (which arrive on shard 0, run by the cluster keeping it).
+        """
+        result = self._apply(guild_id, user_id, correct) if guild_id else None
+        if self.keeps_global:
+            global_stats = self._apply(GLOBAL, user_id, correct)
+            result = result or global_stats
+        else:
+            self._outbox.append((user_id, correct))
+        return result
+
+    def record_global(self, answers):
+        """Applies global answers forwarded by other clusters, in order."""
+        for user_id, correct in answers:
+            self._apply(GLOBAL, user_id, correct)
+
+    def _apply(self, board_id: int, user_id: int, correct: bool):
+        key = (board_id, user_id)
+        stats = self.stats.get(key)
+        if stats is None:
+            if not correct:
+                return None
+            stats = self.stats[key] = [0, 0, 0]
+        if correct:
+            stats[0] += 1
+            stats[1] += 1
+            stats[2] = max(stats[2], stats[1])
+            self.boards.setdefault(board_id, RankedSet()).set(user_id, stats[0])
+        else:
+            stats[1] = 0
+        self._dirty[key] = stats
+        return stats
+
+    def get(self, guild_id: int, user_id: int):
+        return self.stats.get((guild_id, user_id))
+
+    def rank(self, guild_id: int, user_id: int):
+        board = self.boards.get(guild_id)
+        return board.rank(user_id) if board else None
+
+    def page(self, guild_id: int, offset: int, count: int):
+        """Returns ``(total, [(user_id, score, streak, best_streak), ...])``."""
+        board = self.boards.get(guild_id)
+        if not board:
+            return 0, []
+        return len(board), [(user_id, score, *self.stats[(guild_id, user_id)][1:]) for user_id, score in board.page(offset, count)]
+
+    async def flush(self):
+        if self._outbox:
+            outbox, self._outbox = self._outbox, []
+            try:
+                await self.forward_global(outbox)
+            except Exception as e:
+                logging.warning(f"Failed to forward {len(outbox)} global trivia answers, retrying: {e}")
+                self._outbox[:0] = outbox
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, {}
+        rows = [(guild_id, user_id, *stats) for (guild_id, user_id), stats in dirty.items()]
+        try:
+            await asyncio.to_thread(self.store.upsert_many, rows)
+        except sqlite3.Error as e:
+            logging.error(f"Failed to persist {len(rows)} trivia scores, retrying: {e}")
+            for key, stats in dirty.items():
+                self._dirty.setdefault(key, stats)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
@@ -0,0 +1,71 @@
+import logging
+import re
+import threading
+import time
+
+_NUMBERS = re.compile(r'\d+(?:\.\d+)?')
+
+
+class DedupFilter(logging.Filter):
+    """Collapses bursts of identical log records.
+
+    Records are grouped by (logger, message template, exception type). Within
+    each ``window`` only the first ``limits[level]`` records of a group pass; the
+    rest are counted and reported later as a single "suppressed N similar"
+    summary. A limit of 0 disables deduplication for that level.
+    """
+
+    SUMMARY_LOGGER = 'logdedup'
+
+    def __init__(self, window: float = 60.0, limits=None):
+        super().__init__()
+        self.window = window
+        self.limits = {logging.getLevelName(level) if isinstance(level, str) else level: limit
+                       for level, limit in (limits or {}).items()}
+        self.suppressed_total = 0
+        # key -> [window_start, passed, suppressed, levelno, logger_name, sample_message]
+        self._groups = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(record: logging.LogRecord):
+        exc_type = record.exc_info[0].__name__ if record.exc_info and record.exc_info[0] else None
+        return record.name, _NUMBERS.sub('#', str(record.msg)[:200]), exc_type
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.name == self.SUMMARY_LOGGER:
+            return True
+        limit = self.limits.get(record.levelno, 0)
+        if not limit:
+            return True
+
+        key = self._key(record)
+        now = record.created
+        with self._lock:
+            group = self._groups.get(key)
+            if group is None or now - group[0] >= self.window:
+                if group is not None and group[2]:
+                    record.msg = f"{record.msg} [suppressed {group[2]} similar in the previous {self.window:.0f}s]"
+                self._groups[key] = [now, 1, 0, record.levelno, record.name, str(record.msg)[:200]]
+                return True
+            if group[1] < limit:
+                group[1] += 1
+                return True
+            group[2] += 1
+            self.suppressed_total += 1
+            return False
+
+    def flush(self):
+        """Logs summaries for groups whose window has ended and forgets them."""
+        now = time.time()
+        summaries = []
+        with self._lock:
+            for key, group in list(self._groups.items()):
+                if now - group[0] < self.window:
+                    continue
+                del self._groups[key]
+                if group[2]:
+                    summaries.append(group)
+        logger = logging.getLogger(self.SUMMARY_LOGGER)
+        for _, _, suppressed, levelno, name, sample in summaries:
+            logger.log(levelno, f"Suppressed {suppressed} similar records from {name} in {self.window:.0f}s: {sample}")
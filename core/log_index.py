@@ -0,0 +1,52 @@
+import logging
+import threading
+import time
+from collections import Counter, deque
+
+
+class RecentErrorHandler(logging.Handler):
+    """Keeps a bounded, time-ordered ring of recent WARNING/ERROR records in memory.
+
+    Lets commands answer "what went wrong lately" without reading log files.
+    """
+
+    def __init__(self, capacity: int = 1000, level=logging.WARNING):
+        super().__init__(level)
+        self._records = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self.counts = Counter()  # (logger name, level name) -> records seen since startup
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            message = record.getMessage().splitlines()[0][:200] if record.msg else ""
+        except Exception:
+            message = str(record.msg)[:200]
+        if record.exc_info and record.exc_info[0] is not None:
+            message = f"{message} [{record.exc_info[0].__name__}]"
+        with self._lock:
+            self._records.append((record.created, record.levelno, record.name, message))
+            self.counts[(record.name, record.levelname)] += 1
+
+    def recent(self, seconds: float, level=logging.ERROR):
+        """Groups identical records newer than ``seconds`` ago.
+
+        Returns ``(count, last_seen, level_name, logger_name, message)`` tuples,
+        most recently seen first.
+        """
+        cutoff = time.time() - seconds
+        # Snapshot under the lock; other threads keep appending while the groups are built
+        with self._lock:
+            records = list(self._records)
+        groups = {}
+        for created, levelno, name, message in reversed(records):
+            if created < cutoff:
+                break
+            if levelno < level:
+                continue
+            key = (levelno, name, message)
+            if key in groups:
+                groups[key][0] += 1
+            else:
+                groups[key] = [1, created]
+        return [(count, last_seen, logging.getLevelName(levelno), name, message)
+                for (levelno, name, message), (count, last_seen) in groups.items()]
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+
+from core.metrics import RingBuffer, percentile
+
+_ASYNCIO_DIR = os.path.dirname(asyncio.__file__)
+
+
+class LoopMonitor:
+    """Measures event-loop scheduling lag and captures what is blocking the loop.
+
+    A task on the loop wakes every ``interval`` seconds and records how late it
+    woke up. A watchdog thread notices when that heartbeat stops for longer than
+    ``threshold`` and snapshots the loop thread's stack, so the offending
+    callback or listener can be named.
+    """
+
+    def __init__(self, loop, interval: float = 0.25, threshold: float = 0.1, window_minutes: int = 60, max_offenders: int = 50):
+        self.loop = loop
+        self.interval = interval
+        self.threshold = threshold
+        self.lag = RingBuffer(max(1, int(window_minutes * 60 / interval)))
+        self.max_offenders = max_offenders
+        # key -> [stalls, total_ms, max_ms, last_seen, formatted stack]
+        self.offenders = {}
+        self._lock = threading.Lock()
+        self._heartbeat = time.monotonic()
+        self._pending_offender = None
+        self._loop_thread_id = None
+        self._task = None
+        self._stop = threading.Event()
+        self._watchdog = None
+
+    def start(self):
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = self.loop.create_task(self._tick())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._watchdog:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def _tick(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self.lag.append(lag * 1000)
+            self._heartbeat = now
+            if lag >= self.threshold:
+                with self._lock:
+                    key, self._pending_offender = self._pending_offender, None
+                    offender = self.offenders.get(key)
+                    if offender is not None:
+                        offender[1] += lag * 1000
+                        offender[2] = max(offender[2], lag * 1000)
+
+    def _watch(self):
+        poll = max(0.01, self.threshold / 2)
+        captured_for = None
+        while not self._stop.wait(poll):
+            heartbeat = self._heartbeat
+            stalled = time.monotonic() - heartbeat - self.interval
+            if stalled < self.threshold or captured_for == heartbeat:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            captured_for = heartbeat
+            self._record(traceback.extract_stack(frame), stalled)
+
+    def _record(self, stack, stalled: float):
+        # Group by the innermost frames outside asyncio so the same blocking call lands in one entry
+        frames = [frame for frame in stack if not frame.filename.startswith(_ASYNCIO_DIR)] or stack
+        key = tuple((frame.filename, frame.lineno, frame.name) for frame in frames[-3:])
+        innermost = frames[-1]
+        with self._lock:
+            offender = self.offenders.get(key)
+            if offender is None:
+                if len(self.offenders) >= self.max_offenders:
+                    # Forget the offender seen least recently
+                    del self.offenders[min(self.offenders, key=lambda k: self.offenders[k][3])]
+                offender = self.offenders[key] = [0, 0.0, 0.0, 0.0, ''.join(traceback.format_list(frames[-8:]))]
+            offender[0] += 1
+            offender[3] = time.time()
+            self._pending_offender = key
+        logging.warning(f"Event loop blocked for over {stalled * 1000:.0f}ms in {innermost.name} "
+                        f"({os.path.basename(innermost.filename)}:{innermost.lineno})")
+
+    def lag_percentiles(self, minutes: float):
+        """Returns ``(p50, p95, p99, max)`` lag in ms over the last ``minutes``, or ``None``."""
+        values = self.lag.since(time.time() - minutes * 60)
+        if not values:
+            return None
+        ordered = sorted(values)
+        return percentile(ordered, 0.5), percentile(ordered, 0.95), percentile(ordered, 0.99), ordered[-1]
+
+    def top_offenders(self, limit: int = 5):
+        """Returns ``(stalls, total_ms, max_ms, stack)`` tuples, worst total blocking time first."""
+        with self._lock:
+            entries = [(stalls, total, worst, stack) for stalls, total, worst, _, stack in self.offenders.values()]
+        entries.sort(key=lambda entry: (entry[1], entry[0]), reverse=True)
+        return entries[:limit]
@@ -0,0 +1,139 @@
+import logging
+import math
+import threading
+import time
+from array import array
+
+
+class RingBuffer:
+    """Fixed-size ring of ``(timestamp, value)`` samples stored in two flat arrays."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._times = array('d', bytes(8 * size))
+        self._values = array('d', bytes(8 * size))
+        self._next = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, value: float, timestamp: float = None):
+        index = self._next
+        self._times[index] = time.time() if timestamp is None else timestamp
+        self._values[index] = value
+        self._next = (index + 1) % self.size
+        if self._count < self.size:
+            self._count += 1
+
+    def last(self):
+        if not self._count:
+            return None
+        return self._values[(self._next - 1) % self.size]
+
+    def since(self, cutoff: float):
+        """Values recorded at or after ``cutoff``, oldest first."""
+        count, end = self._count, self._next
+        values = []
+        for offset in range(count, 0, -1):
+            index = (end - offset) % self.size
+            if self._times[index] >= cutoff:
+                values.append(self._values[index])
+        return values
+
+
+def percentile(ordered, q: float):
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def summarize(values):
+    """Returns ``(min, avg, p95)`` for a list of samples, or ``None`` when it is empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[0], sum(ordered) / len(ordered), percentile(ordered, 0.95)
+
+
+class SystemSampler:
+    """Samples process and system metrics on a background thread into ring buffers.
+
+    Readers on the event loop only look at the buffers, so no psutil call ever
+    runs on the loop.
+    """
+
+    METRICS = {
+        'cpu_percent': '%',
+        'memory_percent': '%',
+        'disk_percent': '%',
+        'rss_mb': 'MB',
+        'open_fds': '',
+        'connections': '',
+        'loop_lag_ms': 'ms',
+        'gateway_latency_ms': 'ms',
+    }
+
+    def __init__(self, loop, latency, interval: float = 5.0, window_minutes: int = 60):
+        self.loop = loop
+        self.interval = interval
+        self._latency = latency
+        size = max(1, int(window_minutes * 60 / interval))
+        self.series = {name: RingBuffer(size) for name in self.METRICS}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="system-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def last(self, name: str):
+        return self.series[name].last()
+
+    def summary(self, minutes: float):
+        cutoff = time.time() - minutes * 60
+        return {name: summarize(ring.since(cutoff)) for name, ring in self.series.items()}
+
+    def _probe_loop_lag(self):
+        scheduled = time.monotonic()
+
+        def record():
+            self.series['loop_lag_ms'].append((time.monotonic() - scheduled) * 1000)
+
+        try:
+            self.loop.call_soon_threadsafe(record)
+        except RuntimeError:
+            pass  # loop closed during shutdown
+
+    def _sample(self, psutil, process):
+        now = time.time()
+        self.series['cpu_percent'].append(psutil.cpu_percent(interval=None), now)
+        self.series['memory_percent'].append(psutil.virtual_memory().percent, now)
+        self.series['disk_percent'].append(psutil.disk_usage('/').percent, now)
+        with process.oneshot():
+            self.series['rss_mb'].append(process.memory_info().rss / (1024 * 1024), now)
+            if hasattr(process, 'num_fds'):
+                self.series['open_fds'].append(process.num_fds(), now)
+            else:
+                self.series['open_fds'].append(process.num_handles(), now)
+        self.series['connections'].append(len(process.net_connections()), now)
+        latency = self._latency()
+        if latency is not None and math.isfinite(latency):
+            self.series['gateway_latency_ms'].append(latency * 1000, now)
+        self._probe_loop_lag()
+
+    def _run(self):
+        # Imported here so psutil loads on the sampler thread instead of delaying startup
+        import psutil
+        process = psutil.Process()
+        psutil.cpu_percent(interval=None)  # prime the counter; the first reading is meaningless
+        while not self._stop.wait(self.interval):
+            try:
+                self._sample(psutil, process)
+            except Exception:
+                logging.exception("System metrics sample failed")
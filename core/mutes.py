@@ -0,0 +1,188 @@
+import asyncio
+import heapq
+import logging
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+# Mutes that could not be lifted are retried after 30s, doubling up to an hour
+RETRY_BASE_DELAY = 30
+RETRY_MAX_DELAY = 3600
+
+
+class MuteStore:
+    """SQLite storage for active mutes, keyed by (guild, member)."""
+
+    def __init__(self, path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS mutes ("
+            "guild_id INTEGER NOT NULL, "
+            "member_id INTEGER NOT NULL, "
+            "role_id INTEGER NOT NULL, "
+            "expires_at REAL NOT NULL, "
+            "PRIMARY KEY (guild_id, member_id))"
+        )
+
+    def upsert(self, guild_id: int, member_id: int, role_id: int, expires_at: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO mutes (guild_id, member_id, role_id, expires_at) VALUES (?, ?, ?, ?)",
+                (guild_id, member_id, role_id, expires_at),
+            )
+
+    def delete_many(self, keys):
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("DELETE FROM mutes WHERE guild_id = ? AND member_id = ?", keys)
+
+    def all(self):
+        with self._lock:
+            return self._conn.execute("SELECT guild_id, member_id, role_id, expires_at FROM mutes").fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class MuteExpiryQueue:
+    """Expires every active mute from one task.
+
+    ``on_expire(guild_id, [(member_id, role_id), ...])`` is awaited once per guild
+    for all mutes that came due in the same tick and returns the member ids
+    whose mute could not be lifted yet. Those (or the whole batch, if it
+    raises) keep their record and are retried with a backoff. The store may
+    be shared by several clusters; only mutes in guilds ``owns_guild`` accepts
+    are loaded.
+    """
+
+    def __init__(self, store: MuteStore, on_expire, owns_guild=None):
+        self.store = store
+        self._on_expire = on_expire
+        self._owns_guild = owns_guild
+        self._heap = []
+        # (guild_id, member_id) -> (role_id, expires_at); heap entries that no
+        # longer match this map are stale and skipped when popped.
+        self._active = {}
+        self._attempts = {}  # (guild_id, member_id) -> failed expiries so far
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def __len__(self):
+        return len(self._active)
+
+    def __contains__(self, key):
+        return key in self._active
+
+    def active(self):
+        return dict(self._active)
+
+    async def start(self):
+        rows = await asyncio.to_thread(self.store.all)
+        for guild_id, member_id, role_id, expires_at in rows:
+            if self._owns_guild and not self._owns_guild(guild_id):
+                continue
+            self._active[(guild_id, member_id)] = (role_id, expires_at)
+            self._heap.append((expires_at, guild_id, member_id))
+        heapq.heapify(self._heap)
+        self._task = asyncio.create_task(self._run())
+        logging.info(f"Mute expiry queue started with {len(self._active)} active mutes")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.store.close)
+
+    async def schedule(self, guild_id: int, member_id: int, role_id: int, seconds: int):
+        expires_at = time.time() + seconds
+        await asyncio.to_thread(self.store.upsert, guild_id, member_id, role_id, expires_at)
+        self._active[(guild_id, member_id)] = (role_id, expires_at)
+        self._attempts.pop((guild_id, member_id), None)
+        heapq.heappush(self._heap, (expires_at, guild_id, member_id))
+        if self._heap[0][0] == expires_at:
+            self._wakeup.set()
+
+    async def discard(self, keys):
+        """Forgets mutes without expiring them (e.g. the role was removed by hand)."""
+        for key in keys:
+            self._attempts.pop(key, None)
+        keys = [key for key in keys if self._active.pop(key, None) is not None]
+        if keys:
+            await asyncio.to_thread(self.store.delete_many, keys)
+
+    def _pop_due(self, now: float):
+        due = defaultdict(list)
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, guild_id, member_id = heapq.heappop(self._heap)
+            entry = self._active.get((guild_id, member_id))
+            if entry is None or entry[1] != expires_at:
+                continue
+            del self._active[(guild_id, member_id)]
+            due[guild_id].append((member_id, entry[0]))
+        return due
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            due = self._pop_due(time.time())
+            if not due:
+                continue
+            results = await asyncio.gather(
+                *(self._on_expire(guild_id, members) for guild_id, members in due.items()),
+                return_exceptions=True,
+            )
+            now = time.time()
+            for (guild_id, members), result in zip(due.items(), results):
+                if isinstance(result, Exception):
+                    logging.error(f"Failed to expire mutes in guild {guild_id}: {result}")
+                    failed = {member_id for member_id, _ in members}
+                else:
+                    failed = set(result or ())
+                for member_id, role_id in members:
+                    key = (guild_id, member_id)
+                    if key in self._active:
+                        continue
+                    if member_id in failed:
+                        self._retry(key, role_id, now)
+                    else:
+                        self._attempts.pop(key, None)
+            # A member muted again while the batch ran, or whose unmute is retried, keeps their record
+            keys = [(guild_id, member_id) for guild_id, members in due.items() for member_id, _ in members
+                    if (guild_id, member_id) not in self._active]
+            try:
+                await asyncio.to_thread(self.store.delete_many, keys)
+            except sqlite3.Error as e:
+                # The rows stay behind; on the next start they are overdue and checked again
+                logging.error(f"Failed to delete {len(keys)} expired mutes: {e}")
+
+    def _retry(self, key, role_id: int, now: float):
+        attempts = self._attempts.get(key, 0) + 1
+        self._attempts[key] = attempts
+        delay = min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+        logging.warning(f"Mute of member {key[1]} in guild {key[0]} could not be lifted (attempt {attempts}), retrying in {delay}s")
+        # Only the in-memory schedule moves; the stored expiry stays, so after a restart the mute is simply overdue
+        retry_at = now + delay
+        self._active[key] = (role_id, retry_at)
+        heapq.heappush(self._heap, (retry_at, key[0], key[1]))
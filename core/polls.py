@@ -0,0 +1,260 @@
+import asyncio
+import heapq
+import json
+import logging
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+
+
+class Poll:
+    __slots__ = ('id', 'guild_id', 'channel_id', 'message_id', 'author_id', 'question', 'options', 'closes_at', 'counts', 'votes')
+
+    def __init__(self, poll_id: int, guild_id, channel_id: int, author_id: int, question: str, options, closes_at: float, message_id: int = None):
+        self.id = poll_id
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.message_id = message_id
+        self.author_id = author_id
+        self.question = question
+        self.options = tuple(options)
+        self.closes_at = closes_at  # unix time
+        self.counts = array('I', bytes(4 * len(self.options)))
+        self.votes = {}  # user_id -> option index
+
+    @property
+    def total(self) -> int:
+        return len(self.votes)
+
+    def vote(self, user_id: int, option: int):
+        """One vote per user: picking another option moves the vote, picking the same one again retracts it.
+
+        Returns the user's option afterwards, or None when retracted.
+        """
+        previous = self.votes.get(user_id)
+        if previous is not None:
+            self.counts[previous] -= 1
+        if previous == option:
+            del self.votes[user_id]
+            return None
+        self.votes[user_id] = option
+        self.counts[option] += 1
+        return option
+
+
+class PollStore:
+    """SQLite storage for open polls and their votes."""
+
+    def __init__(self, path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS polls ("
+            "id INTEGER PRIMARY KEY, "
+            "guild_id INTEGER, "
+            "channel_id INTEGER NOT NULL, "
+            "message_id INTEGER, "
+            "author_id INTEGER NOT NULL, "
+            "question TEXT NOT NULL, "
+            "options TEXT NOT NULL, "
+            "closes_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS votes ("
+            "poll_id INTEGER NOT NULL, "
+            "user_id INTEGER NOT NULL, "
+            "option INTEGER NOT NULL, "
+            "PRIMARY KEY (poll_id, user_id)) WITHOUT ROWID"
+        )
+
+    def add(self, poll: Poll):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO polls (id, guild_id, channel_id, message_id, author_id, question, options, closes_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (poll.id, poll.guild_id, poll.channel_id, poll.message_id, poll.author_id, poll.question,
+                 json.dumps(poll.options), poll.closes_at),
+            )
+
+    def write_votes(self, upserts, deletes):
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT OR REPLACE INTO votes (poll_id, user_id, option) VALUES (?, ?, ?)", upserts)
+            self._conn.executemany("DELETE FROM votes WHERE poll_id = ? AND user_id = ?", deletes)
+
+    def delete(self, poll_id: int):
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM votes WHERE poll_id = ?", (poll_id,))
+            self._conn.execute("DELETE FROM polls WHERE id = ?", (poll_id,))
+
+    def load(self):
+        """Returns every stored poll with its votes applied."""
+        with self._lock:
+            poll_rows = self._conn.execute(
+                "SELECT id, guild_id, channel_id, message_id, author_id, question, options, closes_at FROM polls"
+            ).fetchall()
+            vote_rows = self._conn.execute("SELECT poll_id, user_id, option FROM votes").fetchall()
+        polls = {}
+        for poll_id, guild_id, channel_id, message_id, author_id, question, options, closes_at in poll_rows:
+            polls[poll_id] = Poll(poll_id, guild_id, channel_id, author_id, question, json.loads(options), closes_at, message_id)
+        for poll_id, user_id, option in vote_rows:
+            poll = polls.get(poll_id)
+            if poll is not None and option < len(poll.options):
+                poll.vote(user_id, option)
+        return list(polls.values())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class PollManager:
+    """Open polls held in memory, with coalesced message edits, periodic snapshots and scheduled closing.
+
+    A vote only updates counters and schedules a re-render of its poll; further
+    votes within ``edit_interval`` of the last edit join the pending one, so a
+    busy poll costs one message edit per interval however many votes arrive.
+    Changed votes are written to the store in one transaction every
+    ``snapshot_interval`` seconds.
+    """
+
+    def __init__(self, store: PollStore, render, finish, edit_interval: float = 2.0, snapshot_interval: float = 10.0, owns_guild=None):
+        self.store = store
+        self._owns_guild = owns_guild  # the store may be shared; only these guilds' polls are loaded
+        self._render = render  # async render(poll): updates the poll message
+        self._finish = finish  # async finish(poll): posts the final results
+        self.edit_interval = edit_interval
+        self.snapshot_interval = snapshot_interval
+        self.polls = {}  # poll id -> Poll
+        self._heap = []  # (closes_at, poll id)
+        self._wakeup = asyncio.Event()
+        self._pending_edits = {}  # poll id -> task
+        self._last_edit = {}  # poll id -> monotonic time of the last edit
+        self._dirty = {}  # (poll id, user id) -> option, or None for a retracted vote
+        # Serializes snapshots and deletes, so a snapshot already writing can never land after its poll's delete
+        self._store_lock = asyncio.Lock()
+        self._tasks = []
+
+    def __len__(self):
+        return len(self.polls)
+
+    async def start(self):
+        for poll in await asyncio.to_thread(self.store.load):
+            if self._owns_guild and not self._owns_guild(poll.guild_id):
+                continue
+            self.polls[poll.id] = poll
+            self._heap.append((poll.closes_at, poll.id))
+        heapq.heapify(self._heap)
+        self._tasks = [asyncio.create_task(self._run_closer()), asyncio.create_task(self._run_snapshots())]
+        logging.info(f"Poll manager started with {len(self.polls)} open polls")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        # Let edits that were already waiting go out before the final snapshot
+        pending = list(self._pending_edits.values())
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        await self.flush()
+        await asyncio.to_thread(self.store.close)
+
+    def add(self, poll: Poll):
+        """Opens ``poll`` for voting; call :meth:`save` once its message exists."""
+        self.polls[poll.id] = poll
+        heapq.heappush(self._heap, (poll.closes_at, poll.id))
+        if self._heap[0][1] == poll.id:
+            self._wakeup.set()
+
+    async def save(self, poll: Poll):
+        await asyncio.to_thread(self.store.add, poll)
+
+    def discard(self, poll_id: int):
+        self.polls.pop(poll_id, None)
+
+    def vote(self, poll_id: int, user_id: int, option: int):
+        """Returns ``(poll, option after the vote)``, or None if the poll is not open."""
+        poll = self.polls.get(poll_id)
+        if poll is None or option >= len(poll.options):
+            return None
+        choice = poll.vote(user_id, option)
+        self._dirty[(poll_id, user_id)] = choice
+        self._schedule_edit(poll)
+        return poll, choice
+
+    def _schedule_edit(self, poll: Poll):
+        if poll.id in self._pending_edits:
+            return
+        delay = self._last_edit.get(poll.id, 0.0) + self.edit_interval - time.monotonic()
+        self._pending_edits[poll.id] = asyncio.create_task(self._edit_later(poll, max(delay, 0.0)))
+
+    async def _edit_later(self, poll: Poll, delay: float):
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            # Votes from here on schedule the next edit
+            self._pending_edits.pop(poll.id, None)
+        self._last_edit[poll.id] = time.monotonic()
+        try:
+            await self._render(poll)
+        except Exception as e:
+            logging.warning(f"Failed to update poll {poll.id}: {e}")
+
+    async def close(self, poll_id: int):
+        poll = self.polls.pop(poll_id, None)
+        if poll is None:
+            return None
+        edit = self._pending_edits.pop(poll_id, None)
+        if edit is not None:
+            edit.cancel()
+        self._last_edit.pop(poll_id, None)
+        try:
+            await self._finish(poll)
+        except Exception:
+            logging.exception(f"Failed to post the results of poll {poll_id}")
+        async with self._store_lock:
+            self._dirty = {key: option for key, option in self._dirty.items() if key[0] != poll_id}
+            await asyncio.to_thread(self.store.delete, poll_id)
+        return poll
+
+    async def flush(self):
+        async with self._store_lock:
+            if not self._dirty:
+                return
+            dirty, self._dirty = self._dirty, {}
+            upserts = [(poll_id, user_id, option) for (poll_id, user_id), option in dirty.items() if option is not None]
+            deletes = [key for key, option in dirty.items() if option is None]
+            try:
+                await asyncio.to_thread(self.store.write_votes, upserts, deletes)
+            except sqlite3.Error as e:
+                logging.error(f"Failed to snapshot {len(dirty)} poll votes, retrying: {e}")
+                for key, option in dirty.items():
+                    self._dirty.setdefault(key, option)
+
+    async def _run_snapshots(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            await self.flush()
+
+    async def _run_closer(self):
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+            closes_at, poll_id = self._heap[0]
+            delay = closes_at - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._heap)
+            if poll_id in self.polls:
+                await self.close(poll_id)
@@ -0,0 +1,92 @@
+import logging
+
+from aiohttp import web
+
+from core.command_metrics import BUCKETS
+
+
+def _label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _histogram_lines(metric: str, labels: str, histogram):
+    lines = []
+    cumulative = 0
+    for bound, count in zip(BUCKETS + (float('inf'),), histogram.counts):
+        cumulative += count
+        le = '+Inf' if bound == float('inf') else repr(bound)
+        lines.append(f'{metric}_bucket{{{labels},le="{le}"}} {cumulative}')
+    lines.append(f'{metric}_sum{{{labels}}} {histogram.total}')
+    lines.append(f'{metric}_count{{{labels}}} {histogram.count}')
+    return lines
+
+
+def render(bot) -> str:
+    """Renders command and system metrics in the Prometheus text exposition format."""
+    commands = sorted(bot.tree.command_metrics.commands.items())
+    lines = []
+    for metric, attribute, help_text in (
+        ('discord_command_invocations_total', 'count', 'Application command invocations.'),
+        ('discord_command_errors_total', 'errors', 'Application commands that failed.'),
+        ('discord_command_cooldown_rejections_total', 'cooldowns', 'Invocations rejected by a cooldown.'),
+    ):
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} counter')
+        for name, stats in commands:
+            lines.append(f'{metric}{{command="{_label(name)}"}} {getattr(stats, attribute)}')
+
+    for metric, attribute, help_text in (
+        ('discord_command_first_response_seconds', 'first_response', 'Time from receiving the interaction to the first response.'),
+        ('discord_command_duration_seconds', 'duration', 'Total time spent running the command.'),
+    ):
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} histogram')
+        for name, stats in commands:
+            lines.extend(_histogram_lines(metric, f'command="{_label(name)}"', getattr(stats, attribute)))
+
+    limiter = bot.rate_limits
+    lines.append('# HELP discord_rate_limit_rejections_total Invocations rejected by a rate limit rule.')
+    lines.append('# TYPE discord_rate_limit_rejections_total counter')
+    for rule in limiter.rules:
+        lines.append(f'discord_rate_limit_rejections_total{{rule="{_label(rule.name)}"}} {limiter.rejections[rule.name]}')
+    lines.append('# TYPE discord_rate_limit_buckets gauge')
+    lines.append(f'discord_rate_limit_buckets {len(limiter)}')
+
+    sampler = bot.system_metrics
+    if sampler is not None:
+        for name in sampler.METRICS:
+            value = sampler.last(name)
+            if value is not None:
+                lines.append(f'# TYPE bot_{name} gauge')
+                lines.append(f'bot_{name} {value}')
+
+    lines.append('# TYPE discord_guilds gauge')
+    lines.append(f'discord_guilds {len(bot.guilds)}')
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """Serves ``/metrics`` over HTTP on a local port."""
+
+    def __init__(self, bot, host: str, port: int):
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def handle_metrics(self, request):
+        return web.Response(text=render(self.bot), content_type='text/plain', charset='utf-8',
+                            headers={'X-Content-Type-Options': 'nosniff'})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logging.info(f"Metrics endpoint listening on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
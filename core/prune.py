@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import re
+from datetime import timedelta
+
+import discord
+
+# Discord only bulk-deletes messages younger than 14 days; the margin covers the time a chunk waits
+BULK_DELETE_MAX_AGE = timedelta(days=14) - timedelta(minutes=5)
+BULK_DELETE_CHUNK = 100
+_DURATION_UNITS = {'d': 86400, 'h': 3600, 'm': 60, 's': 1}
+
+
+def parse_duration(text: str) -> timedelta:
+    """Parses durations like ``30m`` or ``1d12h``; raises ValueError otherwise."""
+    parts = re.fullmatch(r'(?:\d+[dhms])+', text.strip().lower())
+    if not parts:
+        raise ValueError(f"Invalid duration: {text}")
+    return timedelta(seconds=sum(int(number) * _DURATION_UNITS[unit] for number, unit in re.findall(r'(\d+)([dhms])', parts.group())))
+
+
+class PruneFilter:
+    """Which messages a prune deletes; unset criteria match everything."""
+
+    __slots__ = ('author_id', 'pattern', 'attachments', 'embeds')
+
+    def __init__(self, author_id: int = None, pattern: str = None, attachments: bool = None, embeds: bool = None):
+        self.author_id = author_id
+        self.pattern = re.compile(pattern, re.IGNORECASE) if pattern else None
+        self.attachments = attachments
+        self.embeds = embeds
+
+    def matches(self, message: discord.Message) -> bool:
+        if self.author_id is not None and message.author.id != self.author_id:
+            return False
+        if self.attachments is not None and bool(message.attachments) != self.attachments:
+            return False
+        if self.embeds is not None and bool(message.embeds) != self.embeds:
+            return False
+        return self.pattern is None or self.pattern.search(message.content) is not None
+
+
+class PruneJob:
+    """Deletes the matching messages of one channel while streaming its history, newest first.
+
+    History is read a page at a time. Matches younger than 14 days go out in
+    bulk deletes of up to 100; older ones go through a bounded queue to a
+    single worker that deletes them one by one, ``single_delete_interval``
+    seconds apart. A full queue pauses the scan, so memory stays at a page
+    and a chunk whatever the channel's size.
+    """
+
+    def __init__(self, channel, message_filter: PruneFilter, limit: int = None, after=None, before=None, single_delete_interval: float = 1.0):
+        self.channel = channel
+        self.filter = message_filter
+        self.limit = limit  # newest messages to scan; None scans the whole window
+        self.after = after  # datetime bounds of the window
+        self.before = before
+        self.single_delete_interval = single_delete_interval
+        self.scanned = 0
+        self.matched = 0
+        self.deleted = 0
+        self.failed = 0
+        self.done = False
+
+    async def run(self):
+        cutoff = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+        old_messages = asyncio.Queue(maxsize=BULK_DELETE_CHUNK)
+        worker = asyncio.create_task(self._delete_one_by_one(old_messages))
+        chunk = []
+        try:
+            async for message in self.channel.history(limit=self.limit, before=self.before):
+                if self.after is not None and message.created_at <= self.after:
+                    break
+                self.scanned += 1
+                if not self.filter.matches(message):
+                    continue
+                self.matched += 1
+                if message.created_at > cutoff:
+                    chunk.append(message)
+                    if len(chunk) == BULK_DELETE_CHUNK:
+                        await self._bulk_delete(chunk)
+                        chunk = []
+                else:
+                    if chunk:
+                        # History is newest first, so everything from here on is too old for bulk deletes
+                        await self._bulk_delete(chunk)
+                        chunk = []
+                    await old_messages.put(message)
+            if chunk:
+                await self._bulk_delete(chunk)
+            await old_messages.join()
+        finally:
+            worker.cancel()
+            self.done = True
+
+    async def _bulk_delete(self, messages):
+        try:
+            await self.channel.delete_messages(messages)
+            self.deleted += len(messages)
+        except discord.HTTPException as e:
+            logging.warning(f"Bulk delete of {len(messages)} messages in {self.channel} failed: {e}")
+            self.failed += len(messages)
+
+    async def _delete_one_by_one(self, queue: asyncio.Queue):
+        while True:
+            message = await queue.get()
+            try:
+                await message.delete()
+                self.deleted += 1
+            except discord.NotFound:
+                pass
+            except Exception as e:
+                # Any failure (HTTP, connection, timeout) only costs this message; the worker must keep draining the queue
+                logging.warning(f"Failed to delete message {message.id} in {self.channel}: {e}")
+                self.failed += 1
+            finally:
+                queue.task_done()
+            await asyncio.sleep(self.single_delete_interval)
@@ -0,0 +1,110 @@
+import time
+from collections import Counter
+
+from discord import app_commands
+
+
+class Rule:
+    """``rate`` uses per ``per`` seconds for each user/guild/channel (or globally) on matching commands."""
+
+    __slots__ = ('name', 'commands', 'scope', 'rate', 'per', 'per_command', 'interval')
+
+    def __init__(self, name: str, scope: str = 'user', rate: int = 1, per: float = 5.0, commands=(), per_command: bool = False):
+        self.name = name
+        self.commands = tuple(commands)  # qualified-name prefixes such as 'fun' or 'moderation ban'; empty = all
+        self.scope = scope
+        self.rate = rate
+        self.per = per
+        self.per_command = per_command
+        self.interval = per / rate
+
+    def matches(self, command_name: str) -> bool:
+        return not self.commands or any(command_name == prefix or command_name.startswith(prefix + ' ') for prefix in self.commands)
+
+    def scope_id(self, interaction):
+        if self.scope == 'user':
+            return interaction.user.id
+        if self.scope == 'guild':
+            return interaction.guild_id
+        if self.scope == 'channel':
+            return interaction.channel_id
+        return 0
+
+
+class RateLimiter:
+    """Token buckets for every rule, stored as one float per key (GCRA).
+
+    A key's value is its bucket's "theoretical arrival time": a use is allowed if
+    it is at most ``per - interval`` ahead of now, and each use pushes it
+    ``interval`` further. A value in the past is a full bucket, so it is simply
+    dropped. Each bucket dict is kept in update order, which makes the sweep
+    pop from the front until it reaches a live bucket instead of scanning them all.
+    """
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self._buckets = {}  # (rule index, command name or None) -> {scope id: theoretical arrival time}
+        self._matching = {}  # command name -> indexes of the rules that apply
+        self.rejections = Counter()  # rule name -> rejected uses
+
+    def __len__(self):
+        return sum(len(buckets) for buckets in self._buckets.values())
+
+    def rules_for(self, command_name: str):
+        indexes = self._matching.get(command_name)
+        if indexes is None:
+            indexes = self._matching[command_name] = [index for index, rule in enumerate(self.rules) if rule.matches(command_name)]
+        return indexes
+
+    def hit(self, command_name: str, interaction, now: float = None):
+        """Consumes one use from every matching bucket, or none of them.
+
+        Returns None when allowed, otherwise ``(rule, retry_after)`` for the rule that waits longest.
+        """
+        now = time.monotonic() if now is None else now
+        updates = []
+        rejected = None
+        for index in self.rules_for(command_name):
+            rule = self.rules[index]
+            scope_id = rule.scope_id(interaction)
+            if scope_id is None:
+                continue  # guild rules don't apply in DMs
+            buckets = self._buckets.setdefault((index, command_name if rule.per_command else None), {})
+            arrival = max(buckets.get(scope_id, now), now) + rule.interval
+            retry_after = arrival - rule.per - now
+            if retry_after > 0:
+                self.rejections[rule.name] += 1
+                if rejected is None or retry_after > rejected[1]:
+                    rejected = (rule, retry_after)
+            else:
+                updates.append((buckets, scope_id, arrival))
+        if rejected is not None:
+            return rejected
+        for buckets, scope_id, arrival in updates:
+            buckets.pop(scope_id, None)  # re-insert at the end to keep update order
+            buckets[scope_id] = arrival
+        return None
+
+    def sweep(self, now: float = None) -> int:
+        """Drops buckets that have refilled completely; returns how many."""
+        now = time.monotonic() if now is None else now
+        dropped = 0
+        for key in list(self._buckets):
+            buckets = self._buckets[key]
+            while buckets:
+                scope_id = next(iter(buckets))
+                if buckets[scope_id] > now:
+                    break
+                del buckets[scope_id]
+                dropped += 1
+            if not buckets:
+                del self._buckets[key]
+        return dropped
+
+    async def check(self, interaction) -> bool:
+        """App command check; raises ``CommandOnCooldown`` so the usual cooldown handlers apply."""
+        rejected = self.hit(interaction.command.qualified_name, interaction)
+        if rejected is None:
+            return True
+        rule, retry_after = rejected
+        raise app_commands.CommandOnCooldown(app_commands.Cooldown(rule.rate, rule.per), retry_after)
@@ -0,0 +1,166 @@
+import asyncio
+import heapq
+import logging
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import discord
+
+Reminder = namedtuple("Reminder", "id due user_id channel_id message guild_id")
+
+# Heap entries are packed into a single int: due time in milliseconds in the
+# high bits and the reminder row id in the low 40 bits. A pending reminder then
+# costs one small int in memory; the text lives only in SQLite.
+_ID_BITS = 40
+_ID_MASK = (1 << _ID_BITS) - 1
+
+# Failed deliveries are retried after 30s, doubling up to an hour
+RETRY_BASE_DELAY = 30
+RETRY_MAX_DELAY = 3600
+
+
+def _pack(due: float, reminder_id: int) -> int:
+    return (int(due * 1000) << _ID_BITS) | reminder_id
+
+
+def _unpack(entry: int):
+    return (entry >> _ID_BITS) / 1000, entry & _ID_MASK
+
+
+class ReminderStore:
+    """SQLite storage for pending reminders."""
+
+    def __init__(self, path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS reminders ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "due REAL NOT NULL, "
+            "user_id INTEGER NOT NULL, "
+            "channel_id INTEGER, "
+            "message TEXT NOT NULL, "
+            "guild_id INTEGER)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(reminders)")}
+        if 'guild_id' not in columns:
+            # Reminders stored before clusters shared this file; they go to the primary cluster
+            self._conn.execute("ALTER TABLE reminders ADD COLUMN guild_id INTEGER")
+
+    def add(self, due: float, user_id: int, channel_id, message: str, guild_id=None) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO reminders (due, user_id, channel_id, message, guild_id) VALUES (?, ?, ?, ?, ?)",
+                (due, user_id, channel_id, message, guild_id),
+            )
+            return cursor.lastrowid
+
+    def get(self, reminder_id: int):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, due, user_id, channel_id, message, guild_id FROM reminders WHERE id = ?",
+                (reminder_id,),
+            ).fetchone()
+        return Reminder(*row) if row else None
+
+    def delete(self, reminder_id: int):
+        with self._lock:
+            self._conn.execute("DELETE FROM reminders WHERE id = ?", (reminder_id,))
+
+    def pending(self):
+        with self._lock:
+            return self._conn.execute("SELECT due, id, guild_id FROM reminders").fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ReminderScheduler:
+    """Delivers stored reminders from a single task driven by a min-heap of due times.
+
+    The store may be shared by several clusters; each one only schedules the
+    reminders of guilds ``owns_guild`` accepts.
+    """
+
+    def __init__(self, store: ReminderStore, deliver, owns_guild=None):
+        self.store = store
+        self._deliver = deliver
+        self._owns_guild = owns_guild
+        self._heap = []
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._attempts = {}  # reminder id -> failed deliveries so far
+
+    def __len__(self):
+        return len(self._heap)
+
+    async def start(self):
+        rows = await asyncio.to_thread(self.store.pending)
+        self._heap = [_pack(due, reminder_id) for due, reminder_id, guild_id in rows
+                      if not self._owns_guild or self._owns_guild(guild_id)]
+        heapq.heapify(self._heap)
+        self._task = asyncio.create_task(self._run())
+        logging.info(f"Reminder scheduler started with {len(self._heap)} pending reminders")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.store.close)
+
+    async def add(self, seconds: int, user_id: int, channel_id, message: str, guild_id=None) -> int:
+        due = time.time() + seconds
+        reminder_id = await asyncio.to_thread(self.store.add, due, user_id, channel_id, message, guild_id)
+        entry = _pack(due, reminder_id)
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] == entry:
+            self._wakeup.set()
+        return reminder_id
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+            due, reminder_id = _unpack(self._heap[0])
+            delay = due - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            try:
+                reminder = await asyncio.to_thread(self.store.get, reminder_id)
+                if reminder is not None:
+                    await self._deliver(reminder)
+                    await asyncio.to_thread(self.store.delete, reminder_id)
+                self._attempts.pop(reminder_id, None)
+            except asyncio.CancelledError:
+                raise
+            except (discord.Forbidden, discord.NotFound) as e:
+                # The user or channel is gone or unreachable; retrying cannot help
+                logging.warning(f"Dropping reminder {reminder_id}, it cannot be delivered: {e}")
+                self._attempts.pop(reminder_id, None)
+                await asyncio.to_thread(self.store.delete, reminder_id)
+            except Exception:
+                attempts = self._attempts.get(reminder_id, 0) + 1
+                self._attempts[reminder_id] = attempts
+                delay = min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+                logging.exception(f"Failed to deliver reminder {reminder_id} (attempt {attempts}), retrying in {delay}s")
+                # The stored due time stays as it was, so after a restart the reminder is simply overdue
+                heapq.heappush(self._heap, _pack(time.time() + delay, reminder_id))
@@ -0,0 +1,60 @@
+import time
+from collections import OrderedDict, defaultdict
+
+
+class RenderCache:
+    """Bounded LRU cache with a TTL for rendered payloads (e.g. ``Embed.to_dict()``).
+
+    Entries carry tags such as ``('guild', guild_id)`` so an event can drop
+    exactly the entries it affects with :meth:`invalidate`.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, payload, tags)
+        self._tags = defaultdict(set)  # tag -> keys
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, payload, tags=()):
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, payload, tags)
+        for tag in tags:
+            self._tags[tag].add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def invalidate(self, tag):
+        keys = self._tags.pop(tag, ())
+        for key in list(keys):
+            if key in self._entries:
+                self._remove(key)
+                self.invalidations += 1
+
+    def _remove(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
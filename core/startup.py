@@ -0,0 +1,44 @@
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class StartupTimeline:
+    """Records named phases and marks relative to process start, for a JSON startup report."""
+
+    MAX_PHASES = 500
+
+    def __init__(self, origin: float = None):
+        self.origin = time.perf_counter() if origin is None else origin
+        self.phases = []
+        self.marks = {}
+
+    def _offset_ms(self, moment: float) -> float:
+        return round((moment - self.origin) * 1000, 2)
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            if len(self.phases) < self.MAX_PHASES:
+                self.phases.append({
+                    'name': name,
+                    'start_ms': self._offset_ms(started),
+                    'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+                })
+
+    def mark(self, name: str):
+        """Records the first time ``name`` happens (e.g. the first on_ready)."""
+        self.marks.setdefault(name, self._offset_ms(time.perf_counter()))
+
+    def report(self) -> dict:
+        return {
+            'marks_ms': dict(self.marks),
+            'phases': sorted(self.phases, key=lambda phase: phase['start_ms']),
+        }
+
+    def write(self, path):
+        Path(path).write_text(json.dumps(self.report(), indent=2), encoding='utf-8')
@@ -0,0 +1,87 @@
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+
+_ARTICLES = ('the ', 'a ', 'an ')
+
+
+def normalize_answer(text: str) -> str:
+    """Folds case, accents, punctuation, extra spaces and a leading article ("The Beatles" == "beatles")."""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char)).casefold()
+    text = ' '.join(re.sub(r"[^\w\s]", ' ', text).split())
+    for article in _ARTICLES:
+        if text.startswith(article) and len(text) > len(article):
+            return text[len(article):]
+    return text
+
+
+class TriviaSession:
+    __slots__ = ('question', 'answer', 'accepted', 'expires_at')
+
+    def __init__(self, question: str, answer: str, accepted, expires_at: float):
+        self.question = question
+        self.answer = answer
+        self.accepted = accepted  # normalized answer and aliases
+        self.expires_at = expires_at
+
+    def is_correct(self, answer: str) -> bool:
+        return normalize_answer(answer) in self.accepted
+
+
+class TriviaSessions:
+    """Open trivia questions keyed by channel (or user in DMs), bounded in size and age.
+
+    Every session gets the same TTL when it starts and a restarted session moves
+    to the end, so the dict stays ordered by expiry: the sweep pops expired
+    sessions from the front and stops at the first live one, and evicting the
+    oldest session when full is the same pop.
+    """
+
+    def __init__(self, max_sessions: int = 10000, ttl: float = 120.0):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()  # key -> TriviaSession, soonest expiry first
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def start(self, key, question: str, answer: str, aliases=()) -> TriviaSession:
+        now = time.monotonic()
+        self.sweep(now)
+        self._sessions.pop(key, None)
+        accepted = frozenset(normalize_answer(text) for text in (answer, *aliases))
+        session = self._sessions[key] = TriviaSession(question, answer, accepted, now + self.ttl)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+        return session
+
+    def get(self, key):
+        session = self._sessions.get(key)
+        if session is not None and session.expires_at <= time.monotonic():
+            del self._sessions[key]
+            self.expirations += 1
+            return None
+        return session
+
+    def pop(self, key):
+        session = self.get(key)
+        if session is not None:
+            del self._sessions[key]
+        return session
+
+    def sweep(self, now: float = None) -> int:
+        now = time.monotonic() if now is None else now
+        expired = 0
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if session.expires_at > now:
+                break
+            del self._sessions[key]
+            expired += 1
+        self.expirations += expired
+        return expired
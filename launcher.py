@@ -0,0 +1,110 @@
+"""Runs the bot as several processes ("clusters"), each owning a contiguous range of shards.
+
+Usage: python launcher.py
+
+The cluster layout comes from the ``cluster`` section of config/config.yaml. The
+launcher hosts the IPC hub the clusters use to answer owner commands for all
+guilds, and restarts a cluster process that exits unexpectedly.
+"""
+import asyncio
+import logging
+import os
+import signal
+import sys
+import time
+
+import aiohttp
+import yaml
+
+from core.cluster import ClusterHub, shard_chunks
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+def load_settings():
+    with open('config/config.yaml', 'r') as config_file:
+        config_data = yaml.safe_load(config_file)
+    bot = config_data.get('bot') or {}
+    cluster = config_data.get('cluster') or {}
+    return {
+        'token': bot.get('token'),
+        'api_base': bot.get('api_base') or 'https://discord.com/api/v10',
+        'shard_count': cluster.get('shard_count'),
+        'clusters': cluster.get('clusters', 1),
+        'socket_path': cluster.get('socket_path', 'data/cluster.sock'),
+    }
+
+
+async def recommended_shard_count(token: str, api_base: str) -> int:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{api_base}/gateway/bot", headers={'Authorization': f'Bot {token}'}) as response:
+            response.raise_for_status()
+            return (await response.json())['shards']
+
+
+class Launcher:
+    def __init__(self, shard_count: int, clusters: int, socket_path: str):
+        self.layout = shard_chunks(shard_count, clusters)
+        self.shard_count = shard_count
+        self.socket_path = socket_path
+        self.hub = ClusterHub(socket_path)
+        self.processes = {}
+        self.stopping = asyncio.Event()
+
+    async def run(self):
+        await self.hub.start()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.stopping.set)
+        logging.info(f"Starting {len(self.layout)} cluster(s) for {self.shard_count} shard(s): {self.layout}")
+        supervisors = [asyncio.create_task(self.supervise(cluster_id, shard_ids)) for cluster_id, shard_ids in enumerate(self.layout)]
+        await self.stopping.wait()
+        logging.info("Stopping clusters")
+        for process in self.processes.values():
+            if process.returncode is None:
+                process.terminate()
+        try:
+            await asyncio.wait_for(asyncio.gather(*supervisors), timeout=30)
+        except asyncio.TimeoutError:
+            for process in self.processes.values():
+                if process.returncode is None:
+                    process.kill()
+        await self.hub.stop()
+
+    async def supervise(self, cluster_id: int, shard_ids):
+        env = dict(
+            os.environ,
+            CLUSTER_ID=str(cluster_id),
+            CLUSTER_COUNT=str(len(self.layout)),
+            SHARD_IDS=','.join(map(str, shard_ids)),
+            SHARD_COUNT=str(self.shard_count),
+            CLUSTER_SOCKET=str(self.socket_path),
+        )
+        failures = 0
+        while not self.stopping.is_set():
+            started = time.monotonic()
+            # New session so a Ctrl+C in the terminal reaches the launcher only; it stops the clusters itself
+            process = self.processes[cluster_id] = await asyncio.create_subprocess_exec(sys.executable, 'main.py', env=env, start_new_session=True)
+            logging.info(f"Cluster {cluster_id} started (pid {process.pid}, shards {shard_ids})")
+            code = await process.wait()
+            if self.stopping.is_set():
+                logging.info(f"Cluster {cluster_id} stopped")
+                return
+            failures = 0 if time.monotonic() - started > 60 else failures + 1
+            delay = min(60, 2 ** failures)
+            logging.warning(f"Cluster {cluster_id} exited with code {code}; restarting in {delay}s")
+            try:
+                await asyncio.wait_for(self.stopping.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def main():
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    settings = load_settings()
+    shard_count = settings['shard_count'] or await recommended_shard_count(settings['token'], settings['api_base'])
+    await Launcher(shard_count, settings['clusters'], settings['socket_path']).run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
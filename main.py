@@ -1,6 +1,10 @@
+import time
+PROCESS_STARTED = time.perf_counter()  # Origin of the startup timeline
+
 import os
 import yaml
 import certifi
+import yarl
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
@@ -8,10 +12,29 @@ import logging
 import random
 import asyncio
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueListener, RotatingFileHandler
+import queue
 from pydantic import BaseModel, ValidationError
 import signal
 import sys
+import atexit
+from typing import Literal, Optional
+from core.cluster import ClusterClient
+from core.command_metrics import InstrumentedCommandTree
+from core.command_sync import CommandSyncState, diff_commands, fingerprint_tree
+from core.hot_reload import ExtensionWatcher
+from core.lazy_extensions import LazyExtensions
+from core.log_dedup import DedupFilter
+from core.log_index import RecentErrorHandler
+from core.log_queue import BoundedQueueHandler, JsonFormatter
+from core.loop_monitor import LoopMonitor
+from core.metrics import SystemSampler
+from core.prometheus import MetricsServer
+from core.rate_limits import RateLimiter, Rule
+from core.startup import StartupTimeline
+
+startup = StartupTimeline(origin=PROCESS_STARTED)
+startup.mark('imports')
 
 # Set the environment variable to use certifi certificates
 os.environ['SSL_CERT_FILE'] = certifi.where()
@@ -22,16 +45,129 @@ class BotConfig(BaseModel):
     owner_id: int
     command_prefix: str
     status_update_interval: int
+    presences_intent: bool = False
+    # Sync commands to this guild only (instant, for testing) instead of globally
+    sync_guild_id: Optional[int] = None
+    # Extensions imported on first use of one of their commands, e.g. ['cogs.owner_tools']
+    lazy_extensions: list[str] = []
+    # Reload changed cogs automatically (meant for staging); checked every auto_reload_interval seconds
+    auto_reload: bool = False
+    auto_reload_interval: float = 2.0
+    # Point the bot at a local fake gateway (tools/fake_gateway.py) for end-to-end tests
+    api_base: Optional[str] = None
+    gateway_url: Optional[str] = None
+
+class LogDedupConfig(BaseModel):
+    window: float = 60.0
+    limits: dict[str, int] = {'DEBUG': 20, 'INFO': 20, 'WARNING': 10, 'ERROR': 5, 'CRITICAL': 0}
 
 class LoggingConfig(BaseModel):
     file: str
     level: str
+    recent_errors_capacity: int = 1000
+    format: Literal['text', 'json'] = 'text'
+    queue_size: int = 10000
+    queue_policy: Literal['drop', 'block'] = 'drop'
+    dedup: LogDedupConfig = LogDedupConfig()
+
+class StorageConfig(BaseModel):
+    data_dir: str = 'data'
+
+class ModerationConfig(BaseModel):
+    mute_backend: Literal['timeout', 'role'] = 'timeout'
+    overwrite_concurrency: int = 5
+    # Parallel requests and maximum targets for /moderation bulk_ban, bulk_kick and bulk_unban
+    bulk_concurrency: int = 5
+    bulk_max_targets: int = 1000
+    # Seconds between batched writes of moderation cases to data/cases.db
+    case_flush_interval: float = 2.0
+
+class OwnerToolsConfig(BaseModel):
+    broadcast_concurrency: int = 10
+    # Seconds between deletes of messages older than 14 days, which Discord cannot bulk-delete
+    prune_delete_interval: float = 1.0
+
+class MetricsConfig(BaseModel):
+    sample_interval: float = 5.0
+    window_minutes: int = 60
+    http_host: str = '127.0.0.1'
+    http_port: Optional[int] = None
+    loop_lag_interval: float = 0.25
+    slow_callback_threshold: float = 0.1
+
+class FunConfig(BaseModel):
+    trivia_ttl: float = 120.0
+    trivia_max_sessions: int = 10000
+    content_dir: str = 'content'
+    no_repeat_window: int = 50
+    leaderboard_flush_interval: float = 5.0
+
+class ClusterConfig(BaseModel):
+    # None lets Discord recommend the shard count
+    shard_count: Optional[int] = None
+    # Processes started by launcher.py; each runs a contiguous range of shards
+    clusters: int = 1
+    socket_path: str = 'data/cluster.sock'
+    ipc_timeout: float = 10.0
+
+class RateLimitRule(BaseModel):
+    name: str
+    # Qualified-name prefixes the rule applies to, e.g. ['fun', 'moderation ban']; empty = every command
+    commands: list[str] = []
+    scope: Literal['user', 'guild', 'channel', 'global'] = 'user'
+    rate: int = 1
+    per: float = 5.0
+    # Separate bucket for each matching command instead of one shared by all of them
+    per_command: bool = False
+
+class RateLimitConfig(BaseModel):
+    sweep_interval: float = 60.0
+    rules: list[RateLimitRule] = [
+        RateLimitRule(name='commands', commands=['fun', 'utils', 'moderation'], rate=1, per=5.0, per_command=True),
+    ]
+
+class AutomodConfig(BaseModel):
+    enabled: bool = False
+    # Matched case-insensitively; whole_words keeps 'ass' from matching 'class'
+    banned_terms: list[str] = []
+    whole_words: bool = True
+    # More than flood_messages within flood_window seconds is a flood
+    flood_messages: int = 6
+    flood_window: float = 5.0
+    # The same text duplicate_messages times in a row, each within duplicate_window seconds of the last
+    duplicate_messages: int = 4
+    duplicate_window: float = 30.0
+    # Timeout for floods and duplicates (0 only deletes); banned terms are only deleted
+    timeout_seconds: int = 300
+    # Name of the channel in each guild that gets a note per action
+    log_channel: Optional[str] = None
+    queue_size: int = 1000
+    workers: int = 2
+
+class UtilsConfig(BaseModel):
+    render_cache_size: int = 2048
+    render_cache_ttl: float = 300.0
+    # Polls: minutes a poll stays open by default, seconds between edits of a busy poll's message,
+    # and seconds between vote snapshots to data/polls.db
+    poll_default_duration: int = 1440
+    poll_edit_interval: float = 2.0
+    poll_snapshot_interval: float = 10.0
 
 class Config(BaseModel):
     bot: BotConfig
     logging: LoggingConfig
+    storage: StorageConfig = StorageConfig()
+    moderation: ModerationConfig = ModerationConfig()
+    owner_tools: OwnerToolsConfig = OwnerToolsConfig()
+    metrics: MetricsConfig = MetricsConfig()
+    utils: UtilsConfig = UtilsConfig()
+    fun: FunConfig = FunConfig()
+    cluster: ClusterConfig = ClusterConfig()
+    rate_limits: RateLimitConfig = RateLimitConfig()
+    automod: AutomodConfig = AutomodConfig()
 
 def load_config():
+    try:
         with open('config/config.yaml', 'r') as config_file:
             config_data = yaml.safe_load(config_file)
             return Config(**config_data)
@@ -40,14 +176,27 @@ def load_config():
     except ValidationError as e:
         raise ValueError(f"Configuration error: {e}")
 
-config = load_config()
+with startup.phase("config"):
+    config = load_config()
 
 TOKEN = config.bot.token
 OWNER_ID = config.bot.owner_id
 COMMAND_PREFIX = config.bot.command_prefix
 STATUS_UPDATE_INTERVAL = config.bot.status_update_interval
+SYNC_GUILD_ID = config.bot.sync_guild_id
 LOG_FILE = config.logging.file
 LOG_LEVEL = config.logging.level.upper()
+DATA_DIR = config.storage.data_dir
+
+# Shard range and IPC socket handed down by launcher.py; standalone when run directly
+cluster = ClusterClient.from_env(timeout=config.cluster.ipc_timeout, shard_count=config.cluster.shard_count)
+if cluster.clustered:
+    # Rotating handlers can't share a file between processes
+    LOG_FILE = str(Path(LOG_FILE).with_suffix(f'.cluster{cluster.cluster_id}{Path(LOG_FILE).suffix}'))
+if config.bot.api_base:
+    discord.http.Route.BASE = config.bot.api_base
+if config.bot.gateway_url:
+    discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(config.bot.gateway_url)
 
 if not TOKEN:
     raise ValueError("No token provided. Please set the DISCORD_BOT_TOKEN variable in the config file.")
@@ -55,35 +204,166 @@ if not OWNER_ID:
     raise ValueError("No owner ID provided. Please set the DISCORD_OWNER_ID variable in the config file.")
 
 # Logging setup
-Path(LOG_FILE).parent.mkdir(parents=True, exist_ok=True)
-logging.basicConfig(level=getattr(logging, LOG_LEVEL, logging.DEBUG), 
-                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-                    handlers=[
-                        RotatingFileHandler(LOG_FILE, maxBytes=5*1024*1024, backupCount=5, encoding='utf-8'),
-                        logging.StreamHandler()
-                    ])
+with startup.phase("logging setup"):
+    Path(LOG_FILE).parent.mkdir(parents=True, exist_ok=True)
+    LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    file_handler = RotatingFileHandler(LOG_FILE, maxBytes=5*1024*1024, backupCount=5, encoding='utf-8')
+    file_handler.setFormatter(JsonFormatter() if config.logging.format == 'json' else logging.Formatter(LOG_FORMAT))
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    # File and console output happen on the listener thread, never on the event loop
+    log_queue = BoundedQueueHandler(queue.Queue(config.logging.queue_size), policy=config.logging.queue_policy)
+    # Collapse floods of identical records (e.g. cooldown spam) before they reach the queue
+    log_dedup = DedupFilter(window=config.logging.dedup.window, limits=config.logging.dedup.limits)
+    log_queue.addFilter(log_dedup)
+    log_listener = QueueListener(log_queue.queue, file_handler, console_handler, respect_handler_level=True)
+    log_listener.start()
+    atexit.register(log_listener.stop)
+    # In-memory index of recent warnings/errors, queried by /ownertools scan_issues
+    recent_errors = RecentErrorHandler(capacity=config.logging.recent_errors_capacity)
+    logging.basicConfig(level=getattr(logging, LOG_LEVEL, logging.DEBUG), 
+                        handlers=[
+                            log_queue,
+                            recent_errors
+                        ])
 logger = logging.getLogger(__name__)
 
 # Create the bot and set the intents
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True  # For member join/leave events
+intents.presences = config.bot.presences_intent  # Privileged; needed for online counts in /utils serverstats
 
-class MyBot(commands.Bot):
+class BotCommandTree(InstrumentedCommandTree):
+    async def _call(self, interaction: discord.Interaction):
+        # Import a lazily loaded extension before its first command is dispatched
+        await self.client.lazy_extensions.ensure_loaded_for(interaction)
+        await super()._call(interaction)
+
+    def add_command(self, command, /, **kwargs):
+        # Every command goes through the shared rate limiter; its rules decide which ones are limited
+        limiter = self.client.rate_limits
+        commands_to_check = [command, *command.walk_commands()] if isinstance(command, app_commands.Group) else [command]
+        for cmd in commands_to_check:
+            if isinstance(cmd, app_commands.Command) and limiter.check not in cmd.checks:
+                cmd.add_check(limiter.check)
+        super().add_command(command, **kwargs)
+
+class MyBot(commands.AutoShardedBot):
     def __init__(self):
         logger.debug("Initializing MyBot")
-        super().__init__(command_prefix=COMMAND_PREFIX, intents=intents)
+        super().__init__(command_prefix=COMMAND_PREFIX, intents=intents, tree_cls=BotCommandTree,
+                         shard_ids=cluster.shard_ids, shard_count=cluster.shard_count)
+        self.config = config
+        self.cluster = cluster
         self.synced = False
+        self.system_metrics = None
+        self.metrics_server = None
+        self.loop_monitor = None
+        self.command_sync_state = CommandSyncState(self.data_path('command_tree.json'))
+        self.recent_errors = recent_errors
+        self.log_queue = log_queue
+        self.log_dedup = log_dedup
+        self.startup = startup
+        self.lazy_extensions = LazyExtensions(self, config.bot.lazy_extensions, self.data_path('lazy_extensions.json'))
+        self.extension_watcher = ExtensionWatcher(self)
+        self.rate_limits = RateLimiter(Rule(**rule.model_dump()) for rule in config.rate_limits.rules)
+
+    def data_path(self, name: str, shared: bool = False) -> Path:
+        # Location for persistent state kept by the bot and its cogs. Shared files (the SQLite
+        # stores, safe between processes in WAL mode) stay in data/ whatever the cluster layout,
+        # so switching to cluster mode or changing the shard split never orphans them; each
+        # cluster only acts on the rows of its own guilds. Other files are kept per cluster.
+        path = Path(DATA_DIR) / name
+        if shared:
+            stale = sorted(Path(DATA_DIR).glob(f'cluster-*/{name}'))
+            if stale:
+                logger.warning(f"Ignoring per-cluster copies of {name} ({', '.join(map(str, stale))}); "
+                               f"all clusters now share {path}, so merge or remove them")
+        elif self.cluster.cluster_count > 1:
+            path = Path(DATA_DIR) / f'cluster-{self.cluster.cluster_id}' / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    async def _load_from_module_spec(self, spec, key):
+        # Time the module import separately from the extension's setup()
+        exec_module = spec.loader.exec_module
+
+        def timed_exec_module(module):
+            with self.startup.phase(f"import {key}"):
+                exec_module(module)
+
+        spec.loader.exec_module = timed_exec_module
+        with self.startup.phase(f"load {key}"):
+            await super()._load_from_module_spec(spec, key)
+        self.extension_watcher.record(key)
 
     async def setup_hook(self):
         logger.debug("Running setup_hook")
+        self.startup.mark('logged_in')
+        await self.cluster.start()
+        self.system_metrics = SystemSampler(
+            asyncio.get_running_loop(),
+            lambda: self.latency,
+            interval=config.metrics.sample_interval,
+            window_minutes=config.metrics.window_minutes,
+        )
+        self.system_metrics.start()
+        self.loop_monitor = LoopMonitor(
+            asyncio.get_running_loop(),
+            interval=config.metrics.loop_lag_interval,
+            threshold=config.metrics.slow_callback_threshold,
+            window_minutes=config.metrics.window_minutes,
+        )
+        self.loop_monitor.start()
+        if config.metrics.http_port:
+            # One port per cluster process
+            port = config.metrics.http_port + self.cluster.cluster_id
+            self.metrics_server = MetricsServer(self, config.metrics.http_host, port)
+            await self.metrics_server.start()
+        self.log_dedup_task.change_interval(seconds=log_dedup.window)
+        self.log_dedup_task.start()
+        self.rate_limit_sweep_task.change_interval(seconds=config.rate_limits.sweep_interval)
+        self.rate_limit_sweep_task.start()
         # Add sync command
         if "sync" not in [cmd.name for cmd in self.tree.get_commands()]:
             self.tree.add_command(sync)
-        await self.tree.sync()
-        logger.info("Sync command added and tree synced")
-        await self.load_extensions()
+        with self.startup.phase("load_extensions"):
+            await self.load_extensions()
         logger.info("Extensions loaded")
+        if self.cluster.is_primary:
+            # Application commands are global; one cluster syncing them is enough
+            with self.startup.phase("sync_commands"):
+                await self.sync_commands()
+        if config.bot.auto_reload:
+            self.auto_reload_task.change_interval(seconds=config.bot.auto_reload_interval)
+            self.auto_reload_task.start()
+
+    async def sync_commands(self, force: bool = False):
+        """Syncs the command tree only if its fingerprint differs from the last synced one.
+
+        Returns ``(synced, (added, removed, changed))`` where ``synced`` is ``None`` when the sync was skipped.
+        """
+        guild = discord.Object(id=SYNC_GUILD_ID) if SYNC_GUILD_ID else None
+        if guild:
+            self.tree.copy_global_to(guild=guild)
+        tree_hash, commands = fingerprint_tree(self.tree, guild=guild, extra_payloads=self.lazy_extensions.pending_payloads())
+        previous_hash, previous_commands = self.command_sync_state.get(self.application_id, guild)
+        changes = diff_commands(previous_commands, commands)
+        scope = f"guild {SYNC_GUILD_ID}" if guild else "globally"
+        if tree_hash == previous_hash and not force:
+            logger.info(f"Command tree unchanged ({tree_hash[:12]}); skipping sync {scope}")
+            return None, changes
+        if self.lazy_extensions.pending:
+            # Discord needs the real commands, so deferred extensions are imported before syncing
+            await self.lazy_extensions.load_all()
+            if guild:
+                self.tree.copy_global_to(guild=guild)
+            tree_hash, commands = fingerprint_tree(self.tree, guild=guild)
+        synced = await self.tree.sync(guild=guild)
+        self.command_sync_state.set(self.application_id, guild, tree_hash, commands)
+        logger.info(f"Synced {len(synced)} commands {scope} ({tree_hash[:12]})")
+        return synced, changes
     
     @tasks.loop(minutes=STATUS_UPDATE_INTERVAL)
     async def status_task(self):
@@ -103,29 +383,67 @@ class MyBot(commands.Bot):
             await self.change_presence(activity=discord.Game(random.choice(statuses)))
             logger.info("Status updated")
 
+    @tasks.loop(seconds=60)
+    async def log_dedup_task(self):
+        self.log_dedup.flush()
+
+    @tasks.loop(seconds=60)
+    async def rate_limit_sweep_task(self):
+        dropped = self.rate_limits.sweep()
+        logger.debug(f"Dropped {dropped} idle rate limit buckets, {len(self.rate_limits)} left")
+
+    @tasks.loop(seconds=2)
+    async def auto_reload_task(self):
+        await self.extension_watcher.reload_changed(retry_failed=False)
+
     async def load_extensions(self):
         logger.debug("Loading extensions")
         cog_directory = Path('cogs')
         if not cog_directory.exists():
             logger.error(f"Cog directory '{cog_directory}' does not exist.")
             return
-        for cog in cog_directory.glob('*.py'):
-            if cog.stem != '__init__':
-                ext = f'cogs.{cog.stem}'
-                try:
-                    if ext in self.extensions:
-                        logger.debug(f"Reloading extension: {ext}")
-                        await self.reload_extension(ext)
-                    else:
-                        logger.debug(f"Loading extension: {ext}")
-                        await self.load_extension(ext)
-                except Exception as e:
-                    logger.exception(f"Failed to load extension {ext}: {e}")
+
+        async def load(ext):
+            try:
+                if ext in self.extensions:
+                    if not self.extension_watcher.is_stale(ext):
+                        # Unchanged cogs keep their in-memory state (cooldowns, trivia, ...)
+                        logger.debug(f"Extension unchanged, not reloading: {ext}")
+                        return
+                    logger.debug(f"Reloading extension: {ext}")
+                    await self.reload_extension(ext)
+                elif self.lazy_extensions.defer(ext):
+                    logger.debug(f"Deferring extension until first use: {ext}")
+                    return
+                else:
+                    logger.debug(f"Loading extension: {ext}")
+                    await self.load_extension(ext)
+                self.lazy_extensions.remember(ext)
+            except Exception as e:
+                logger.exception(f"Failed to load extension {ext}: {e}")
+
+        # Imports still run one at a time, but the async parts of each setup() overlap
+        await asyncio.gather(*(load(f'cogs.{cog.stem}') for cog in cog_directory.glob('*.py') if cog.stem != '__init__'))
 
     async def close(self):
         logger.info("Shutting down bot")
         if self.status_task.is_running():
             self.status_task.cancel()
+        if self.auto_reload_task.is_running():
+            self.auto_reload_task.cancel()
+        if self.log_dedup_task.is_running():
+            self.log_dedup_task.cancel()
+            self.log_dedup.flush()
+        if self.rate_limit_sweep_task.is_running():
+            self.rate_limit_sweep_task.cancel()
+        if self.system_metrics:
+            # Joining the sampler thread can take up to a sample interval; keep it off the event loop
+            await asyncio.to_thread(self.system_metrics.stop)
+        if self.loop_monitor:
+            self.loop_monitor.stop()
+        if self.metrics_server:
+            await self.metrics_server.stop()
+        await self.cluster.stop()
         await super().close()
 
 bot = MyBot()
@@ -138,17 +456,22 @@ def is_owner():
 
 # Sync command for syncing application commands
 @bot.tree.command(name="sync", description="Sync global commands (bot owner only)")
+@app_commands.describe(force="Sync even if the command tree has not changed")
 @is_owner()
-async def sync(interaction: discord.Interaction):
+async def sync(interaction: discord.Interaction, force: bool = False):
     await interaction.response.defer(ephemeral=True)
     try:
         logger.debug("Loading extensions for sync")
         await bot.load_extensions()
         logger.debug("Extensions loaded")
-        synced = await bot.tree.sync()
+        synced, (added, removed, changed) = await bot.sync_commands(force=force)
+        changes = "\n".join(f"**{label}:** {', '.join(names)}" for label, names in (("Added", added), ("Removed", removed), ("Changed", changed)) if names)
+        if synced is None:
+            await interaction.followup.send("Command tree is unchanged; nothing to sync. Use `force` to sync anyway.", ephemeral=True)
+            return
         synced_command_names = [cmd.name for cmd in synced]
-        await interaction.followup.send(f"Successfully synced {len(synced)} cogs globally: {', '.join(synced_command_names)}", ephemeral=True)
-        logger.info(f"Successfully synced {len(synced)} cogs globally: {', '.join(synced_command_names)}")
+        await interaction.followup.send(f"Successfully synced {len(synced)} commands: {', '.join(synced_command_names)}\n{changes or 'No command changes.'}"[:2000], ephemeral=True)
+        logger.info(f"Successfully synced {len(synced)} commands: {', '.join(synced_command_names)}")
     except discord.errors.HTTPException as e:
         logger.exception("Failed to sync commands due to HTTP exception")
         await interaction.followup.send(f"Failed to sync commands due to HTTP exception: {e}", ephemeral=True)
@@ -163,6 +486,10 @@ async def sync(interaction: discord.Interaction):
 async def on_ready():
     logger.info(f'Logged in as {bot.user} (ID: {bot.user.id})')
     logger.debug("Bot is ready")
+    if 'ready' not in bot.startup.marks:
+        bot.startup.mark('ready')
+        bot.startup.write(bot.data_path('startup_timeline.json'))
+        logger.info(f"Ready {bot.startup.marks['ready']:.0f}ms after process start")
     if not bot.status_task.is_running():
         bot.status_task.start()
 
@@ -178,7 +505,10 @@ async def on_app_command_error(interaction: discord.Interaction, error: app_comm
     else:
         if not interaction.response.is_done():
             await interaction.response.send_message("An error occurred while processing the command.", ephemeral=True)
-    logger.exception(f"Error in command {interaction.command}: {error}")
+        logger.error(f"Error in command {interaction.command}: {error}", exc_info=error)
+        return
+    # Expected rejections are not failures; keep them out of the error log
+    logger.info(f"Rejected command {interaction.command}: {error}")
 
 # Graceful shutdown on SIGTERM and SIGINT
 async def graceful_shutdown():
@@ -190,7 +520,7 @@ def main():
         signal.signal(sig, lambda *args: asyncio.create_task(graceful_shutdown()))
 
     try:
-        bot.run(TOKEN)
+        bot.run(TOKEN, log_handler=None)
     except Exception as e:
         logger.exception("An unexpected error occurred while running the bot")
         sys.exit(1)
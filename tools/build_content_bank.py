@@ -0,0 +1,36 @@
+"""Compiles content sources into the memory-mapped bank format read by the fun cog.
+
+Usage:
+    python tools/build_content_bank.py content/facts content/facts.bank
+
+Each ``<category>.txt`` file in the source directory holds one entry per line;
+``<category>.jsonl`` files hold one JSON value per line (trivia uses objects with
+``question``, ``answer`` and optional ``aliases``). Blank lines and lines
+starting with ``#`` are skipped.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.content_bank import ContentBank, build_bank, read_sources
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source_dir')
+    parser.add_argument('output')
+    args = parser.parse_args()
+    started = time.perf_counter()
+    count = build_bank(read_sources(args.source_dir), args.output)
+    bank = ContentBank(args.output)
+    categories = ', '.join(f"{name} ({len(indexes)})" for name, indexes in bank.categories.items())
+    bank.close()
+    size = Path(args.output).stat().st_size / 1024
+    print(f"Wrote {count} entries to {args.output} ({size:.1f} KB) in {time.perf_counter() - started:.2f}s: {categories}")
+
+
+if __name__ == "__main__":
+    main()
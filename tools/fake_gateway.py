@@ -0,0 +1,296 @@
+"""A local stand-in for Discord's REST API and gateway, for end-to-end runs of the bot.
+
+Usage:
+    python tools/fake_gateway.py --port 8765 --shards 4 --guilds 8 --owner-id 123456789012345678
+
+Point config/config.yaml at it and start the bot (main.py or launcher.py):
+
+    bot:
+      token: 'fake'
+      api_base: 'http://127.0.0.1:8765/api/v10'
+      gateway_url: 'ws://127.0.0.1:8765/gateway'
+
+Each shard that identifies receives READY and GUILD_CREATE for the guilds it owns
+(``(guild_id >> 22) % shard_count``). Slash commands are injected through the
+control API, which returns everything the bot answered:
+
+    curl -s localhost:8765/_fake/interaction -d '{"command": "ownertools list_guilds"}'
+    curl -s localhost:8765/_fake/interaction -d '{"custom_id": "poll:1:0", "message_id": "2", "user_id": "3"}'
+    curl -s localhost:8765/_fake/message -d '{"content": "hello", "user_id": "3"}'
+    curl -s localhost:8765/_fake/state
+
+Only the endpoints the bot uses at startup and for replies are implemented;
+anything else answers 404 and is listed under ``unhandled`` in the state.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from datetime import datetime, timezone
+
+from aiohttp import WSMsgType, web
+
+BOT_ID = 100000000000000001
+APPLICATION_ID = BOT_ID
+_snowflakes = itertools.count(1)
+
+
+def snowflake() -> str:
+    return str(((int(time.time() * 1000) - 1420070400000) << 22) | next(_snowflakes))
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def reply(data, status=200):
+    # discord.py only decodes bodies whose Content-Type is exactly application/json (no charset)
+    return web.Response(body=json.dumps(data).encode(), status=status, headers={'Content-Type': 'application/json'})
+
+
+def user_payload(user_id, name, bot=False):
+    return {'id': str(user_id), 'username': name, 'global_name': name, 'discriminator': '0', 'avatar': None, 'bot': bot}
+
+
+class FakeDiscord:
+    def __init__(self, shards: int, guilds: int, owner_id: int, base_url: str):
+        self.shard_count = shards
+        self.owner = user_payload(owner_id, 'owner')
+        self.bot_user = user_payload(BOT_ID, 'fakebot', bot=True)
+        self.base_url = base_url
+        self.guilds = [self.make_guild(index) for index in range(guilds)]
+        self.sockets = {}  # shard id -> websocket
+        self.sequence = itertools.count(1)
+        self.messages = []  # messages posted to channels
+        self.edits = []  # [channel_id, message_id, body] of channel message edits
+        self.bans = set()  # (guild_id, user_id)
+        self.kicks = []  # [guild_id, user_id]
+        self.deletes = []  # [channel_id, message_id]
+        self.member_edits = []  # [guild_id, user_id, body]
+        self.responses = {}  # interaction token -> callbacks and followups
+        self.commands = []
+        self.unhandled = []
+
+    def make_guild(self, index):
+        # Spread guilds over the shards: the shard is taken from the timestamp bits
+        guild_id = str(((index + 1) << 22) | index)
+        channel_id = snowflake()
+        members = [
+            {'user': self.bot_user, 'roles': [], 'joined_at': now_iso(), 'deaf': False, 'mute': False, 'flags': 0},
+            {'user': self.owner, 'roles': [], 'joined_at': now_iso(), 'deaf': False, 'mute': False, 'flags': 0},
+        ]
+        return {
+            'id': guild_id, 'name': f'Guild {index}', 'owner_id': self.owner['id'], 'icon': None,
+            'member_count': len(members), 'members': members, 'large': False, 'unavailable': False,
+            'joined_at': now_iso(), 'features': [], 'emojis': [], 'stickers': [], 'threads': [],
+            'presences': [], 'voice_states': [], 'stage_instances': [], 'guild_scheduled_events': [],
+            'roles': [{'id': guild_id, 'name': '@everyone', 'permissions': '2248473465835073', 'position': 0,
+                       'color': 0, 'hoist': False, 'managed': False, 'mentionable': False, 'flags': 0}],
+            'channels': [{'id': channel_id, 'type': 0, 'name': 'general', 'position': 0, 'permission_overwrites': [], 'nsfw': False}],
+            'verification_level': 0, 'default_message_notifications': 0, 'explicit_content_filter': 0,
+            'mfa_level': 0, 'premium_tier': 0, 'afk_timeout': 300, 'nsfw_level': 0, 'preferred_locale': 'en-US',
+        }
+
+    def shard_of(self, guild) -> int:
+        return (int(guild['id']) >> 22) % self.shard_count
+
+    def message_payload(self, channel_id, body, flags=0):
+        return {
+            'id': snowflake(), 'channel_id': str(channel_id), 'author': self.bot_user, 'type': 0,
+            'content': body.get('content') or '', 'embeds': body.get('embeds') or [], 'attachments': [],
+            'mentions': [], 'mention_roles': [], 'mention_everyone': False, 'pinned': False, 'tts': False,
+            'timestamp': now_iso(), 'edited_timestamp': None, 'flags': body.get('flags', flags), 'components': [],
+        }
+
+    # Gateway
+
+    async def send(self, ws, event, data):
+        await ws.send_json({'op': 0, 't': event, 's': next(self.sequence), 'd': data})
+
+    async def gateway(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_json({'op': 10, 'd': {'heartbeat_interval': 41250}})
+        shard_id = None
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                payload = json.loads(message.data)
+                op = payload['op']
+                if op == 1:
+                    await ws.send_json({'op': 11})
+                elif op == 2:
+                    shard_id, shard_count = payload['d'].get('shard', [0, 1])
+                    if shard_count != self.shard_count:
+                        await ws.close(code=4011, message=b'Sharding required')
+                        break
+                    self.sockets[shard_id] = ws
+                    owned = [guild for guild in self.guilds if self.shard_of(guild) == shard_id]
+                    await self.send(ws, 'READY', {
+                        'v': 10, 'user': self.bot_user, 'session_id': snowflake(), 'shard': [shard_id, shard_count],
+                        'resume_gateway_url': f"{self.base_url.replace('http', 'ws', 1)}/gateway",
+                        'guilds': [{'id': guild['id'], 'unavailable': True} for guild in owned],
+                        'application': {'id': str(APPLICATION_ID), 'flags': 0},
+                    })
+                    for guild in owned:
+                        await self.send(ws, 'GUILD_CREATE', guild)
+                elif op == 8:
+                    guild_ids = payload['d']['guild_id']
+                    for guild_id in guild_ids if isinstance(guild_ids, list) else [guild_ids]:
+                        await self.send(ws, 'GUILD_MEMBERS_CHUNK', {
+                            'guild_id': guild_id, 'members': [], 'chunk_index': 0, 'chunk_count': 1, 'nonce': payload['d'].get('nonce'),
+                        })
+        finally:
+            if shard_id is not None and self.sockets.get(shard_id) is ws:
+                del self.sockets[shard_id]
+        return ws
+
+    # REST
+
+    async def rest(self, request):
+        path = request.match_info['path']
+        parts = path.strip('/').split('/')
+        method = request.method
+        body = await request.json() if request.can_read_body and request.content_type == 'application/json' else {}
+        if method == 'GET' and path == 'gateway/bot':
+            return reply({
+                'url': f"{self.base_url.replace('http', 'ws', 1)}/gateway", 'shards': self.shard_count,
+                'session_start_limit': {'total': 1000, 'remaining': 1000, 'reset_after': 0, 'max_concurrency': 1},
+            })
+        if method == 'GET' and path == 'users/@me':
+            return reply(self.bot_user)
+        if method == 'GET' and path == 'oauth2/applications/@me':
+            return reply({
+                'id': str(APPLICATION_ID), 'name': 'fakebot', 'icon': None, 'description': '', 'bot_public': True,
+                'bot_require_code_grant': False, 'owner': self.owner, 'team': None, 'verify_key': '0' * 64, 'flags': 0,
+            })
+        if method == 'PUT' and parts[0] == 'applications' and parts[-1] == 'commands':
+            guild_id = parts[3] if 'guilds' in parts else None
+            self.commands = [
+                dict(command, id=snowflake(), application_id=str(APPLICATION_ID), version=snowflake(), guild_id=guild_id)
+                for command in body
+            ]
+            return reply(self.commands)
+        if method == 'POST' and parts[0] == 'channels' and parts[-1] == 'messages':
+            message = self.message_payload(parts[1], body)
+            self.messages.append(message)
+            return reply(message)
+        if parts[0] == 'guilds' and len(parts) == 4 and parts[2] == 'bans':
+            key = (parts[1], parts[3])
+            if method == 'PUT':
+                self.bans.add(key)
+            elif method == 'DELETE':
+                if key not in self.bans:
+                    return reply({'message': 'Unknown Ban', 'code': 10026}, status=404)
+                self.bans.discard(key)
+            return web.Response(status=204)
+        if method == 'DELETE' and parts[0] == 'guilds' and len(parts) == 4 and parts[2] == 'members':
+            self.kicks.append([parts[1], parts[3]])
+            return web.Response(status=204)
+        if method == 'DELETE' and parts[0] == 'channels' and len(parts) == 4 and parts[2] == 'messages':
+            self.deletes.append([parts[1], parts[3]])
+            return web.Response(status=204)
+        if method == 'PATCH' and parts[0] == 'guilds' and len(parts) == 4 and parts[2] == 'members':
+            self.member_edits.append([parts[1], parts[3], body])
+            return reply({'user': user_payload(parts[3], f'user{parts[3]}'), 'roles': [], 'joined_at': now_iso(), 'deaf': False,
+                          'mute': False, 'flags': 0, 'communication_disabled_until': body.get('communication_disabled_until')})
+        if method == 'PATCH' and parts[0] == 'channels' and parts[2] == 'messages':
+            self.edits.append([parts[1], parts[3], body])
+            return reply(dict(self.message_payload(parts[1], body), id=parts[3]))
+        if method == 'POST' and parts[0] == 'interactions' and parts[-1] == 'callback':
+            self.responses.setdefault(parts[2], []).append({'kind': 'callback', 'payload': body})
+            return web.Response(status=204)
+        if parts[0] == 'webhooks' and len(parts) >= 3:
+            token = parts[2]
+            message = self.message_payload(0, body, flags=64)
+            kind = 'followup' if method == 'POST' else 'edit'
+            self.responses.setdefault(token, []).append({'kind': kind, 'payload': body})
+            return reply(message)
+        self.unhandled.append(f"{method} /{path}")
+        return reply({'message': 'Unknown route in fake gateway', 'code': 0}, status=404)
+
+    # Control API
+
+    async def interaction(self, request):
+        """Injects a slash command: {"command": "group sub", "options": {...}, "guild_id": "...", "wait": 3},
+        or a button click: {"custom_id": "...", "message_id": "...", "user_id": "...", "guild_id": "...", "wait": 3}.
+        "permissions" overrides the invoking member's permission bits.
+        """
+        spec = await request.json()
+        guild = next((guild for guild in self.guilds if guild['id'] == spec.get('guild_id')), self.guilds[0])
+        shard_id = self.shard_of(guild)
+        ws = self.sockets.get(shard_id)
+        if ws is None:
+            return reply({'error': f'shard {shard_id} is not connected'}, status=409)
+        user = dict(self.owner, id=str(spec['user_id'])) if 'user_id' in spec else self.owner
+        token = f"token{snowflake()}"
+        payload = {
+            'id': snowflake(), 'application_id': str(APPLICATION_ID), 'token': token, 'version': 1,
+            'guild_id': guild['id'], 'channel_id': guild['channels'][0]['id'],
+            'channel': dict(guild['channels'][0], guild_id=guild['id']),
+            'member': {'user': user, 'roles': [], 'permissions': str(spec.get('permissions', '2248473465835073')), 'joined_at': now_iso(), 'deaf': False, 'mute': False, 'flags': 0},
+            'app_permissions': '2248473465835073', 'locale': 'en-US', 'guild_locale': 'en-US', 'entitlements': [],
+            'authorizing_integration_owners': {}, 'context': 0,
+        }
+        if 'custom_id' in spec:
+            # discord.py looks the clicked component up in the message, so it carries just that button
+            button = {'type': 2, 'style': 2, 'label': spec['custom_id'], 'custom_id': spec['custom_id']}
+            message = dict(self.message_payload(guild['channels'][0]['id'], {}), id=str(spec.get('message_id') or snowflake()),
+                           components=[{'type': 1, 'components': [button]}])
+            payload.update(type=3, message=message, data={'custom_id': spec['custom_id'], 'component_type': 2})
+        else:
+            names = spec['command'].split()
+            options = [{'name': name, 'value': value, 'type': 3 if isinstance(value, str) else 4 if isinstance(value, int) and not isinstance(value, bool) else 5}
+                       for name, value in spec.get('options', {}).items()]
+            for name in reversed(names[1:]):
+                options = [{'name': name, 'type': 1, 'options': options}]
+            payload.update(type=2, data={'id': snowflake(), 'name': names[0], 'type': 1, 'options': options})
+        await self.send(ws, 'INTERACTION_CREATE', payload)
+        await asyncio.sleep(spec.get('wait', 3))
+        return reply({'shard': shard_id, 'responses': self.responses.get(token, [])})
+
+    async def message(self, request):
+        """Injects MESSAGE_CREATE in the first channel of a guild: {"content": "...", "user_id": "...", "guild_id": "..."}."""
+        spec = await request.json()
+        guild = next((guild for guild in self.guilds if guild['id'] == spec.get('guild_id')), self.guilds[0])
+        ws = self.sockets.get(self.shard_of(guild))
+        if ws is None:
+            return reply({'error': 'shard is not connected'}, status=409)
+        user_id = str(spec.get('user_id', self.owner['id']))
+        message = dict(self.message_payload(guild['channels'][0]['id'], {'content': spec.get('content', '')}),
+                       author=user_payload(user_id, f'user{user_id}'), guild_id=guild['id'],
+                       member={'roles': [], 'joined_at': now_iso(), 'deaf': False, 'mute': False, 'flags': 0})
+        await self.send(ws, 'MESSAGE_CREATE', message)
+        return reply({'id': message['id']})
+
+    async def state(self, request):
+        return reply({
+            'shards': sorted(self.sockets), 'guilds': [[guild['id'], guild['name'], self.shard_of(guild)] for guild in self.guilds],
+            'commands': [command['name'] for command in self.commands], 'messages': self.messages, 'edits': self.edits,
+            'bans': sorted(self.bans), 'kicks': self.kicks,
+            'deletes': self.deletes, 'member_edits': self.member_edits, 'unhandled': self.unhandled,
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--shards', type=int, default=2)
+    parser.add_argument('--guilds', type=int, default=4)
+    parser.add_argument('--owner-id', type=int, default=123456789012345678)
+    args = parser.parse_args()
+    fake = FakeDiscord(args.shards, args.guilds, args.owner_id, f"http://{args.host}:{args.port}")
+    app = web.Application()
+    app.router.add_get('/gateway', fake.gateway)
+    app.router.add_post('/_fake/interaction', fake.interaction)
+    app.router.add_post('/_fake/message', fake.message)
+    app.router.add_get('/_fake/state', fake.state)
+    app.router.add_route('*', '/api/v10/{path:.*}', fake.rest)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()